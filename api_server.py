@@ -2,35 +2,101 @@
 FastAPI Backend for Pneumonia Detection
 RESTful API for programmatic access
 """
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import numpy as np
-from PIL import Image
-import io
 import os
 import time
 import uuid
+import asyncio
+import io
+import json
+import threading
+from contextlib import asynccontextmanager, nullcontext
 from datetime import datetime
-from typing import Optional, List
+from typing import BinaryIO, Optional, List, Dict
 import logging
 from pydantic import BaseModel
+from PIL import Image
+
+from config.inference_config import InferenceConfig
+from src.models.batching import BatchScheduler
+from src.models.executor import InferenceExecutor, ExecutorSaturated, EventLoopMonitor
+from src.models.model_manager import build_model_manager
+from src.models.inference_server import RemoteModelManager
+from src.models.ensemble import fuse_probabilities, FUSION_METHODS
+from src.models.cascade import build_cascade_policy
+from src.utils.prediction_cache import get_prediction_cache
+from src.utils.metrics import get_metrics, CONTENT_TYPE, BATCH_SIZE_BUCKETS
+from src.models.registry import process_rss_bytes
+from src.utils.preprocessing import ImageSource, preprocess_image, new_batch
+from src.utils.profiling import RequestProfiler, profile_layers
+from src.utils.thread_tuning import apply_thread_config
+from src.utils.uploads import UploadLimitMiddleware, upload_size, upload_source
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Thread pools sized for WEB_CONCURRENCY workers on this host (tune_threads.py); each worker
+# takes its own core set when pinning is on. ipc workers run no models, so they stay unpinned.
+thread_config = apply_thread_config(InferenceConfig.SERVING_WORKERS, pin=InferenceConfig.INFERENCE_MODE == "local")
+
+# Prometheus metrics (served at /metrics)
+metrics = get_metrics()
+stage_seconds = metrics.histogram(
+    'pneumonia_stage_seconds',
+    'Seconds per image in each request stage (read, decode, resize, normalize, queue, inference, serialize)',
+    ['stage', 'model']
+)
+inference_batch_size = metrics.histogram(
+    'pneumonia_inference_batch_size', 'Images per forward pass', ['model'], buckets=BATCH_SIZE_BUCKETS
+)
+inference_errors = metrics.counter('pneumonia_inference_errors_total', 'Failed forward passes', ['model'])
+cache_lookups = metrics.counter('pneumonia_cache_lookups_total', 'Prediction cache lookups', ['model', 'result'])
+cascade_requests = metrics.counter(
+    'pneumonia_cascade_requests_total', 'Cascade requests by the stage that answered them (fast or escalated)',
+    ['stage', 'model']
+)
+http_requests = metrics.counter('pneumonia_http_requests_total', 'HTTP requests', ['method', 'path', 'status'])
+http_request_seconds = metrics.histogram(
+    'pneumonia_http_request_seconds', 'Time to response headers per HTTP request', ['path']
+)
+queue_depth = metrics.gauge('pneumonia_queue_depth', 'Requests waiting for a batch slot', ['model'])
+executor_in_flight = metrics.gauge('pneumonia_executor_in_flight', 'Requests holding an admission slot')
+model_loaded = metrics.gauge('pneumonia_model_loaded', '1 if the model is in memory', ['model'])
+model_memory = metrics.gauge('pneumonia_model_memory_bytes', 'Weight memory of loaded models', ['model'])
+cache_entries = metrics.gauge('pneumonia_cache_entries', 'Entries in the prediction cache')
+event_loop_lag = metrics.gauge('pneumonia_event_loop_lag_seconds', 'Recent p99 event-loop lag')
+process_rss = metrics.gauge('pneumonia_process_rss_bytes', 'Resident memory of this API process')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the event-loop monitor and model warm-up with the server"""
+    loop_monitor.start()
+    if InferenceConfig.MODEL_WARMUP:
+        # In the background so /health/live answers meanwhile; /health/ready waits for it
+        threading.Thread(target=detector.warm_up, name="warm-up", daemon=True).start()
+    yield
+    loop_monitor.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="🫁 Pneumonia Detection API",
     description="AI-powered pneumonia detection from chest X-ray images",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
+)
+
+# Refuse oversized uploads before they are read (added before CORS so 413s still carry CORS headers)
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=InferenceConfig.MAX_UPLOAD_BYTES,
+    path_limits={"/batch_predict": InferenceConfig.BATCH_UPLOAD_MAX_BYTES}
 )
 
 # Enable CORS for web frontend
@@ -51,110 +117,571 @@ class PredictionResult(BaseModel):
     processing_time: float
     timestamp: str
     request_id: str
+    cached: bool = False
+    profile: Optional[dict] = None
+    cascade: Optional[dict] = None
+
+# Only present in responses when set
+OPTIONAL_RESULT_FIELDS = ('profile', 'cascade')
+
+class EnsembleResult(BaseModel):
+    prediction: str
+    confidence: float
+    probabilities: dict
+    fusion: str
+    model_results: Dict[str, PredictionResult]
+    latency: dict
+    timestamp: str
+    request_id: str
 
 class HealthCheck(BaseModel):
     status: str
     models_loaded: int
     available_models: List[str]
+    model_state: Dict[str, str] = {}
     timestamp: str
 
+class AdmittedStreamingResponse(StreamingResponse):
+    """Streamed response that releases its executor admission slot once sent (or abandoned)"""
+
+    def __init__(self, executor: InferenceExecutor, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.executor.release()
+
 class PneumoniaDetectorAPI:
     def __init__(self):
-        self.models = {}
+        self.model_manager = None
         self.load_models()
+        self.cascade = build_cascade_policy(self.model_manager)
+        self.cache = get_prediction_cache()
+        self.scheduler = BatchScheduler(
+            self._predict_batch,
+            max_batch_size=InferenceConfig.BATCH_MAX_SIZE,
+            max_wait_ms=InferenceConfig.BATCH_MAX_WAIT_MS
+        )
+        self.executor = InferenceExecutor(
+            max_workers=InferenceConfig.INFERENCE_WORKERS,
+            max_pending=InferenceConfig.INFERENCE_MAX_PENDING,
+            retry_after=InferenceConfig.INFERENCE_RETRY_AFTER
+        )
+        self.profiler = RequestProfiler(
+            output_dir=InferenceConfig.PROFILE_DIR,
+            sample_rate=InferenceConfig.PROFILE_SAMPLE_RATE,
+            mode=InferenceConfig.PROFILE_MODE
+        )
         
-    def load_models(self):
-        """Load all available models"""
-        models_dir = "models"
-        model_files = {
-            "hybrid": "hybrid_model_colab.h5",
-            "resnet50": "resnet_classifier_colab.h5",
-            "autoencoder": "autoencoder_colab.h5"
-        }
-        
-        for model_name, model_file in model_files.items():
-            model_path = os.path.join(models_dir, model_file)
-            if os.path.exists(model_path):
-                try:
-                    self.models[model_name] = load_model(model_path)
-                    logger.info(f"✅ Loaded {model_name} model")
-                except Exception as e:
-                    logger.error(f"❌ Failed to load {model_name}: {str(e)}")
-            else:
-                logger.warning(f"⚠️ Model file not found: {model_path}")
-        
-        logger.info(f"Loaded {len(self.models)} models: {list(self.models.keys())}")
+    def load_models(self, precision: Optional[str] = None):
+        """
+        Register all available models (each loads on its first request)
+
+        precision selects a quantized variant (see quantize_models.py); a variant
+        that is missing, stale or fails the AUC gate is refused and the
+        full-precision model is served instead. Models listed in
+        MODEL_PRELOAD are loaded right away. With INFERENCE_MODE=ipc the
+        models live in the shared inference process started by serve.py.
+        """
+        if InferenceConfig.INFERENCE_MODE == "ipc":
+            if not InferenceConfig.INFERENCE_AUTHKEY:
+                raise RuntimeError("INFERENCE_AUTHKEY must be set when INFERENCE_MODE=ipc")
+            self.model_manager = RemoteModelManager(
+                InferenceConfig.INFERENCE_ADDRESS, InferenceConfig.INFERENCE_AUTHKEY.encode()
+            )
+        else:
+            self.model_manager = build_model_manager(precision)
     
-    def preprocess_image(self, img_bytes: bytes) -> np.ndarray:
-        """Preprocess image for model prediction"""
+    def warm_up(self):
+        """
+        Run the decode path and synthetic batches through every model and
+        batch-size bucket, so the first real requests run at steady-state
+        latency. In ipc mode the inference process warms its own models.
+        """
+        pixels = np.random.default_rng(0).integers(0, 255, (512, 512), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, 'JPEG')
+        preprocess_image(io.BytesIO(buffer.getvalue()))
+        if InferenceConfig.INFERENCE_MODE != "ipc":
+            self.model_manager.warm_up(
+                InferenceConfig.warmup_models(),
+                batch_sizes=InferenceConfig.warmup_batch_sizes(),
+                iterations=InferenceConfig.WARMUP_ITERATIONS
+            )
+    
+    def readiness(self) -> dict:
+        """Whether to send traffic here: models available and, with MODEL_WARMUP, warmed up"""
         try:
-            # Open image
-            img = Image.open(io.BytesIO(img_bytes))
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize to model input size
-            img = img.resize((224, 224))
-            
-            # Convert to array and normalize
-            img_array = image.img_to_array(img)
-            img_array = np.expand_dims(img_array, axis=0)
-            img_array = img_array / 255.0
-            
-            return img_array
-            
+            warm_up = self.model_manager.warm_up_state()
+        except ConnectionError as e:
+            return {"ready": False, "reason": str(e)}
+        if not self.model_manager.available:
+            return {"ready": False, "reason": "No models available", "warm_up": warm_up}
+        if InferenceConfig.MODEL_WARMUP:
+            if warm_up["state"] != "done":
+                return {"ready": False, "reason": "Warming up", "warm_up": warm_up}
+            # Models evicted since (LRU churn) were warmed all the same; they just load again on use
+            if not warm_up["models"] and not warm_up.get("evicted"):
+                return {"ready": False, "reason": "No model could be warmed up", "warm_up": warm_up}
+        return {"ready": True, "warm_up": warm_up}
+    
+    def preprocess_image(self, image: ImageSource, out: Optional[np.ndarray] = None,
+                         model_name: str = "unknown") -> np.ndarray:
+        """Preprocess image for model prediction (optionally into a preallocated batch slot)"""
+        timings = {}
+        try:
+            img_array = preprocess_image(image, out=out, timings=timings)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
+        for stage, seconds in timings.items():
+            stage_seconds.observe(seconds, stage=stage, model=model_name)
+        return img_array
     
-    def predict(self, img_bytes: bytes, model_name: str = "hybrid") -> PredictionResult:
-        """Make prediction using specified model"""
-        if model_name not in self.models:
-            available_models = list(self.models.keys())
+    async def read_upload(self, file: UploadFile, model_name: str) -> BinaryIO:
+        """
+        The upload's spooled file, decoded in place rather than copied to bytes ('read' stage)
+
+        The body has already been spooled by the time the endpoint runs, so
+        this only checks the per-file size limit and rewinds the file.
+        """
+        started = time.perf_counter()
+        source = upload_source(file, InferenceConfig.MAX_UPLOAD_BYTES)
+        stage_seconds.observe(time.perf_counter() - started, stage='read', model=model_name)
+        return source
+    
+    def respond(self, result: BaseModel, model_name: str) -> JSONResponse:
+        """Serialize a result ourselves so the time is visible as the 'serialize' stage"""
+        started = time.perf_counter()
+        content = result.model_dump()
+        # Per-model results of an ensemble are PredictionResults too
+        for payload in [content] + list(content.get('model_results', {}).values()):
+            for name in OPTIONAL_RESULT_FIELDS:
+                if name in payload and payload[name] is None:
+                    del payload[name]
+        response = JSONResponse(content=content)
+        stage_seconds.observe(time.perf_counter() - started, stage='serialize', model=model_name)
+        return response
+    
+    def predict_models(self, img_array: np.ndarray, model_names: List[str]) -> dict:
+        """
+        Run several classifiers on one preprocessed image
+        
+        Models that embed the same ResNet50 weights share one trunk pass,
+        and trunk activations are cached per image. Returns
+        {model_name: {'probabilities': ndarray, 'time': seconds}}.
+        """
+        for model_name in model_names:
+            self._check_model(model_name)
+        return self.model_manager.predict_models(img_array, model_names)
+    
+    def _preprocess_with_key(self, image: ImageSource, model_name: str, out: Optional[np.ndarray] = None):
+        """Preprocess an image and derive its prediction-cache key"""
+        img_array = self.preprocess_image(image, out=out, model_name=model_name)
+        key = self.cache.make_key(img_array, model_name, self.model_manager.version(model_name))
+        return img_array, key
+    
+    def _predict_batch(self, model_name: str, batch: np.ndarray) -> np.ndarray:
+        """Run one forward pass over a stacked batch of images (loading the model on first use)"""
+        inference_batch_size.observe(len(batch), model=model_name)
+        try:
+            with self.model_manager.use(model_name) as model:
+                return model.predict(batch, verbose=0)
+        except Exception:
+            inference_errors.inc(model=model_name)
+            raise
+    
+    def _cache_get(self, key: str, model_name: str):
+        """Prediction-cache lookup, counted as a hit or miss for model_name"""
+        cached = self.cache.get(key)
+        cache_lookups.inc(model=model_name, result='miss' if cached is None else 'hit')
+        return cached
+    
+    def _observe_output(self, model_name: str, output):
+        """Record the queue wait and forward pass of one scheduled request"""
+        stage_seconds.observe(output.queue_time, stage='queue', model=model_name)
+        stage_seconds.observe(output.forward_time, stage='inference', model=model_name)
+    
+    def _check_model(self, model_name: str):
+        if model_name not in self.model_manager.available:
+            available_models = self.model_manager.available
             raise HTTPException(
                 status_code=400, 
                 detail=f"Model '{model_name}' not available. Available models: {available_models}"
             )
+    
+    def _build_result(self, probabilities: np.ndarray, model_name: str, processing_time: float,
+                      cached: bool = False) -> PredictionResult:
+        """Turn one row of model output into an API response"""
+        predicted_class = int(np.argmax(probabilities))
+        confidence = float(probabilities[predicted_class])
+        
+        classes = ['NORMAL', 'PNEUMONIA']
+        predicted_label = classes[predicted_class]
+        
+        return PredictionResult(
+            prediction=predicted_label,
+            confidence=confidence,
+            probabilities={
+                'NORMAL': float(probabilities[0]),
+                'PNEUMONIA': float(probabilities[1])
+            },
+            model_used=model_name,
+            processing_time=processing_time,
+            timestamp=datetime.now().isoformat(),
+            request_id=str(uuid.uuid4()),
+            cached=cached
+        )
+    
+    def predict(self, image: ImageSource, model_name: str = "hybrid") -> PredictionResult:
+        """Make prediction using specified model"""
+        self._check_model(model_name)
+        img_array, key = self._preprocess_with_key(image, model_name)
+        cached = self._cache_get(key, model_name)
+        if cached is not None:
+            return self._build_result(np.asarray(cached), model_name, 0.0, cached=True)
+        
+        try:
+            output = self.scheduler.submit(model_name, img_array).result()
+        except Exception as e:
+            logger.error(f"Prediction error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+        
+        self._observe_output(model_name, output)
+        self.cache.set(key, output.probabilities)
+        return self._build_result(output.probabilities, model_name, output.forward_time)
+    
+    async def _scheduled_predict(self, img_array: np.ndarray, key: str, model_name: str):
+        """Cached or micro-batched forward pass of one preprocessed image: (probabilities, forward seconds, cached)"""
+        cached = self._cache_get(key, model_name)
+        if cached is not None:
+            return np.asarray(cached), 0.0, True
+        
+        try:
+            output = await asyncio.wrap_future(self.scheduler.submit(model_name, img_array))
+        except Exception as e:
+            logger.error(f"Prediction error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+        
+        self._observe_output(model_name, output)
+        self.cache.set(key, output.probabilities)
+        return output.probabilities, output.forward_time, False
+    
+    async def predict_async(self, image: ImageSource, model_name: str = "hybrid") -> PredictionResult:
+        """Make prediction without blocking the event loop (decode and inference run off-loop)"""
+        self._check_model(model_name)
+        
+        with self.executor.admission():
+            img_array, key = await self.executor.run(self._preprocess_with_key, image, model_name)
+            probabilities, forward_time, cached = await self._scheduled_predict(img_array, key, model_name)
+        return self._build_result(probabilities, model_name, forward_time, cached=cached)
+    
+    async def predict_cascade(self, image: ImageSource) -> PredictionResult:
+        """
+        Cheap model first; the expensive model only when the cheap one is unsure
+        
+        The image is decoded once and both stages go through the batch
+        scheduler and the prediction cache. result.cascade tells which
+        stage answered and what the cheap model said.
+        """
+        policy = self.cascade
+        if policy is None:
+            raise HTTPException(status_code=503, detail="Cascade not available (see CASCADE_FAST_MODEL / CASCADE_MODEL)")
+        
+        with self.executor.admission():
+            img_array, key = await self.executor.run(self._preprocess_with_key, image, policy.fast_model)
+            fast, fast_time, fast_cached = await self._scheduled_predict(img_array, key, policy.fast_model)
+            escalated = policy.escalates(fast)
+            if escalated:
+                key = self.cache.make_key(img_array, policy.model, self.model_manager.version(policy.model))
+                probabilities, forward_time, cached = await self._scheduled_predict(img_array, key, policy.model)
+            else:
+                probabilities, forward_time, cached = fast, 0.0, fast_cached
+        
+        policy.record(escalated)
+        model_name = policy.model if escalated else policy.fast_model
+        cascade_requests.inc(stage='escalated' if escalated else 'fast', model=model_name)
+        result = self._build_result(probabilities, model_name, fast_time + forward_time,
+                                    cached=cached and fast_cached)
+        result.cascade = {
+            'stage': 'escalated' if escalated else 'fast',
+            'fast_model': policy.fast_model,
+            'fast_probabilities': {'NORMAL': float(fast[0]), 'PNEUMONIA': float(fast[1])},
+            'band': [policy.low, policy.high]
+        }
+        return result
+    
+    def _predict_profiled(self, image: ImageSource, model_name: str, capture: bool,
+                          include_layers: bool, queued_at: float):
+        """
+        One request end to end in the calling thread, timing every stage
+
+        The forward pass calls the model directly (no batching, no cache) so
+        its time is this image alone; the per-layer-group pass runs after it
+        and is not part of the stage times.
+        """
+        stages = {'executor_wait': time.perf_counter() - queued_at}
+        with self.profiler.capture(model_name) if capture else nullcontext({'path': None}) as capture_info:
+            timings = {}
+            try:
+                img_array = preprocess_image(image, timings=timings)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
+            stages.update(timings)
+            
+            started = time.perf_counter()
+            try:
+                with self.model_manager.use(model_name) as model:
+                    probabilities = np.asarray(model.predict(img_array, verbose=0))[0]
+            except Exception as e:
+                inference_errors.inc(model=model_name)
+                logger.error(f"Prediction error: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+            stages['forward'] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            result = self._build_result(probabilities, model_name, stages['forward'])
+            stages['postprocess'] = time.perf_counter() - started
+        
+        layers = None
+        if include_layers:
+            with self.model_manager.use(model_name) as model:
+                layers = profile_layers(model, img_array)
+        return result, stages, layers, capture_info['path']
+    
+    async def predict_profiled(self, image: ImageSource, model_name: str, read_time: float,
+                               bytes_received: int, capture: bool = False, include: bool = True) -> PredictionResult:
+        """
+        Prediction with a stage breakdown in result.profile (X-Profile / ?profile requests)
+
+        capture also writes a cProfile dump or TensorFlow trace of the
+        request to PROFILE_DIR; the breakdown itself is only attached when
+        include is set, so sampled captures do not change the response.
+        """
+        self._check_model(model_name)
+        started = time.perf_counter()
+        with self.executor.admission():
+            result, stages, layers, capture_path = await self.executor.run(
+                self._predict_profiled, image, model_name, capture, include, started
+            )
+        if include:
+            result.profile = {
+                'bytes_received': bytes_received,
+                'stages': {'read': read_time, **stages, 'total': read_time + time.perf_counter() - started},
+                'forward_layers': layers,
+                'capture': capture_path
+            }
+        return result
+    
+    async def _decode_upload(self, file: UploadFile, model_name: str, out: np.ndarray):
+        """Read and preprocess one upload into its batch slot on the executor; returns (array, cache key, error)"""
+        if not file.content_type or not file.content_type.startswith('image/'):
+            return None, None, "File must be an image"
+        try:
+            source = await self.read_upload(file, model_name)
+            img_array, key = await self.executor.run(self._preprocess_with_key, source, model_name, out)
+            return img_array, key, None
+        except HTTPException as e:
+            return None, None, e.detail
+        except Exception as e:
+            return None, None, str(e)
+    
+    async def _decode_chunk(self, files: List[UploadFile], model_name: str):
+        """Decode a chunk of uploads in parallel into one preallocated float32 batch"""
+        batch = new_batch(len(files))
+        decoded = await asyncio.gather(*[
+            self._decode_upload(file, model_name, batch[i]) for i, file in enumerate(files)
+        ])
+        return batch, decoded
+    
+    async def predict_stream(self, files: List[UploadFile], model_name: str = "hybrid"):
+        """
+        Batch prediction yielding one NDJSON line per file, then a summary line
+        
+        Uploads are decoded in parallel, stacked into chunks of
+        BATCH_PREDICT_CHUNK_SIZE and run as one forward pass per chunk.
+        The next chunk is decoded while the current one is in the model.
+        The caller holds the executor admission slot for the whole stream
+        (see AdmittedStreamingResponse).
+        """
+        chunk_size = max(1, InferenceConfig.BATCH_PREDICT_CHUNK_SIZE)
+        chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        processed = failed = 0
+        started = time.time()
         
+        next_decode = asyncio.ensure_future(self._decode_chunk(chunks[0], model_name)) if chunks else None
         try:
-            # Preprocess image
-            img_array = self.preprocess_image(img_bytes)
+            for index, chunk in enumerate(chunks):
+                batch, decoded = await next_decode
+                next_decode = (
+                    asyncio.ensure_future(self._decode_chunk(chunks[index + 1], model_name))
+                    if index + 1 < len(chunks) else None
+                )
             
-            # Make prediction
-            start_time = time.time()
-            model = self.models[model_name]
-            prediction = model.predict(img_array, verbose=0)
-            processing_time = time.time() - start_time
+                cached = {
+                    i: self._cache_get(key, model_name)
+                    for i, (img_array, key, _) in enumerate(decoded) if img_array is not None
+                }
+                misses = [i for i, value in cached.items() if value is None]
+                predictions, forward_time, error = None, 0.0, None
+                if misses:
+                    if len(misses) < len(chunk):
+                        batch = batch[misses]
+                    forward_start = time.time()
+                    try:
+                        predictions = await self.executor.run(self._predict_batch, model_name, batch)
+                    except Exception as e:
+                        logger.error(f"Batch prediction error: {str(e)}")
+                        error = f"Prediction failed: {str(e)}"
+                    forward_time = time.time() - forward_start
+                    if predictions is not None:
+                        # Each image's share of the forward pass, so the histogram's sum is the real time
+                        per_image = forward_time / len(misses)
+                        for n, i in enumerate(misses):
+                            self.cache.set(decoded[i][1], predictions[n])
+                            stage_seconds.observe(per_image, stage='inference', model=model_name)
             
-            # Process results
-            predicted_class = np.argmax(prediction[0])
-            confidence = float(prediction[0][predicted_class])
+                lines = []
+                row = {i: n for n, i in enumerate(misses)}
+                for i, file in enumerate(chunk):
+                    file_error = decoded[i][2] or (error if i in row and predictions is None else None)
+                    if file_error:
+                        failed += 1
+                        lines.append({'filename': file.filename, 'error': file_error, 'prediction': None})
+                        continue
+                    processed += 1
+                    if cached[i] is not None:
+                        result = self._build_result(np.asarray(cached[i]), model_name, 0.0, cached=True)
+                    else:
+                        result = self._build_result(predictions[row[i]], model_name, forward_time)
+                    result_dict = result.model_dump(exclude=set(OPTIONAL_RESULT_FIELDS))
+                    result_dict['filename'] = file.filename
+                    lines.append(result_dict)
             
-            classes = ['NORMAL', 'PNEUMONIA']
-            predicted_label = classes[predicted_class]
+                serialize_start = time.perf_counter()
+                payload = "".join(json.dumps(line) + "\n" for line in lines)
+                per_line = (time.perf_counter() - serialize_start) / len(lines)
+                for _ in lines:
+                    stage_seconds.observe(per_line, stage='serialize', model=model_name)
+                yield payload
+        finally:
+            if next_decode is not None:
+                next_decode.cancel()
+        
+        yield json.dumps({
+            "total_processed": processed,
+            "total_failed": failed,
+            "model_used": model_name,
+            "processing_time": time.time() - started
+        }) + "\n"
+
+    async def predict_ensemble(self, image: ImageSource, model_names: Optional[List[str]] = None,
+                               fusion: str = "mean", weights: Optional[Dict[str, float]] = None) -> EnsembleResult:
+        """
+        Decode once, run every requested classifier concurrently and fuse the results
+        
+        Models sharing a ResNet50 trunk run together as one task; the others
+        each get their own task on the inference executor.
+        """
+        started = time.time()
+        model_names = model_names or self.model_manager.classifiers
+        if not model_names:
+            raise HTTPException(status_code=503, detail="No classifier models available")
+        if fusion not in FUSION_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown fusion '{fusion}'. Use one of: {list(FUSION_METHODS)}")
+        for model_name in model_names:
+            self._check_model(model_name)
+        not_classifiers = [name for name in model_names if name not in self.model_manager.classifiers]
+        if not_classifiers:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ensembles take classifiers only, not {not_classifiers}. "
+                       f"Classifiers: {self.model_manager.classifiers}"
+            )
+        
+        with self.executor.admission():
+            decode_start = time.time()
+            img_array = await self.executor.run(self.preprocess_image, image, None, "ensemble")
+            decode_time = time.time() - decode_start
             
-            probabilities = {
-                'NORMAL': float(prediction[0][0]),
-                'PNEUMONIA': float(prediction[0][1])
+            keys = {
+                name: self.cache.make_key(img_array, name, self.model_manager.version(name))
+                for name in model_names
             }
+            outputs = {}
+            for name in model_names:
+                cached = self._cache_get(keys[name], name)
+                if cached is not None:
+                    outputs[name] = {'probabilities': np.asarray(cached), 'time': 0.0, 'cached': True}
             
-            return PredictionResult(
-                prediction=predicted_label,
-                confidence=confidence,
-                probabilities=probabilities,
-                model_used=model_name,
-                processing_time=processing_time,
-                timestamp=datetime.now().isoformat(),
-                request_id=str(uuid.uuid4())
-            )
+            pending = [name for name in model_names if name not in outputs]
+            try:
+                groups = await self.executor.run(self.model_manager.prediction_groups, pending) if pending else []
+                group_results = await asyncio.gather(*[
+                    self.executor.run(self.predict_models, img_array, group) for group in groups
+                ])
+            except HTTPException:
+                raise
+            except Exception as e:
+                for name in pending:
+                    inference_errors.inc(model=name)
+                logger.error(f"Ensemble prediction error: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
             
-        except Exception as e:
-            logger.error(f"Prediction error: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+            for results in group_results:
+                for name, result in results.items():
+                    probabilities = result['probabilities'][0]
+                    self.cache.set(keys[name], probabilities)
+                    stage_seconds.observe(result['time'], stage='inference', model=name)
+                    outputs[name] = {'probabilities': probabilities, 'time': result['time'], 'cached': False}
+        
+        fusion_start = time.time()
+        fused = fuse_probabilities(
+            {name: outputs[name]['probabilities'] for name in model_names}, fusion, weights
+        )
+        combined = self._build_result(fused, "ensemble", 0.0)
+        fusion_time = time.time() - fusion_start
+        
+        return EnsembleResult(
+            prediction=combined.prediction,
+            confidence=combined.confidence,
+            probabilities=combined.probabilities,
+            fusion=fusion,
+            model_results={
+                name: self._build_result(outputs[name]['probabilities'], name, outputs[name]['time'],
+                                         cached=outputs[name]['cached'])
+                for name in model_names
+            },
+            latency={
+                'decode': decode_time,
+                'models': {name: outputs[name]['time'] for name in model_names},
+                'fusion': fusion_time,
+                'total': time.time() - started
+            },
+            timestamp=combined.timestamp,
+            request_id=combined.request_id
+        )
 
 # Initialize detector
 detector = PneumoniaDetectorAPI()
+loop_monitor = EventLoopMonitor()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count every request by route template and status, and time it to response headers"""
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        http_requests.inc(method=request.method, path=path, status=status)
+        http_request_seconds.observe(time.perf_counter() - started, path=path)
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -184,9 +711,14 @@ async def root():
                     Check API health and loaded models
                 </div>
                 
+                <div class="endpoint">
+                    <span class="method">GET</span> <span class="url">/health/live</span> and <span class="url">/health/ready</span><br>
+                    Liveness, and readiness (503 until every model is warmed up)
+                </div>
+                
                 <div class="endpoint">
                     <span class="method">POST</span> <span class="url">/predict</span><br>
-                    Upload X-ray image for pneumonia detection
+                    Upload X-ray image for pneumonia detection (header <code>X-Profile: 1</code> adds a stage timing breakdown)
                 </div>
                 
                 <div class="endpoint">
@@ -194,11 +726,36 @@ async def root():
                     Use specific model for prediction (hybrid, resnet50, autoencoder)
                 </div>
                 
+                <div class="endpoint">
+                    <span class="method">POST</span> <span class="url">/predict/cascade</span><br>
+                    Fast model first, hybrid only when it is unsure (<code>PREDICT_MODE=cascade</code> makes this the /predict default)
+                </div>
+                
+                <div class="endpoint">
+                    <span class="method">POST</span> <span class="url">/predict/ensemble</span><br>
+                    Run all models on one upload and get per-model plus fused results
+                </div>
+                
+                <div class="endpoint">
+                    <span class="method">POST</span> <span class="url">/batch_predict</span><br>
+                    Upload many X-rays in one request; results stream back as NDJSON
+                </div>
+                
                 <div class="endpoint">
                     <span class="method">GET</span> <span class="url">/models</span><br>
                     List all available models
                 </div>
                 
+                <div class="endpoint">
+                    <span class="method">GET</span> <span class="url">/stats</span><br>
+                    Inference statistics (queue depth, batch sizes, cache hit rate)
+                </div>
+                
+                <div class="endpoint">
+                    <span class="method">GET</span> <span class="url">/metrics</span><br>
+                    Prometheus metrics (per-stage latency histograms, request and error counters)
+                </div>
+                
                 <h2>📖 Documentation</h2>
                 <p>
                     <a href="/docs">📚 Interactive API Documentation (Swagger)</a><br>
@@ -223,70 +780,178 @@ print(f"Prediction: {result['prediction']}")
 
 @app.get("/health", response_model=HealthCheck)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (status is "starting" until /health/ready passes)"""
+    model_state = {name: state['state'] for name, state in detector.model_manager.state().items()}
+    ready = await asyncio.to_thread(detector.readiness)
     return HealthCheck(
-        status="healthy",
-        models_loaded=len(detector.models),
-        available_models=list(detector.models.keys()),
+        status="healthy" if ready["ready"] else "starting",
+        models_loaded=sum(state == 'loaded' for state in model_state.values()),
+        available_models=detector.model_manager.available,
+        model_state=model_state,
         timestamp=datetime.now().isoformat()
     )
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness: the process is up and its event loop answers (restart it if this fails)"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: models loaded and warmed up, so first requests run at steady-state latency (503 until then)"""
+    # Asks the inference process in ipc mode, so off the event loop
+    state = await asyncio.to_thread(detector.readiness)
+    state["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
 @app.get("/models")
 async def list_models():
     """List all available models"""
     return {
-        "available_models": list(detector.models.keys()),
-        "total_models": len(detector.models),
-        "recommended_model": "hybrid"
+        "available_models": detector.model_manager.available,
+        "total_models": len(detector.model_manager.available),
+        "precision": detector.model_manager.precisions,
+        "recommended_model": "hybrid",
+        **detector.model_manager.stats()
+    }
+
+@app.get("/stats")
+async def inference_stats():
+    """Runtime inference statistics"""
+    return {
+        "batching": {
+            "max_batch_size": detector.scheduler.max_batch_size,
+            "max_wait_ms": detector.scheduler.max_wait_ms,
+            "models": detector.scheduler.stats()
+        },
+        "executor": detector.executor.stats(),
+        "cache": detector.cache.stats(),
+        "event_loop": loop_monitor.stats(),
+        "profiler": detector.profiler.stats(),
+        "cascade": detector.cascade.stats() if detector.cascade is not None else None,
+        "threads": thread_config,
+        "shared_backbone": detector.model_manager.backbone_stats(),
+        "inference_process": (
+            detector.model_manager.server_stats() if InferenceConfig.INFERENCE_MODE == "ipc" else None
+        ),
+        "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: per-stage latency histograms, counters and gauges"""
+    for model_name, stats in detector.scheduler.stats().items():
+        queue_depth.set(stats['queue_depth'], model=model_name)
+    for model_name, state in detector.model_manager.state().items():
+        model_loaded.set(state['state'] == 'loaded', model=model_name)
+        model_memory.set(state['memory_bytes'], model=model_name)
+    executor_in_flight.set(detector.executor.stats()['in_flight'])
+    cache_entries.set(detector.cache.stats()['entries'])
+    event_loop_lag.set(loop_monitor.stats()['recent_p99_ms'] / 1000)
+    process_rss.set(process_rss_bytes() or 0)
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+def wants_profile(request: Request) -> bool:
+    """X-Profile header or ?profile query flag set to a true value"""
+    if not InferenceConfig.PROFILE_REQUESTS:
+        return False
+    flag = request.headers.get('x-profile') or request.query_params.get('profile')
+    return flag is not None and flag.lower() in ('1', 'true', 'yes', '')
+
+async def predict_single(request: Request, file: UploadFile, model_name: str):
+    """Shared /predict path: batched and cached unless this request is profiled or sampled"""
+    include = wants_profile(request)
+    capture = detector.profiler.sample()
+    if not (include or capture):
+        source = await detector.read_upload(file, model_name)
+        result = await detector.predict_async(source, model_name)
+        return detector.respond(result, model_name)
+    
+    started = time.perf_counter()
+    source = upload_source(file, InferenceConfig.MAX_UPLOAD_BYTES)
+    result = await detector.predict_profiled(
+        source, model_name, time.perf_counter() - started, upload_size(file), capture=capture, include=include
+    )
+    return detector.respond(result, model_name)
+
 @app.post("/predict", response_model=PredictionResult)
-async def predict_default(file: UploadFile = File(...)):
-    """Predict pneumonia using default (hybrid) model"""
+async def predict_default(request: Request, file: UploadFile = File(...)):
+    """
+    Predict pneumonia using default (hybrid) model (X-Profile: 1 adds a stage timing breakdown)
+    
+    With PREDICT_MODE=cascade the fast model answers first and hybrid only
+    when it is unsure; profiled requests still time hybrid alone.
+    """
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    contents = await file.read()
-    return detector.predict(contents, "hybrid")
+    if InferenceConfig.PREDICT_MODE == "cascade" and detector.cascade is not None and not wants_profile(request):
+        source = await detector.read_upload(file, "cascade")
+        return detector.respond(await detector.predict_cascade(source), "cascade")
+    return await predict_single(request, file, "hybrid")
+
+@app.post("/predict/cascade", response_model=PredictionResult)
+async def predict_cascade(file: UploadFile = File(...)):
+    """Predict with the fast model, escalating to hybrid only inside the uncertainty band"""
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    source = await detector.read_upload(file, "cascade")
+    result = await detector.predict_cascade(source)
+    return detector.respond(result, "cascade")
+
+@app.post("/predict/ensemble", response_model=EnsembleResult)
+async def predict_ensemble(file: UploadFile = File(...), models: Optional[str] = None,
+                           fusion: Optional[str] = None):
+    """Predict with several models on one upload and fuse the results (models: comma-separated, default all)"""
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    model_names = [name.strip() for name in models.split(',') if name.strip()] if models else None
+    source = await detector.read_upload(file, "ensemble")
+    result = await detector.predict_ensemble(
+        source,
+        model_names,
+        fusion=fusion or InferenceConfig.ENSEMBLE_FUSION,
+        weights=InferenceConfig.ensemble_weights()
+    )
+    return detector.respond(result, "ensemble")
 
 @app.post("/predict/{model_name}", response_model=PredictionResult)
-async def predict_with_model(model_name: str, file: UploadFile = File(...)):
-    """Predict pneumonia using specified model"""
+async def predict_with_model(request: Request, model_name: str, file: UploadFile = File(...)):
+    """Predict pneumonia using specified model (X-Profile: 1 adds a stage timing breakdown)"""
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    contents = await file.read()
-    return detector.predict(contents, model_name)
+    # Checked before anything is recorded under the name, so metric labels stay bounded
+    detector._check_model(model_name)
+    return await predict_single(request, file, model_name)
 
 @app.post("/batch_predict")
 async def batch_predict(files: List[UploadFile] = File(...), model_name: str = "hybrid"):
-    """Batch prediction for multiple images"""
-    if len(files) > 10:
-        raise HTTPException(status_code=400, detail="Maximum 10 files allowed per batch")
+    """Batch prediction for multiple images, streamed back as NDJSON (one line per file, then a summary)"""
+    max_files = InferenceConfig.BATCH_PREDICT_MAX_FILES
+    if len(files) > max_files:
+        raise HTTPException(status_code=400, detail=f"Maximum {max_files} files allowed per batch")
+    detector._check_model(model_name)
     
-    results = []
-    for file in files:
-        if not file.content_type.startswith('image/'):
-            continue
-        
-        try:
-            contents = await file.read()
-            result = detector.predict(contents, model_name)
-            result_dict = result.dict()
-            result_dict['filename'] = file.filename
-            results.append(result_dict)
-        except Exception as e:
-            results.append({
-                'filename': file.filename,
-                'error': str(e),
-                'prediction': None
-            })
-    
-    return {
-        "batch_results": results,
-        "total_processed": len(results),
-        "model_used": model_name
-    }
+    # Admitted before the response starts, so a saturated executor is still a 503
+    detector.executor.acquire()
+    return AdmittedStreamingResponse(
+        detector.executor,
+        detector.predict_stream(files, model_name),
+        media_type="application/x-ndjson"
+    )
+
+@app.exception_handler(ExecutorSaturated)
+async def saturated_exception_handler(request, exc):
+    """Back-pressure: tell clients to retry instead of queueing without bound"""
+    logger.warning(f"Rejecting request: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
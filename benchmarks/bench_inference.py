@@ -0,0 +1,325 @@
+"""
+Inference Benchmark
+Images/sec and p50/p95/p99 latency for every model and entry point, on
+synthetic X-ray-shaped images so no dataset is needed:
+
+    model      raw forward passes per batch size, for each model and precision
+               (quantized variants are included when the server would serve them)
+    api        PneumoniaDetectorAPI.predict with 1..N concurrent callers
+    streamlit  PneumoniaDetectorApp.predict from web_app.py
+    cli        ColabTrainedDetector.predict_batch over a folder of JPEGs
+
+TensorFlow fixes its thread pools when it starts, so every thread count (and
+inference engine, compiled or plain keras model.predict, and backend: tf,
+onnx or tflite) runs in a fresh process. Results are written as JSON (one flat row per
+measurement) so runs from different commits can be diffed.
+
+Usage:
+    python benchmarks/bench_inference.py --output bench.json
+    python benchmarks/bench_inference.py --paths model --batch_sizes 1 8 32 --threads 1 2 4
+    python benchmarks/bench_inference.py --paths model api --batch_sizes 1 --engines compiled keras
+    python benchmarks/bench_inference.py --paths model api --backends tf onnx tflite
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+
+PATHS = ('model', 'api', 'streamlit', 'cli')
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+
+# web_app.py labels its models by display name
+STREAMLIT_NAMES = {'hybrid': 'Hybrid Model (Best)', 'resnet50': 'ResNet50 Classifier'}
+CLI_MODEL_FILES = [('hybrid', 'hybrid_model_colab.h5'), ('resnet50', 'resnet_classifier_colab.h5'),
+                   ('autoencoder', 'autoencoder_colab.h5')]
+
+def synthetic_xrays(count, size=1024, seed=0):
+    """Distinct grayscale JPEGs shaped like chest X-ray exports (distinct so no cache can answer)"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(-1, 1, size)
+    # Bright mediastinum, darker lung fields, a vignette towards the edges
+    base = 200 * np.exp(-(x[np.newaxis] / 0.25) ** 2) + 90 * (1 - np.abs(x)[:, np.newaxis] ** 2)
+    images = []
+    for _ in range(count):
+        pixels = np.clip(base + rng.normal(0, 12, (size, size)), 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels, mode='L').save(buffer, 'JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+def summarize(latencies, images, wall):
+    """images/sec over the timed window plus latency percentiles in ms"""
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'images': images,
+        'images_per_sec': images / wall if wall else 0.0,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean())
+    }
+
+def timed_calls(fn, iterations, max_seconds):
+    """Call fn up to iterations times (at least 3, stopping after max_seconds); returns latencies and wall time"""
+    fn()  # warm-up
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < iterations:
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+        if len(latencies) >= 3 and time.perf_counter() - started > max_seconds:
+            break
+    return latencies, time.perf_counter() - started
+
+class _TimedModel:
+    """Wraps a model to record the latency of each predict call"""
+
+    def __init__(self, model):
+        self.model = model
+        self.latencies = []
+
+    def predict(self, batch, verbose=0):
+        start = time.perf_counter()
+        output = self.model.predict(batch, verbose=verbose)
+        self.latencies.append(time.perf_counter() - start)
+        return output
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+def bench_model(args, images, threads, rows, skipped):
+    from config.inference_config import InferenceConfig
+    from src.models.model_manager import ModelManager
+    from src.models.quantization import TFLiteModel
+    from src.utils.preprocessing import preprocess_batch
+
+    batch = preprocess_batch(images[:max(args.batch_sizes)])
+    for precision in args.precisions:
+        manager = ModelManager(
+            InferenceConfig.MODEL_FILES, models_dir=args.models_dir,
+            classifiers=InferenceConfig.CLASSIFIER_MODELS, precision=precision,
+            max_auc_drop=InferenceConfig.MAX_AUC_DROP, model_format=InferenceConfig.MODEL_FORMAT,
+            backend=InferenceConfig.MODEL_BACKEND
+        )
+        for model_name in args.models:
+            if manager.precisions.get(model_name) != precision:
+                skipped.append({'path': 'model', 'model': model_name, 'precision': precision,
+                                'reason': 'not available at this precision'})
+                continue
+            path = manager.paths[model_name]
+            # The interpreter takes its thread count at construction
+            model = TFLiteModel(path, num_threads=threads or None) if path.endswith('.tflite') else manager.get(model_name)
+            for batch_size in args.batch_sizes:
+                inputs = batch[:batch_size]
+                latencies, wall = timed_calls(lambda: model.predict(inputs, verbose=0), args.iterations, args.max_seconds)
+                rows.append({'path': 'model', 'model': model_name, 'precision': precision,
+                             'format': os.path.basename(path), 'batch_size': batch_size,
+                             **summarize(latencies, batch_size * len(latencies), wall)})
+                report(rows[-1])
+
+def bench_api(args, images, threads, rows, skipped):
+    from api_server import detector
+
+    for precision in args.precisions:
+        detector.load_models(precision)
+        for model_name in args.models:
+            if detector.model_manager.precisions.get(model_name) != precision:
+                skipped.append({'path': 'api', 'model': model_name, 'precision': precision,
+                                'reason': 'not available at this precision'})
+                continue
+            detector.predict(images[0], model_name)  # load and warm up
+            for concurrency in args.concurrency:
+                requests = max(args.iterations, concurrency) * concurrency
+                latencies = []
+
+                def call(i):
+                    start = time.perf_counter()
+                    detector.predict(images[i % len(images)], model_name)
+                    latencies.append(time.perf_counter() - start)
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(call, range(requests)))
+                wall = time.perf_counter() - started
+                rows.append({'path': 'api', 'model': model_name, 'precision': precision,
+                             'concurrency': concurrency, **summarize(latencies, requests, wall)})
+                report(rows[-1])
+
+def bench_streamlit(args, images, threads, rows, skipped):
+    try:
+        import web_app
+    except ImportError as e:
+        skipped.append({'path': 'streamlit', 'reason': f"web_app.py not importable: {str(e)}"})
+        return
+
+    app = web_app.PneumoniaDetectorApp()  # loads from ./models, as the app does
+    pil_images = [Image.open(io.BytesIO(data)) for data in images]
+    for model_name in args.models:
+        display_name = STREAMLIT_NAMES.get(model_name)
+        if display_name not in app.models:
+            skipped.append({'path': 'streamlit', 'model': model_name, 'reason': 'model not loaded by web_app'})
+            continue
+        counter = itertools.count()
+        latencies, wall = timed_calls(
+            lambda: app.predict(pil_images[next(counter) % len(pil_images)], display_name),
+            args.iterations, args.max_seconds
+        )
+        rows.append({'path': 'streamlit', 'model': model_name, 'precision': 'fp32',
+                     'batch_size': 1, **summarize(latencies, len(latencies), wall)})
+        report(rows[-1])
+
+def bench_cli(args, images, threads, rows, skipped):
+    try:
+        from colab_local_inference import ColabTrainedDetector
+    except ImportError as e:
+        skipped.append({'path': 'cli', 'reason': f"colab_local_inference.py not importable: {str(e)}"})
+        return
+
+    detector = ColabTrainedDetector(args.models_dir)
+    # The CLI always serves the first model file it finds, in this order
+    model_name = next(name for name, file in CLI_MODEL_FILES
+                      if os.path.exists(os.path.join(args.models_dir, file)))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.cli_images):
+            path = os.path.join(tmp, f'{i:05d}.jpeg')
+            with open(path, 'wb') as f:
+                f.write(images[i % len(images)])
+            paths.append(path)
+
+        for batch_size in args.batch_sizes:
+            timed = detector.model = _TimedModel(detector.model)
+            detector.predict_batch(paths[:batch_size], batch_size=batch_size)  # warm-up
+            timed.latencies.clear()
+            started = time.perf_counter()
+            summary = detector.predict_batch(paths, batch_size=batch_size, workers=threads or None)
+            wall = time.perf_counter() - started
+            detector.model = timed.model
+            # Latency is the forward pass per batch; images/sec includes decoding
+            rows.append({'path': 'cli', 'model': model_name, 'precision': 'fp32',
+                         'batch_size': batch_size, **summarize(timed.latencies, summary.total, wall)})
+            report(rows[-1])
+
+BENCHES = {'model': bench_model, 'api': bench_api, 'streamlit': bench_streamlit, 'cli': bench_cli}
+
+def report(row):
+    size = f"batch {row['batch_size']:>2}" if 'batch_size' in row else f"conc. {row['concurrency']:>2}"
+    print(f"  {row['path']:9} {row['model']:22} {row['precision']:7} {size} | "
+          f"{row['images_per_sec']:8.1f} img/s | p50 {row['p50_ms']:8.1f} ms  "
+          f"p95 {row['p95_ms']:8.1f} ms  p99 {row['p99_ms']:8.1f} ms", file=sys.stderr)
+
+def run_worker(args, threads):
+    """Benchmark every requested path with TensorFlow limited to threads (0 = its default)"""
+    import tensorflow as tf
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    images = synthetic_xrays(max(max(args.batch_sizes), 16), args.image_size)
+    rows, skipped = [], []
+    for path in args.paths:
+        try:
+            BENCHES[path](args, images, threads, rows, skipped)
+        except Exception as e:
+            skipped.append({'path': path, 'reason': f"{type(e).__name__}: {str(e)}"})
+    for row in rows + skipped:
+        row['threads'] = threads
+        row['engine'] = os.environ.get('INFERENCE_ENGINE', 'compiled')
+        row['backend'] = os.environ.get('MODEL_BACKEND', 'tf')
+    return {'rows': rows, 'skipped': skipped, 'tensorflow': tf.__version__}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    from src.models.backends import BACKENDS
+    from src.models.engine import ENGINES
+    from src.models.quantization import FULL_PRECISION, PRECISIONS
+
+    parser = argparse.ArgumentParser(description='Benchmark inference throughput and latency')
+    parser.add_argument('--models_dir', type=str, default='models')
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS), help='Entry points to benchmark')
+    parser.add_argument('--models', nargs='+', default=['hybrid', 'resnet50'])
+    parser.add_argument('--precisions', nargs='+', choices=(FULL_PRECISION,) + PRECISIONS,
+                        default=[FULL_PRECISION] + list(PRECISIONS),
+                        help='Quantized variants are skipped unless quantize_models.py produced a passing one')
+    parser.add_argument('--batch_sizes', nargs='+', type=int, default=list(BATCH_SIZES))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8], help='Concurrent API callers')
+    parser.add_argument('--threads', nargs='+', type=int, default=[0], help='TensorFlow thread counts (0 = default)')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=['compiled'],
+                        help='Inference engines (keras = plain model.predict, to see the per-call overhead)')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['tf'],
+                        help='Model backends (onnx/tflite need convert_models.py exports, else they run tf)')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed calls per measurement')
+    parser.add_argument('--max_seconds', type=float, default=30, help='Time cap per measurement (after 3 calls)')
+    parser.add_argument('--image_size', type=int, default=1024, help='Edge length of the synthetic source images')
+    parser.add_argument('--cli_images', type=int, default=128, help='Images in the CLI batch folder')
+    parser.add_argument('--output', type=str, default=None, help='Write results as JSON')
+    parser.add_argument('--worker', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        # Everything but the final JSON line goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_worker(args, args.worker)
+        print(json.dumps(result))
+        return
+
+    # No cached answers, so every call runs a forward pass
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3', PREDICTION_CACHE_SIZE='0', MODELS_DIR=args.models_dir)
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'cpu_count': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'worker')},
+        'results': [],
+        'skipped': []
+    }
+    for threads, engine, backend in itertools.product(args.threads, args.engines, args.backends):
+        print(f"\n🧵 threads={threads or 'default'} engine={engine} backend={backend}")
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + ['--worker', str(threads)],
+            stdout=subprocess.PIPE, text=True, env=dict(env, INFERENCE_ENGINE=engine, MODEL_BACKEND=backend)
+        )
+        if completed.returncode != 0:
+            print(f"  worker failed with exit code {completed.returncode}")
+            continue
+        worker = json.loads(completed.stdout.strip().splitlines()[-1])
+        results['tensorflow'] = worker['tensorflow']
+        results['results'].extend(worker['rows'])
+        results['skipped'].extend(worker['skipped'])
+
+    reasons = {}
+    for entry in results['skipped']:
+        label = ' '.join(entry[key] for key in ('path', 'model', 'precision', 'engine', 'backend') if key in entry)
+        reasons.setdefault(label, entry['reason'])
+    for label, reason in reasons.items():
+        print(f"  skipped {label}: {reason}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
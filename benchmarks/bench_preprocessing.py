@@ -0,0 +1,84 @@
+"""
+Preprocessing Microbenchmark
+Compares the original per-file preprocess_image copies (PIL → img_to_array →
+expand_dims → float64 / 255) with the shared src/utils/preprocessing path.
+
+Usage:
+    python benchmarks/bench_preprocessing.py --size 2048 --batch 32 --repeat 5
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.utils.preprocessing import preprocess_image, preprocess_batch, new_batch
+
+try:
+    from tensorflow.keras.preprocessing.image import img_to_array
+except ImportError:
+    # Same result as keras img_to_array for an RGB image
+    def img_to_array(img):
+        return np.asarray(img, dtype='float32')
+
+def legacy_preprocess(img_bytes, target_size=(224, 224)):
+    """The code previously copy-pasted into every entry point"""
+    img = Image.open(io.BytesIO(img_bytes))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img = img.resize(target_size)
+    img_array = img_to_array(img)
+    img_array = np.expand_dims(img_array, axis=0)
+    img_array = img_array / 255.0
+    return img_array
+
+def synthetic_xray(size, fmt):
+    """Smooth grayscale image shaped like a chest X-ray export"""
+    x = np.linspace(0, 6 * np.pi, size)
+    pixels = ((np.outer(np.sin(x) + 1, np.cos(x / 2) + 1) * 63) % 256).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, mode='L').save(buffer, fmt)
+    return buffer.getvalue()
+
+def time_it(fn, repeat):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Preprocessing microbenchmark')
+    parser.add_argument('--size', type=int, default=2048, help='Source image edge length in pixels')
+    parser.add_argument('--batch', type=int, default=32, help='Images per batch')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions (best is reported)')
+    args = parser.parse_args()
+
+    print(f"Preprocessing benchmark: {args.size}x{args.size} source, batch of {args.batch}")
+    print("=" * 60)
+
+    for fmt in ('JPEG', 'PNG'):
+        data = synthetic_xray(args.size, fmt)
+        images = [data] * args.batch
+        buffer = new_batch(args.batch)
+
+        legacy_single = time_it(lambda: legacy_preprocess(data), args.repeat)
+        shared_single = time_it(lambda: preprocess_image(data), args.repeat)
+        legacy_batch = time_it(lambda: np.concatenate([legacy_preprocess(d) for d in images]), args.repeat)
+        shared_batch = time_it(lambda: preprocess_batch(images, out=buffer), args.repeat)
+
+        diff = np.abs(legacy_preprocess(data) - preprocess_image(data)).max()
+        print(f"{fmt:5} single: legacy {legacy_single * 1000:8.2f} ms | shared {shared_single * 1000:8.2f} ms "
+              f"| {legacy_single / shared_single:5.1f}x")
+        print(f"{fmt:5} batch : legacy {legacy_batch * 1000:8.2f} ms | shared {shared_batch * 1000:8.2f} ms "
+              f"| {legacy_batch / shared_batch:5.1f}x")
+        print(f"{fmt:5} max abs pixel difference: {diff:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Startup Benchmark
+Time-to-first-prediction of each model in every available format (.h5,
+Keras v3, traced SavedModel). Each run is a fresh Python process, so the
+numbers include importing TensorFlow, loading the file and the first
+forward pass, as a new API worker or container would pay them.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 3 --output startup.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+from src.models.artifacts import artifact_path
+
+# Runs in the child process; prints one JSON line of timings
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+import tensorflow as tf
+imported = time.perf_counter()
+from src.models.registry import _default_loader
+model = _default_loader({path!r}, compile=False)
+loaded = time.perf_counter()
+shape = tuple(dim or 1 for dim in model.input_shape)
+model.predict(np.zeros(shape, dtype=np.float32), verbose=0)
+first = time.perf_counter()
+model.predict(np.zeros(shape, dtype=np.float32), verbose=0)
+second = time.perf_counter()
+print(json.dumps({{
+    'import_s': imported - start,
+    'load_s': loaded - imported,
+    'first_predict_s': first - loaded,
+    'second_predict_s': second - first,
+    'time_to_first_prediction_s': first - start
+}}))
+"""
+
+def run_once(path):
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(root=ROOT, path=path)],
+        capture_output=True, text=True, env=env, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark model startup per artifact format')
+    parser.add_argument('--models_dir', type=str, default='models')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh processes per model and format')
+    parser.add_argument('--output', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for model_path in sorted(glob.glob(os.path.join(args.models_dir, '*.h5'))):
+        name = os.path.basename(model_path)
+        candidates = {'h5': model_path}
+        for fmt in ('keras', 'traced'):
+            path = artifact_path(model_path, fmt)
+            if os.path.exists(path):
+                candidates[fmt] = path
+
+        results[name] = {}
+        print(f"\n🧠 {name}")
+        for fmt, path in candidates.items():
+            try:
+                runs = [run_once(path) for _ in range(args.repeat)]
+            except subprocess.CalledProcessError as e:
+                print(f"  {fmt:7} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+                continue
+            summary = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+            results[name][fmt] = summary
+            print(f"  {fmt:7} first prediction after {summary['time_to_first_prediction_s']:6.2f}s "
+                  f"(import {summary['import_s']:.2f}s, load {summary['load_s']:.2f}s, "
+                  f"first forward {summary['first_predict_s']:.2f}s)")
+
+        if len(candidates) == 1:
+            print("  (run convert_models.py to compare the converted formats)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
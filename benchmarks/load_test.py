@@ -0,0 +1,305 @@
+"""
+HTTP Load Test
+Starts api_server.py under uvicorn with tiny stand-in Keras models, so no
+trained weights or network access are needed, and drives /predict,
+/predict/{model_name} and /batch_predict with synthetic X-ray uploads.
+
+Each scenario runs either closed loop (--concurrency clients sending back to
+back) or open loop (--rate requests/sec, with --concurrency capping requests
+in flight; arrivals beyond the cap are counted as dropped). Reports
+throughput, p50/p95/p99 latency, error rates by status code and the server's
+event-loop lag (from /stats), as text and optionally JSON.
+
+Stand-ins are written only for model files that do not exist yet, so
+pointing --models_dir at real weights load-tests those instead.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1 8 32 --duration 15
+    python benchmarks/load_test.py --rate 20 --endpoints predict --output load.json
+    python benchmarks/load_test.py --env BATCH_MAX_WAIT_MS=0 --env INFERENCE_WORKERS=1
+    python benchmarks/load_test.py --url http://localhost:8000   # an already running server
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+from config.inference_config import InferenceConfig
+from bench_inference import synthetic_xrays, git_commit
+
+ENDPOINTS = ('predict', 'predict_model', 'batch_predict')
+
+def build_standin_models(models_dir):
+    """Write tiny two-class Keras models under the classifier file names (existing files are kept)"""
+    missing = [
+        os.path.join(models_dir, InferenceConfig.MODEL_FILES[name]) for name in InferenceConfig.CLASSIFIER_MODELS
+        if not os.path.exists(os.path.join(models_dir, InferenceConfig.MODEL_FILES[name]))
+    ]
+    if not missing:
+        return []
+
+    import tensorflow as tf
+
+    os.makedirs(models_dir, exist_ok=True)
+    for i, path in enumerate(missing):
+        tf.keras.utils.set_random_seed(i)
+        model = tf.keras.Sequential([
+            tf.keras.Input((224, 224, 3)),
+            tf.keras.layers.AveragePooling2D(8),
+            tf.keras.layers.Conv2D(4, 3, activation='relu'),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(2, activation='softmax')
+        ])
+        model.save(path)
+    return missing
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(models_dir, port, workers, env_overrides, cache):
+    """
+    Launch uvicorn on api_server:app and wait until /health/ready passes
+
+    /health answers 200 while models are still warming up, so measuring
+    after it would overlap the warm-up. Each worker warms up on its own and
+    requests land on whichever worker accepts them, so several ready
+    answers in a row are required.
+    """
+    import httpx
+
+    env = dict(os.environ, MODELS_DIR=models_dir, TF_CPP_MIN_LOG_LEVEL='3',
+               MODEL_PRELOAD=','.join(InferenceConfig.CLASSIFIER_MODELS))
+    if not cache:
+        env['PREDICTION_CACHE_SIZE'] = '0'  # every request runs a forward pass
+    env.update(env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api_server:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 180
+    ready_in_a_row = 0
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"api_server exited with code {process.returncode}")
+        try:
+            ready = httpx.get(f'{url}/health/ready', timeout=2).status_code == 200
+        except httpx.HTTPError:
+            ready = False
+        ready_in_a_row = ready_in_a_row + 1 if ready else 0
+        if ready_in_a_row >= 3 * workers:
+            return process, url
+        time.sleep(0.1 if ready else 0.5)
+    process.terminate()
+    raise RuntimeError("api_server did not become ready within 180s")
+
+class Scenario:
+    """One endpoint at one load level; collects per-request outcomes"""
+
+    def __init__(self, endpoint, model_name, images, batch_files):
+        self.endpoint = endpoint
+        self.model_name = model_name
+        self.images = images
+        self.batch_files = batch_files
+        self.latencies = []
+        self.statuses = {}
+        self.item_errors = 0
+        self.dropped = 0
+        self._sent = 0
+
+    @property
+    def images_per_request(self):
+        return self.batch_files if self.endpoint == 'batch_predict' else 1
+
+    def _image(self):
+        self._sent += 1
+        return self.images[self._sent % len(self.images)]
+
+    async def request(self, client):
+        if self.endpoint == 'batch_predict':
+            files = [('files', (f'{i}.jpeg', self._image(), 'image/jpeg')) for i in range(self.batch_files)]
+            call = client.post('/batch_predict', params={'model_name': self.model_name}, files=files)
+        else:
+            path = '/predict' if self.endpoint == 'predict' else f'/predict/{self.model_name}'
+            call = client.post(path, files={'file': ('xray.jpeg', self._image(), 'image/jpeg')})
+
+        start = time.perf_counter()
+        try:
+            response = await call
+            status = str(response.status_code)
+            if self.endpoint == 'batch_predict' and response.status_code == 200:
+                # The last NDJSON line is the summary
+                self.item_errors += json.loads(response.text.strip().splitlines()[-1]).get('total_failed', 0)
+        except Exception as e:
+            status = type(e).__name__
+        self.latencies.append(time.perf_counter() - start)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, wall):
+        ok = self.statuses.get('200', 0)
+        total = sum(self.statuses.values())
+        latencies = np.asarray(self.latencies or [0.0]) * 1000
+        return {
+            'requests': total,
+            'ok': ok,
+            'dropped': self.dropped,
+            'error_rate': (total - ok) / total if total else 0.0,
+            'statuses': dict(sorted(self.statuses.items())),
+            'item_errors': self.item_errors,
+            'requests_per_sec': total / wall if wall else 0.0,
+            'images_per_sec': ok * self.images_per_request / wall if wall else 0.0,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max())
+        }
+
+async def closed_loop(scenario, client, concurrency, duration):
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await scenario.request(client)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+async def open_loop(scenario, client, concurrency, duration, rate):
+    in_flight = set()
+    started = time.perf_counter()
+    for n in range(int(duration * rate)):
+        # Fixed arrival schedule, independent of how fast responses come back
+        await asyncio.sleep(max(0.0, started + n / rate - time.perf_counter()))
+        if len(in_flight) >= concurrency:
+            scenario.dropped += 1
+            continue
+        task = asyncio.ensure_future(scenario.request(client))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+async def server_loop_lag(client):
+    try:
+        return (await client.get('/stats')).json().get('event_loop')
+    except Exception:
+        return None
+
+async def run_scenario(url, endpoint, args, images, concurrency):
+    import httpx
+
+    scenario = Scenario(endpoint, args.model, images, args.batch_files)
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        # Untimed warm-up so first-request costs are not in the numbers
+        await scenario.request(client)
+        scenario.latencies, scenario.statuses, scenario.item_errors = [], {}, 0
+
+        lag_before = await server_loop_lag(client)
+        started = time.perf_counter()
+        if args.rate:
+            await open_loop(scenario, client, concurrency, args.duration, args.rate)
+        else:
+            await closed_loop(scenario, client, concurrency, args.duration)
+        wall = time.perf_counter() - started
+        lag_after = await server_loop_lag(client)
+
+    result = {'endpoint': endpoint, 'concurrency': concurrency, 'rate': args.rate, **scenario.summary(wall)}
+    if lag_before and lag_after:
+        samples = lag_after['samples'] - lag_before['samples']
+        # The mean covers exactly this scenario; percentiles cover the server's recent window
+        result['event_loop_lag'] = {
+            'mean_ms': (lag_after['total_lag_ms'] - lag_before['total_lag_ms']) / samples if samples else 0.0,
+            'recent_p99_ms': lag_after['recent_p99_ms'],
+            'recent_max_ms': lag_after['recent_max_ms']
+        }
+    return result
+
+def report(result):
+    lag = result.get('event_loop_lag')
+    print(f"  {result['endpoint']:13} conc {result['concurrency']:>3} | {result['requests_per_sec']:7.1f} req/s "
+          f"{result['images_per_sec']:7.1f} img/s | p50 {result['p50_ms']:7.1f}  p95 {result['p95_ms']:7.1f}  "
+          f"p99 {result['p99_ms']:7.1f} ms | errors {result['error_rate']:5.1%} {result['statuses']}"
+          + (f" dropped {result['dropped']}" if result['dropped'] else "")
+          + (f" | loop lag mean {lag['mean_ms']:.1f} p99 {lag['recent_p99_ms']:.1f} ms" if lag else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test api_server with stand-in models')
+    parser.add_argument('--url', type=str, default=None, help='Test a running server instead of starting one')
+    parser.add_argument('--models_dir', type=str, default=None,
+                        help='Directory for the stand-in models (default: a temporary directory)')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--model', type=str, default='resnet50', help='Model for /predict/{model_name} and /batch_predict')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32],
+                        help='Clients (closed loop) or max requests in flight (with --rate)')
+    parser.add_argument('--rate', type=float, default=0, help='Open-loop requests/sec (0 = closed loop)')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per scenario')
+    parser.add_argument('--batch_files', type=int, default=16, help='Images per /batch_predict request')
+    parser.add_argument('--image_size', type=int, default=1024, help='Edge length of the synthetic uploads')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Extra server environment, e.g. BATCH_MAX_SIZE=32 (repeatable)')
+    parser.add_argument('--cache', action='store_true', help='Keep the prediction cache enabled')
+    parser.add_argument('--output', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("❌ The load test needs httpx: pip install httpx")
+        sys.exit(1)
+
+    env_overrides = dict(item.split('=', 1) for item in args.env)
+    images = synthetic_xrays(32, args.image_size)
+    process, url, models_dir = None, args.url, None
+    if url is None:
+        models_dir = args.models_dir or tempfile.mkdtemp(prefix='loadtest-models-')
+        created = build_standin_models(models_dir)
+        if created:
+            print(f"🧪 Wrote stand-in models: {', '.join(os.path.basename(p) for p in created)}")
+        process, url = start_server(os.path.abspath(models_dir), free_port(), args.workers, env_overrides, args.cache)
+        print(f"🚀 api_server up at {url} ({args.workers} worker(s))")
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'cpu_count': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'scenarios': []
+    }
+    try:
+        mode = f"open loop at {args.rate:g} req/s" if args.rate else "closed loop"
+        print(f"\n📈 {mode}, {args.duration:g}s per scenario")
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_scenario(url, endpoint, args, images, concurrency))
+                results['scenarios'].append(result)
+                report(result)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if models_dir and args.models_dir is None:
+            shutil.rmtree(models_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Cascade threshold calibration
+Scores the test split with the cascade's fast model and the expensive model
+(hybrid), then picks the narrowest uncertainty band whose answers agree with
+the expensive model on at least --target_agreement of the images. The band
+is saved to models/cascade_thresholds.json (or CASCADE_THRESHOLDS), which
+the API reads at startup for /predict/cascade and PREDICT_MODE=cascade.
+
+Usage:
+    python calibrate_cascade.py --data_dir data/chest_xray/test --target_agreement 0.99
+    python calibrate_cascade.py --fast_model hybrid:int8 --samples 600
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.append('.')
+from config.inference_config import InferenceConfig
+from src.models.cascade import calibrate_band, parse_model_spec
+from src.models.model_manager import ModelManager
+from src.models.quantization import evaluate
+from src.utils.datasets import find_test_dir, sample_test_split, load_images
+
+REPORT_TARGETS = (0.95, 0.98, 0.99, 0.995, 1.0)
+
+def main():
+    parser = argparse.ArgumentParser(description='Pick cascade thresholds for a target agreement with the expensive model')
+    parser.add_argument('--models_dir', type=str, default=InferenceConfig.MODELS_DIR)
+    parser.add_argument('--data_dir', type=str, default=None, help='Test split with NORMAL/ and PNEUMONIA/ subfolders')
+    parser.add_argument('--samples', type=int, default=600, help='Images scored by both models')
+    parser.add_argument('--fast_model', type=str, default=InferenceConfig.CASCADE_FAST_MODEL,
+                        help='Model name, or e.g. hybrid:int8 for a quantized variant')
+    parser.add_argument('--model', type=str, default=InferenceConfig.CASCADE_MODEL, help='Expensive model')
+    parser.add_argument('--target_agreement', type=float, default=0.99,
+                        help="Fraction of images where the cascade must give the expensive model's answer")
+    parser.add_argument('--output', type=str, default=None,
+                        help='Thresholds file (default: CASCADE_THRESHOLDS or models/cascade_thresholds.json)')
+    args = parser.parse_args()
+
+    print("🪜 Cascade threshold calibration")
+    print("=" * 70)
+
+    test_dir = find_test_dir(args.data_dir)
+    if not test_dir:
+        print("❌ No test split found. Pass --data_dir pointing at a folder with NORMAL/ and PNEUMONIA/")
+        return
+
+    # The models exactly as the API would serve them (backend, format, precision)
+    manager = ModelManager(
+        InferenceConfig.MODEL_FILES, models_dir=args.models_dir,
+        classifiers=InferenceConfig.CLASSIFIER_MODELS, precision=InferenceConfig.MODEL_PRECISION,
+        max_auc_drop=InferenceConfig.MAX_AUC_DROP, model_format=InferenceConfig.MODEL_FORMAT,
+        backend=InferenceConfig.MODEL_BACKEND
+    )
+    fast_model, precision = parse_model_spec(args.fast_model)
+    try:
+        if precision:
+            fast_model = manager.register_variant(fast_model, precision, InferenceConfig.MAX_AUC_DROP)
+    except Exception as e:
+        print(f"❌ {str(e)}")
+        return
+    missing = [name for name in (fast_model, args.model) if name not in manager.available]
+    if missing:
+        print(f"❌ Models not found in {args.models_dir}: {', '.join(missing)}")
+        return
+
+    paths, labels = sample_test_split(test_dir, args.samples, seed=42)
+    print(f"Test split: {test_dir} ({len(paths)} images)")
+    images = load_images(paths)
+
+    results = {}
+    for name in (fast_model, args.model):
+        results[name] = evaluate(manager.get(name), images, labels)
+        print(f"  {name:22} | latency {results[name]['latency_ms']:7.1f} ms | AUC {results[name]['auc']:.4f} "
+              f"| acc {results[name]['accuracy']:.2%}")
+
+    fast, full = results[fast_model], results[args.model]
+    fast_scores = fast['probabilities'][:, 1]
+    full_labels = full['probabilities'].argmax(axis=1)
+    print(f"\nFast model alone agrees with {args.model} on {(fast['probabilities'].argmax(axis=1) == full_labels).mean():.2%}")
+
+    def describe(band):
+        final = full_labels.copy()
+        outside = (fast_scores < band['low']) | (fast_scores > band['high'])
+        final[outside] = fast_scores[outside] > band['high']
+        # Expected cost per image: the fast pass always, the expensive one for escalated images
+        cost = fast['latency_ms'] + band['escalation_rate'] * full['latency_ms']
+        return {**band, 'accuracy': float((final == labels).mean()), 'expected_latency_ms': cost}
+
+    print(f"\n  {'target':>7} | {'band':>15} | {'escalated':>9} | {'agreement':>9} | {'accuracy':>8} | {'est. latency':>12}")
+    for target in sorted(set(REPORT_TARGETS) | {args.target_agreement}):
+        band = describe(calibrate_band(fast_scores, full_labels, target))
+        print(f"  {target:7.3f} | [{band['low']:.3f}, {band['high']:.3f}] | {band['escalation_rate']:9.1%} "
+              f"| {band['agreement']:9.2%} | {band['accuracy']:8.2%} | {band['expected_latency_ms']:9.1f} ms"
+              f"{' <' if target == args.target_agreement else ''}")
+
+    chosen = describe(calibrate_band(fast_scores, full_labels, args.target_agreement))
+    thresholds = {
+        'fast_model': fast_model,
+        'model': args.model,
+        'low': chosen['low'],
+        'high': chosen['high'],
+        'target_agreement': args.target_agreement,
+        'agreement': chosen['agreement'],
+        'escalation_rate': chosen['escalation_rate'],
+        'accuracy': chosen['accuracy'],
+        'fast_accuracy': fast['accuracy'],
+        'model_accuracy': full['accuracy'],
+        'expected_latency_ms': chosen['expected_latency_ms'],
+        'model_latency_ms': full['latency_ms'],
+        # The API ignores the band once either model's contents change
+        'model_hashes': {name: manager.content_hash(name) for name in (fast_model, args.model)},
+        'test_dir': test_dir,
+        'samples': len(paths),
+        'created': datetime.now().isoformat()
+    }
+    output = args.output or InferenceConfig.CASCADE_THRESHOLDS or os.path.join(args.models_dir, 'cascade_thresholds.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(thresholds, f, indent=2)
+
+    print(f"\n✅ Band [{chosen['low']:.3f}, {chosen['high']:.3f}]: {chosen['escalation_rate']:.1%} of images reach "
+          f"{args.model}, {chosen['agreement']:.2%} agreement, ~{chosen['expected_latency_ms']:.1f} ms per image "
+          f"vs {full['latency_ms']:.1f} ms for {args.model} alone")
+    print(f"Saved to {output}")
+    print("\nServe it with: PREDICT_MODE=cascade python api_server.py (or POST /predict/cascade)")
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,16 @@ Use this script on your laptop with models trained on Google Colab
 """
 import numpy as np
 import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import matplotlib.pyplot as plt
 import argparse
 import os
+import time
+from PIL import Image
+
+from src.models.backends import load_inference_model
+from src.utils.preprocessing import load_image, image_to_array
+from src.utils.image_pipeline import find_images, image_batches
+from src.utils.results_writer import RESULT_FORMATS, ResultsSummary, open_results_writer
 
 class ColabTrainedDetector:
     def __init__(self, models_dir="models"):
@@ -33,7 +38,7 @@ class ColabTrainedDetector:
             if os.path.exists(model_path):
                 print(f"Loading {model_name} from {model_path}")
                 try:
-                    model = load_model(model_path)
+                    model = load_inference_model(model_path)
                     print(f"✅ {model_name} loaded successfully!")
                     return model
                 except Exception as e:
@@ -50,13 +55,9 @@ class ColabTrainedDetector:
     def preprocess_image(self, img_path):
         """Preprocess image for Colab-trained model"""
         
-        if not os.path.exists(img_path):
-            raise FileNotFoundError(f"Image not found: {img_path}")
-        
-        img = image.load_img(img_path, target_size=(self.img_height, self.img_width))
-        img_array = image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array = img_array / 255.0
+        # Nearest-neighbour resize, as keras load_img (used in training) does
+        img = load_image(img_path, (self.img_height, self.img_width), resample=Image.NEAREST)
+        img_array = image_to_array(img)[np.newaxis]
         
         return img_array, img
     
@@ -90,56 +91,111 @@ class ColabTrainedDetector:
             }
         }
     
-    def predict_batch(self, img_paths):
-        """Make predictions on multiple images"""
-        
-        results = []
-        print(f"Processing {len(img_paths)} images...")
+    def predict_batch(self, img_paths, batch_size=32, workers=None, output=None, output_format=None):
+        """
+        Make predictions on multiple images
+
+        Images are decoded in parallel and scored batch_size at a time
+        through a prefetching tf.data pipeline. Results are not kept in
+        memory: each batch is appended to output (CSV, JSONL or Parquet,
+        flushed per chunk) and folded into the returned ResultsSummary.
+        Images already in output are skipped, so an interrupted run picks up
+        where it stopped.
+        """
         
-        for i, img_path in enumerate(img_paths, 1):
-            try:
-                result = self.predict(img_path, show_image=False)
-                result['image_path'] = img_path
-                results.append(result)
-                
-                print(f"[{i}/{len(img_paths)}] {os.path.basename(img_path)}: "
-                      f"{result['class']} ({result['confidence']:.2%})")
+        summary = ResultsSummary(self.classes)
+        writer = open_results_writer(output, self.classes, output_format) if output else None
+        try:
+            pending = img_paths
+            if writer:
+                # Rebuild the aggregates by streaming over what the previous run wrote
+                for result in writer.read():
+                    summary.update(result)
+                if summary.total:
+                    done = writer.completed_paths()
+                    pending = [p for p in img_paths if p not in done]
+            print(f"Processing {len(pending)} images..."
+                  + (f" ({summary.total} already in {output})" if summary.total else ""))
+            
+            started = last_report = time.time()
+            processed = 0
+            for images, paths, errors in image_batches(
+                pending, (self.img_height, self.img_width), batch_size=batch_size, workers=workers
+            ):
+                predictions = []
+                if len(images):
+                    # predict() is common to every backend; the compiled engine pads short batches to a bucket
+                    predictions = np.asarray(self.model.predict(images, verbose=0))
+                results = []
+                row = 0
+                for img_path, error in zip(paths, errors):
+                    if error:
+                        print(f"❌ Error processing {img_path}: {error}")
+                        summary.failed += 1
+                        continue
+                    probabilities = predictions[row]
+                    row += 1
+                    predicted_class = int(np.argmax(probabilities))
+                    result = {
+                        'image_path': img_path,
+                        'class': self.classes[predicted_class],
+                        'confidence': float(probabilities[predicted_class]),
+                        'probabilities': {
+                            self.classes[i]: float(probabilities[i])
+                            for i in range(len(self.classes))
+                        }
+                    }
+                    summary.update(result)
+                    results.append(result)
                 
-            except Exception as e:
-                print(f"❌ Error processing {img_path}: {str(e)}")
+                if writer:
+                    writer.write(results)
+                processed += len(paths)
+                now = time.time()
+                if now - last_report >= 5 or processed == len(pending):
+                    rate = processed / max(now - started, 1e-9)
+                    eta = (len(pending) - processed) / rate if rate else 0
+                    print(f"[{processed}/{len(pending)}] {rate:.1f} images/sec, ETA {eta:.0f}s")
+                    last_report = now
+        finally:
+            if writer:
+                writer.close()
         
-        return results
+        elapsed = time.time() - started
+        if processed:
+            print(f"✅ Scored {processed - summary.failed} images in {elapsed:.1f}s "
+                  f"({processed / max(elapsed, 1e-9):.1f} images/sec, {summary.failed} failed)")
+        if writer:
+            print(f"💾 Results written to {output}")
+        
+        return summary
     
-    def batch_analysis(self, results):
-        """Analyze batch prediction results"""
+    def batch_analysis(self, summary):
+        """Analyze batch prediction results (a ResultsSummary, or a list of result dicts)"""
+        
+        if not isinstance(summary, ResultsSummary):
+            summary = ResultsSummary.from_results(summary or [], self.classes)
         
-        if not results:
+        if not summary.total:
             print("No results to analyze")
             return
         
-        # Count predictions
-        normal_count = sum(1 for r in results if r['class'] == 'NORMAL')
-        pneumonia_count = len(results) - normal_count
-        
-        # Calculate average confidence
-        avg_confidence = np.mean([r['confidence'] for r in results])
-        
-        # Find high and low confidence predictions
-        high_conf = [r for r in results if r['confidence'] > 0.9]
-        low_conf = [r for r in results if r['confidence'] < 0.7]
+        # Running counts and confidence buckets
+        normal_count = summary.counts.get('NORMAL', 0)
+        pneumonia_count = summary.total - normal_count
         
         print(f"\n📊 BATCH ANALYSIS RESULTS")
         print("="*50)
-        print(f"Total images processed: {len(results)}")
-        print(f"Normal predictions: {normal_count} ({normal_count/len(results)*100:.1f}%)")
-        print(f"Pneumonia predictions: {pneumonia_count} ({pneumonia_count/len(results)*100:.1f}%)")
-        print(f"Average confidence: {avg_confidence:.2%}")
-        print(f"High confidence (>90%): {len(high_conf)} images")
-        print(f"Low confidence (<70%): {len(low_conf)} images")
-        
-        if low_conf:
+        print(f"Total images processed: {summary.total}")
+        print(f"Normal predictions: {normal_count} ({normal_count/summary.total*100:.1f}%)")
+        print(f"Pneumonia predictions: {pneumonia_count} ({pneumonia_count/summary.total*100:.1f}%)")
+        print(f"Average confidence: {summary.mean_confidence:.2%}")
+        print(f"High confidence (>90%): {summary.high_confidence} images")
+        print(f"Low confidence (<70%): {summary.low_confidence} images")
+        
+        if summary.low_confidence_examples:
             print(f"\n⚠️ Low confidence predictions:")
-            for r in low_conf[:5]:  # Show first 5
+            for r in summary.low_confidence_examples:  # First 5
                 print(f"  {os.path.basename(r['image_path'])}: {r['class']} ({r['confidence']:.2%})")
 
 def setup_models_directory():
@@ -186,6 +242,13 @@ def main():
     parser.add_argument('--image', type=str, help='Path to single image')
     parser.add_argument('--batch', type=str, help='Path to directory containing images')
     parser.add_argument('--models_dir', type=str, default='models', help='Directory containing trained models')
+    parser.add_argument('--batch_size', type=int, default=32, help='Images per forward pass in --batch mode')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel decode workers (default: autotune)')
+    parser.add_argument('--recursive', action='store_true', help='Include images in subdirectories')
+    parser.add_argument('--output', '--checkpoint', dest='output', type=str, default=None,
+                        help='Results file (.csv, .jsonl or .parquet) to append to and resume from')
+    parser.add_argument('--output_format', type=str, choices=RESULT_FORMATS, default=None,
+                        help='Results format when it is not implied by the --output extension')
     
     args = parser.parse_args()
     
@@ -219,26 +282,25 @@ def main():
                 return
             
             # Get all image files
-            img_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-            img_paths = []
-            
-            for file in os.listdir(args.batch):
-                if any(file.lower().endswith(ext) for ext in img_extensions):
-                    img_paths.append(os.path.join(args.batch, file))
+            img_paths = find_images(args.batch, recursive=args.recursive)
             
             if not img_paths:
                 print(f"❌ No image files found in {args.batch}")
                 return
             
             # Process batch
-            results = detector.predict_batch(img_paths)
-            detector.batch_analysis(results)
+            summary = detector.predict_batch(
+                img_paths, batch_size=args.batch_size, workers=args.workers,
+                output=args.output, output_format=args.output_format
+            )
+            detector.batch_analysis(summary)
         
         else:
             print("Please provide either --image or --batch argument")
             print("\nExamples:")
             print("  python colab_local_inference.py --image data/test/NORMAL/IM-0001-0001.jpeg")
             print("  python colab_local_inference.py --batch data/test/NORMAL/")
+            print("  python colab_local_inference.py --batch data/ --recursive --batch_size 64 --output scores.csv")
     
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -0,0 +1,142 @@
+"""
+Inference Configuration for the Pneumonia Detection API
+Tune model serving behaviour here (override with environment variables in production)
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+class InferenceConfig:
+    """Configuration for model serving"""
+
+    # Model files served by the API (names are used in /predict/{model_name})
+    MODELS_DIR = os.getenv('MODELS_DIR', 'models')
+    MODEL_FILES = {
+        "hybrid": "hybrid_model_colab.h5",
+        "resnet50": "resnet_classifier_colab.h5",
+        "autoencoder": "autoencoder_colab.h5"
+    }
+    CLASSIFIER_MODELS = ("hybrid", "resnet50")
+
+    # Micro-batching: coalesce concurrent requests for the same model
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '16'))
+    BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+
+    # Inference executor: bounded pool for decode/inference work
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', str(min(4, os.cpu_count() or 1))))
+    INFERENCE_MAX_PENDING = int(os.getenv('INFERENCE_MAX_PENDING', '64'))
+    INFERENCE_RETRY_AFTER = int(os.getenv('INFERENCE_RETRY_AFTER', '1'))  # seconds
+
+    # /batch_predict: files per request and images per forward pass
+    BATCH_PREDICT_MAX_FILES = int(os.getenv('BATCH_PREDICT_MAX_FILES', '5000'))
+    BATCH_PREDICT_CHUNK_SIZE = int(os.getenv('BATCH_PREDICT_CHUNK_SIZE', '32'))
+
+    # Upload limits: larger requests get a 413 before their body is read
+    MAX_UPLOAD_BYTES = int(float(os.getenv('MAX_UPLOAD_MB', '50')) * 1024 * 1024)  # per image, 0 = unlimited
+    BATCH_UPLOAD_MAX_BYTES = int(float(os.getenv('BATCH_UPLOAD_MAX_MB', '2048')) * 1024 * 1024)  # whole /batch_predict body
+
+    # Prediction cache: repeat submissions of the same image skip the forward pass
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))  # entries, 0 disables
+    PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '3600'))  # seconds
+    PREDICTION_CACHE_DIR = os.getenv('PREDICTION_CACHE_DIR', '')  # optional on-disk tier
+    PREDICTION_CACHE_DISK_SIZE = int(os.getenv('PREDICTION_CACHE_DISK_SIZE', '100000'))  # files kept, oldest pruned
+
+    # Shared ResNet50 trunk: cached trunk activations (one entry per image, ~0.4-0.8 MB each)
+    ACTIVATION_CACHE_SIZE = int(os.getenv('ACTIVATION_CACHE_SIZE', '64'))
+
+    # Serving mode: local (models in every API worker) | ipc (one shared inference process, see serve.py)
+    INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'local')
+    INFERENCE_ADDRESS = os.getenv('INFERENCE_ADDRESS', '/tmp/pneumonia-inference.sock')
+    INFERENCE_AUTHKEY = os.getenv('INFERENCE_AUTHKEY', '')  # shared secret between workers and the inference process
+
+    # Lazy model loading: models load on first request; idle ones are evicted LRU over the budget
+    MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', '0'))  # weight memory, 0 = unlimited
+    MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', '')  # e.g. "hybrid" to load at startup
+
+    # Fast-start artifacts (built by convert_models.py): auto | traced | keras | h5
+    MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'auto')  # auto picks traced, then keras, then the original .h5
+
+    # Backend: tf | onnx (ONNX Runtime, CPU) | tflite; exports are built by convert_models.py
+    MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'tf')
+
+    # Inference engine: compiled (fixed-shape tf.functions, see src/models/engine.py) | keras (model.predict)
+    INFERENCE_ENGINE = os.getenv('INFERENCE_ENGINE', 'compiled')
+    ENGINE_BATCH_BUCKETS = os.getenv('ENGINE_BATCH_BUCKETS', '1,2,4,8,16,32')  # batches are padded up to one of these
+    ENGINE_XLA = os.getenv('ENGINE_XLA', 'false').lower() == 'true'  # jit_compile the forward pass
+
+    # Warm-up: synthetic batches through the served classifiers and every batch-size bucket before /health/ready passes
+    MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'true').lower() == 'true'
+    WARMUP_MODELS = os.getenv('WARMUP_MODELS', '')  # e.g. "hybrid"; default MODEL_PRELOAD, else the classifiers (capped to the memory budget)
+    WARMUP_BATCH_SIZES = os.getenv('WARMUP_BATCH_SIZES', '')  # default the engine buckets up to the largest batch served
+    WARMUP_ITERATIONS = int(os.getenv('WARMUP_ITERATIONS', '2'))  # passes per batch size (the first traces)
+
+    # CPU threads: tune_threads.py measures the best thread/worker combination per host and saves it
+    THREAD_CONFIG = os.getenv('THREAD_CONFIG', '')  # tuned config file, default <MODELS_DIR>/thread_tuning.json
+    SERVING_WORKERS = int(os.getenv('WEB_CONCURRENCY', '1'))  # uvicorn worker count (uvicorn reads it too)
+    INTRA_OP_THREADS = int(os.environ['INTRA_OP_THREADS']) if os.getenv('INTRA_OP_THREADS') else None  # overrides the tuned value
+    INTER_OP_THREADS = int(os.environ['INTER_OP_THREADS']) if os.getenv('INTER_OP_THREADS') else None
+    PIN_WORKER_CORES = os.getenv('PIN_WORKER_CORES', '').lower() == 'true' if os.getenv('PIN_WORKER_CORES') else None  # one core set per worker
+
+    # Quantized variants (built by quantize_models.py): fp32 | dynamic | float16 | int8
+    MODEL_PRECISION = os.getenv('MODEL_PRECISION', 'fp32')
+    MAX_AUC_DROP = float(os.getenv('MAX_AUC_DROP', '0.01'))  # refuse variants that lose more AUC than this
+
+    # /predict/ensemble: how per-model probabilities are fused
+    ENSEMBLE_FUSION = os.getenv('ENSEMBLE_FUSION', 'mean')  # mean | max | vote
+    ENSEMBLE_WEIGHTS = os.getenv('ENSEMBLE_WEIGHTS', '')  # e.g. "hybrid=2,resnet50=1"
+
+    # Cascade: a cheap model answers clear-cut images, the expensive one only its uncertainty band (/predict/cascade)
+    PREDICT_MODE = os.getenv('PREDICT_MODE', 'single')  # single (hybrid) | cascade, for /predict
+    CASCADE_FAST_MODEL = os.getenv('CASCADE_FAST_MODEL', 'resnet50')  # a model name, or e.g. "hybrid:int8" for a quantized variant
+    CASCADE_MODEL = os.getenv('CASCADE_MODEL', 'hybrid')
+    CASCADE_THRESHOLDS = os.getenv('CASCADE_THRESHOLDS', '')  # calibrate_cascade.py output, default <MODELS_DIR>/cascade_thresholds.json
+    CASCADE_LOW = float(os.environ['CASCADE_LOW']) if os.getenv('CASCADE_LOW') else None  # overrides the calibrated band
+    CASCADE_HIGH = float(os.environ['CASCADE_HIGH']) if os.getenv('CASCADE_HIGH') else None
+
+    # Request profiling: X-Profile: 1 header or ?profile=1 on /predict returns a stage breakdown
+    PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'true').lower() == 'true'  # honour the flag
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '')  # where sampled captures are written; empty disables them
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # fraction of /predict requests captured
+    PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')  # cprofile | tf (TensorFlow profiler trace)
+
+    @classmethod
+    def ensemble_weights(cls):
+        """Per-model fusion weights parsed from ENSEMBLE_WEIGHTS (missing models weigh 1)"""
+        weights = {}
+        for item in cls.ENSEMBLE_WEIGHTS.split(','):
+            if '=' in item:
+                name, value = item.split('=', 1)
+                weights[name.strip()] = float(value)
+        return weights
+
+    @classmethod
+    def engine_batch_buckets(cls):
+        """Batch-size buckets parsed from ENGINE_BATCH_BUCKETS"""
+        return sorted({int(item) for item in cls.ENGINE_BATCH_BUCKETS.split(',') if item.strip()})
+
+    @classmethod
+    def warmup_models(cls):
+        """Model names listed in WARMUP_MODELS, else MODEL_PRELOAD (None = the manager's classifiers)"""
+        return [name.strip() for name in cls.WARMUP_MODELS.split(',') if name.strip()] or cls.preload_models() or None
+
+    @classmethod
+    def warmup_batch_sizes(cls):
+        """WARMUP_BATCH_SIZES, or every engine bucket up to the largest batch the API forms"""
+        if cls.WARMUP_BATCH_SIZES.strip():
+            return sorted({int(item) for item in cls.WARMUP_BATCH_SIZES.split(',') if item.strip()})
+        largest = max(cls.BATCH_MAX_SIZE, cls.BATCH_PREDICT_CHUNK_SIZE)
+        buckets = cls.engine_batch_buckets()
+        # The bucket a batch of `largest` is padded to is still served
+        return [size for size in buckets if size < largest] + [next((size for size in buckets if size >= largest), largest)]
+
+    @classmethod
+    def memory_budget_bytes(cls):
+        """MODEL_MEMORY_BUDGET_MB in bytes (None when unlimited)"""
+        return int(cls.MODEL_MEMORY_BUDGET_MB * 1024**2) if cls.MODEL_MEMORY_BUDGET_MB > 0 else None
+
+    @classmethod
+    def preload_models(cls):
+        """Model names listed in MODEL_PRELOAD"""
+        return [name.strip() for name in cls.MODEL_PRELOAD.split(',') if name.strip()]
@@ -0,0 +1,113 @@
+"""
+Fast-start model conversion tool
+Converts models/*.h5 into the Keras v3 format and into SavedModels holding
+the traced inference function, stored in models/fast/ under the .h5 content
+hash (and TF version). The API and Streamlit apps pick them up automatically
+(see MODEL_FORMAT); compare startup with benchmarks/bench_startup.py.
+
+It also exports the ONNX graph and float32 TFLite flatbuffer served with
+MODEL_BACKEND=onnx / tflite (ONNX export needs tf2onnx). Every artifact is
+checked against the original's outputs and deleted if it drifts further
+than --tolerance, so a bad export is never served.
+
+Usage:
+    python convert_models.py --formats keras traced
+    python convert_models.py --formats onnx tflite
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('.')
+from tensorflow.keras.models import load_model
+
+from src.models.artifacts import artifact_path, export_traced
+from src.models.backends import export_onnx, export_tflite, load_model_file
+
+FORMATS = ['keras', 'traced', 'onnx', 'tflite']
+
+def check_parity(original, converted, input_shape):
+    """Largest output difference between two models on random inputs"""
+    batch = np.random.default_rng(0).random((2,) + tuple(input_shape[1:]), dtype=np.float32)
+    return float(np.max(np.abs(
+        np.asarray(original.predict(batch, verbose=0)) - np.asarray(converted.predict(batch, verbose=0))
+    )))
+
+def remove_artifact(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert .h5 models to fast-loading formats')
+    parser.add_argument('--models_dir', type=str, default='models', help='Directory containing .h5 models')
+    parser.add_argument('--formats', nargs='+', default=['keras', 'traced'], choices=FORMATS)
+    parser.add_argument('--force', action='store_true', help='Rebuild artifacts that already exist')
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help='Largest output difference from the original an artifact may have')
+    args = parser.parse_args()
+
+    print("⚡ Fast-start model conversion")
+    print("=" * 60)
+
+    model_files = sorted(glob.glob(os.path.join(args.models_dir, '*.h5')))
+    if not model_files:
+        print(f"❌ No .h5 models found in {args.models_dir}")
+        return
+
+    for model_path in model_files:
+        print(f"\n🧠 {os.path.basename(model_path)}")
+        start = time.time()
+        model = load_model(model_path, compile=False)
+        print(f"  h5      loaded in {time.time() - start:.2f}s")
+
+        for fmt in args.formats:
+            path = artifact_path(model_path, fmt)
+            if os.path.exists(path) and not args.force:
+                print(f"  {fmt:7} up to date ({path})")
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write next to the target and rename, so a crash never leaves a half-written artifact
+            tmp_path = f"{path}.tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            try:
+                if fmt == 'keras':
+                    model.save(tmp_path + '.keras')
+                    os.replace(tmp_path + '.keras', path)
+                elif fmt == 'traced':
+                    export_traced(model, tmp_path)
+                    shutil.rmtree(path, ignore_errors=True)
+                    os.replace(tmp_path, path)
+                else:
+                    (export_onnx if fmt == 'onnx' else export_tflite)(model, tmp_path)
+                    os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"  ❌ {fmt} conversion failed: {str(e)}")
+                continue
+
+            start = time.time()
+            try:
+                converted = load_model_file(path, compile=False)
+            except ImportError as e:
+                # An unchecked export would still be picked up by servers that have the runtime
+                print(f"  ❌ {fmt} parity cannot be checked here ({str(e)}); removed {path}")
+                remove_artifact(path)
+                continue
+            load_time = time.time() - start
+            diff = check_parity(model, converted, model.input_shape)
+            if diff > args.tolerance:
+                print(f"  ❌ {fmt} output differs by {diff:.2e} (tolerance {args.tolerance:.0e}); removed {path}")
+                remove_artifact(path)
+                continue
+            print(f"  {fmt:7} loaded in {load_time:.2f}s | max output difference {diff:.2e} | {path}")
+
+    print("\nBenchmark startup with: python benchmarks/bench_startup.py")
+
+if __name__ == "__main__":
+    main()
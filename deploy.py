@@ -59,6 +59,29 @@ class PneumoniaDetectionDeployer:
             print(f"❌ Failed to install dependencies: {e}")
             return False
     
+    def tuned_workers(self):
+        """API worker count from tune_threads.py's config for this host (1 if it was never tuned)"""
+        sys.path.append(str(self.project_root))
+        from src.utils.thread_tuning import tuned_workers
+        return tuned_workers() or 1
+    
+    def api_command(self, reload=False):
+        """uvicorn command and environment for the API, with the tuned worker count"""
+        workers = self.tuned_workers()
+        command = [
+            sys.executable, "-m", "uvicorn", "api_server:app",
+            "--host", "0.0.0.0",
+            "--port", "8000"
+        ]
+        if workers > 1:
+            # --reload only runs a single worker
+            print(f"🧵 {workers} workers (tuned thread config, see tune_threads.py)")
+            command += ["--workers", str(workers)]
+        elif reload:
+            command.append("--reload")
+        # Each worker sizes its thread pools (and takes a core set) for this many siblings
+        return command, dict(os.environ, WEB_CONCURRENCY=str(workers))
+    
     def deploy_local(self, mode="web"):
         """Deploy locally"""
         print(f"🚀 Deploying locally in {mode} mode...")
@@ -76,11 +99,16 @@ class PneumoniaDetectionDeployer:
             print("Starting FastAPI server...")
             print("🔗 API will be available at: http://localhost:8000")
             print("📚 API docs at: http://localhost:8000/docs")
+            command, env = self.api_command(reload=True)
+            subprocess.run(command, env=env)
+        
+        elif mode == "api-workers":
+            print("Starting FastAPI with one shared inference process...")
+            print("🔗 API will be available at: http://localhost:8000")
             subprocess.run([
-                sys.executable, "-m", "uvicorn", "api_server:app",
+                sys.executable, "serve.py",
                 "--host", "0.0.0.0",
-                "--port", "8000",
-                "--reload"
+                "--port", "8000"
             ])
         
         elif mode == "both":
@@ -89,11 +117,8 @@ class PneumoniaDetectionDeployer:
             print("🔗 API: http://localhost:8000")
             
             # Start API in background
-            api_process = subprocess.Popen([
-                sys.executable, "-m", "uvicorn", "api_server:app",
-                "--host", "0.0.0.0",
-                "--port", "8000"
-            ])
+            command, env = self.api_command()
+            api_process = subprocess.Popen(command, env=env)
             
             # Start web app
             try:
@@ -172,6 +197,7 @@ api: uvicorn api_server:app --host=0.0.0.0 --port=$PORT"""
         essential_files = [
             "web_app.py",
             "api_server.py",
+            "serve.py",
             "colab_local_inference.py",
             "requirements_web.txt",
             "Dockerfile",
@@ -183,6 +209,11 @@ api: uvicorn api_server:app --host=0.0.0.0 --port=$PORT"""
             if Path(file).exists():
                 shutil.copy2(file, package_dir)
         
+        # Copy the packages the entry points import
+        for package in ["src", "config"]:
+            if Path(package).exists():
+                shutil.copytree(package, package_dir / package, ignore=shutil.ignore_patterns("__pycache__"))
+        
         # Copy models directory
         if self.models_dir.exists():
             shutil.copytree(self.models_dir, package_dir / "models")
@@ -233,7 +264,7 @@ For issues, check the main project documentation.
 
 def main():
     parser = argparse.ArgumentParser(description="Deploy Pneumonia Detection System")
-    parser.add_argument("--mode", choices=["web", "api", "both", "docker", "heroku", "package"], 
+    parser.add_argument("--mode", choices=["web", "api", "api-workers", "both", "docker", "heroku", "package"], 
                        default="web", help="Deployment mode")
     parser.add_argument("--skip-deps", action="store_true", help="Skip dependency installation")
     
@@ -16,10 +16,9 @@ import plotly.graph_objects as go
 import folium
 from streamlit_folium import folium_static
 import json
+import weakref
 
 import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import gdown
 
 # Import location service
@@ -27,6 +26,15 @@ import sys
 sys.path.append('.')
 from src.utils.location_service import LocationService
 from config.api_config import APIConfig
+from src.models.registry import get_registry, process_rss_bytes
+from src.models.backends import resolve_backend
+from config.inference_config import InferenceConfig
+from src.utils.prediction_cache import get_prediction_cache
+from src.utils.preprocessing import preprocess_image
+from src.utils.thread_tuning import apply_thread_config
+
+# One process serves every session, so it takes the host's single-process thread config
+apply_thread_config(workers=1)
 
 # Configure page
 st.set_page_config(
@@ -120,9 +128,19 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def _release_models(model_paths):
+    """Hand a session's models back to the shared registry"""
+    registry = get_registry()
+    for model_path in model_paths:
+        registry.release(model_path)
+
 class EnhancedPneumoniaDetector:
     def __init__(self):
         self.models = {}
+        self.model_paths = {}
+        # Models are shared by every session through the registry; release ours when the session is gone
+        self._held_paths = []
+        weakref.finalize(self, _release_models, self._held_paths)
         self.model_urls = {
             "Hybrid Model (Best)": "1e63uR6n38VPpVoh8oOXS4pv6ZVEz8_19",
             "ResNet50 Classifier": "1s-PaTunk_yGA_j_bG6ogJuhf1yShLtAZ"
@@ -144,6 +162,7 @@ class EnhancedPneumoniaDetector:
         
     def load_models(self):
         """Load all available models (download from Google Drive if needed)"""
+        registry = get_registry()
         models_dir = "models"
         model_files = {
             "Hybrid Model (Best)": "hybrid_model_colab.h5",
@@ -167,9 +186,13 @@ class EnhancedPneumoniaDetector:
             # Load model if exists
             if os.path.exists(model_path):
                 try:
+                    # Converted copies from convert_models.py start faster (or run on MODEL_BACKEND)
+                    model_path = resolve_backend(model_path, InferenceConfig.MODEL_BACKEND)
                     with st.spinner(f" Loading {model_name}..."):
                         # Load with compile=False to avoid optimizer issues between TF versions
-                        self.models[model_name] = load_model(model_path, compile=False)
+                        self.models[model_name] = registry.acquire(model_path, compile=False, warm_up=True)
+                    self._held_paths.append(model_path)
+                    self.model_paths[model_name] = model_path
                     st.sidebar.success(f" {model_name} loaded")
                 except Exception as e:
                     st.sidebar.error(f" Failed to load {model_name}: {str(e)}")
@@ -182,15 +205,7 @@ class EnhancedPneumoniaDetector:
     
     def preprocess_image(self, img, target_size=(224, 224)):
         """Preprocess image for model prediction"""
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        img_resized = img.resize(target_size)
-        img_array = image.img_to_array(img_resized)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array = img_array / 255.0
-        
-        return img_array
+        return preprocess_image(img, target_size)
     
     def predict(self, img, model_name):
         """Make prediction using selected model"""
@@ -200,8 +215,17 @@ class EnhancedPneumoniaDetector:
         model = self.models[model_name]
         img_array = self.preprocess_image(img)
         
+        # Repeat analyses of the same (enhanced) image skip the forward pass
+        cache = get_prediction_cache()
+        key = cache.make_key(img_array, model_name, get_registry().version(self.model_paths[model_name]))
+        cached = cache.get(key)
+        
         start_time = time.time()
-        prediction = model.predict(img_array, verbose=0)
+        if cached is not None:
+            prediction = np.asarray([cached])
+        else:
+            prediction = model.predict(img_array, verbose=0)
+            cache.set(key, prediction[0])
         inference_time = time.time() - start_time
         
         predicted_class = np.argmax(prediction[0])
@@ -217,7 +241,8 @@ class EnhancedPneumoniaDetector:
                 'NORMAL': float(prediction[0][0]),
                 'PNEUMONIA': float(prediction[0][1])
             },
-            'inference_time': inference_time
+            'inference_time': inference_time,
+            'cached': cached is not None
         }
 
 def get_youtube_videos(query, max_results=5):
@@ -500,6 +525,16 @@ def main():
         st.sidebar.info(" To enable AI predictions:\n1. Upload models to Google Drive\n2. Make them publicly accessible\n3. Update file IDs in code")
         selected_model = None
     
+    # Shared model memory (one copy per process, however many sessions are open)
+    if detector.models:
+        registry = get_registry()
+        sessions = max((registry.refcount(p) for p in detector._held_paths), default=0)
+        rss = process_rss_bytes()
+        st.sidebar.caption(
+            f" Model memory: {registry.memory_bytes() / 1024**2:.0f} MB shared by {sessions} session(s)"
+            + (f" · Process RSS: {rss / 1024**2:.0f} MB" if rss else "")
+        )
+    
     # Feature toggles
     st.sidebar.subheader(" Features")
     show_videos = st.sidebar.checkbox(" Show YouTube Recommendations", True)
@@ -4,11 +4,13 @@ Laptop-friendly inference script
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import matplotlib.pyplot as plt
 import argparse
 import os
+from PIL import Image
 from config.ultra_light_config import UltraLightConfig
+from src.models.engine import compile_model
+from src.utils.preprocessing import load_image, image_to_array
 
 class LaptopPneumoniaDetector:
     def __init__(self):
@@ -18,15 +20,13 @@ class LaptopPneumoniaDetector:
             raise FileNotFoundError(f"Model not found at {self.config.CLASSIFIER_PATH}. Please train the model first using laptop_train.py")
         
         print("Loading laptop-trained model...")
-        self.model = load_model(self.config.CLASSIFIER_PATH)
+        self.model = compile_model(load_model(self.config.CLASSIFIER_PATH))
         print("✅ Model loaded successfully!")
     
     def preprocess_image(self, img_path):
         """Preprocess image for laptop model"""
-        img = image.load_img(img_path, target_size=(self.config.IMG_HEIGHT, self.config.IMG_WIDTH))
-        img_array = image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array = img_array / 255.0
+        img = load_image(img_path, (self.config.IMG_HEIGHT, self.config.IMG_WIDTH), resample=Image.NEAREST)
+        img_array = image_to_array(img)[np.newaxis]
         return img_array, img
     
     def predict(self, img_path, show_image=True):
@@ -0,0 +1,117 @@
+"""
+Post-training quantization tool
+Builds dynamic-range / float16 / int8 TFLite variants of each classifier in
+models/, calibrates int8 on the test split and reports size, latency and
+accuracy deltas. The API serves a variant with MODEL_PRECISION=<precision>
+only if its AUC is within MAX_AUC_DROP of the original.
+
+Usage:
+    python quantize_models.py --precisions dynamic int8 --data_dir data/chest_xray/test
+"""
+import argparse
+import os
+import sys
+
+sys.path.append('.')
+from tensorflow.keras.models import load_model
+
+from src.models.quantization import (
+    PRECISIONS, TFLiteModel, convert_model, evaluate, variant_paths, write_manifest, check_gate
+)
+from src.models.artifacts import model_hash
+from src.utils.datasets import find_test_dir, sample_test_split, load_images
+
+MODEL_FILES = {
+    "hybrid": "hybrid_model_colab.h5",
+    "resnet50": "resnet_classifier_colab.h5"
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantize pneumonia models to TFLite')
+    parser.add_argument('--models_dir', type=str, default='models', help='Directory containing trained models')
+    parser.add_argument('--data_dir', type=str, default=None, help='Test split with NORMAL/ and PNEUMONIA/ subfolders')
+    parser.add_argument('--precisions', nargs='+', default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument('--calibration_samples', type=int, default=100, help='Images used to calibrate int8')
+    parser.add_argument('--eval_samples', type=int, default=400, help='Images used to measure AUC/accuracy')
+    parser.add_argument('--max_auc_drop', type=float, default=0.01, help='Gate shown in the report')
+    args = parser.parse_args()
+
+    print("⚙️ Post-training quantization")
+    print("=" * 70)
+
+    test_dir = find_test_dir(args.data_dir)
+    if not test_dir:
+        print("❌ No test split found. Pass --data_dir pointing at a folder with NORMAL/ and PNEUMONIA/")
+        return
+
+    eval_paths, eval_labels = sample_test_split(test_dir, args.eval_samples, seed=42)
+    calibration_paths, _ = sample_test_split(test_dir, args.calibration_samples, seed=7)
+    print(f"Test split: {test_dir} ({len(eval_paths)} evaluation / {len(calibration_paths)} calibration images)")
+    eval_images = load_images(eval_paths)
+    calibration_images = load_images(calibration_paths)
+
+    def representative_data():
+        for i in range(len(calibration_images)):
+            yield calibration_images[i:i + 1]
+
+    for model_name, model_file in MODEL_FILES.items():
+        model_path = os.path.join(args.models_dir, model_file)
+        if not os.path.exists(model_path):
+            print(f"⚠️ Skipping {model_name}: {model_path} not found")
+            continue
+
+        print(f"\n🧠 {model_name} ({model_file})")
+        model = load_model(model_path, compile=False)
+        baseline = evaluate(model, eval_images, eval_labels)
+        baseline_size = os.path.getsize(model_path)
+        print(f"  {'fp32':8} size {baseline_size / 1024**2:8.1f} MB | latency {baseline['latency_ms']:7.1f} ms "
+              f"| AUC {baseline['auc']:.4f} | acc {baseline['accuracy']:.2%}")
+
+        for precision in args.precisions:
+            tflite_path, manifest_path = variant_paths(model_path, precision)
+            try:
+                flatbuffer = convert_model(
+                    model, precision, representative_data if precision == 'int8' else None
+                )
+            except Exception as e:
+                print(f"  ❌ {precision} conversion failed: {str(e)}")
+                continue
+
+            os.makedirs(os.path.dirname(tflite_path), exist_ok=True)
+            with open(tflite_path, 'wb') as f:
+                f.write(flatbuffer)
+
+            variant = evaluate(TFLiteModel(tflite_path), eval_images, eval_labels)
+            manifest = {
+                'model': model_name,
+                'precision': precision,
+                'source': model_file,
+                'source_hash': model_hash(model_path),
+                'test_dir': test_dir,
+                'eval_samples': len(eval_paths),
+                'calibration_samples': len(calibration_paths) if precision == 'int8' else 0,
+                'baseline_auc': baseline['auc'],
+                'auc': variant['auc'],
+                'auc_delta': variant['auc'] - baseline['auc'],
+                'baseline_accuracy': baseline['accuracy'],
+                'accuracy': variant['accuracy'],
+                'baseline_latency_ms': baseline['latency_ms'],
+                'latency_ms': variant['latency_ms'],
+                'baseline_size_bytes': baseline_size,
+                'size_bytes': len(flatbuffer),
+                'agreement': float(
+                    (variant['probabilities'].argmax(axis=1) == baseline['probabilities'].argmax(axis=1)).mean()
+                )
+            }
+            write_manifest(manifest_path, manifest)
+
+            ok, reason = check_gate(manifest, args.max_auc_drop)
+            print(f"  {precision:8} size {len(flatbuffer) / 1024**2:8.1f} MB ({len(flatbuffer) / baseline_size:5.1%}) "
+                  f"| latency {variant['latency_ms']:7.1f} ms ({baseline['latency_ms'] / variant['latency_ms']:4.1f}x) "
+                  f"| AUC {variant['auc']:.4f} ({manifest['auc_delta']:+.4f}) | acc {variant['accuracy']:.2%} "
+                  f"| {'✅ passes gate' if ok else '❌ ' + reason}")
+
+    print("\nServe a variant with: MODEL_PRECISION=<precision> python api_server.py")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Multi-worker API launcher
+Starts one inference process that holds the models, then N uvicorn workers
+that handle HTTP and send forward passes to it over a local socket
+(INFERENCE_MODE=ipc). Model memory is paid once instead of once per worker,
+so HTTP concurrency can scale with cores. The inference process takes the
+host's single-process thread config from tune_threads.py.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+    python serve.py --inference-only     # only the inference process; start workers
+                                         # yourself with INFERENCE_MODE=ipc and the same
+                                         # INFERENCE_ADDRESS / INFERENCE_AUTHKEY
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+import sys
+import time
+
+sys.path.append('.')
+from config.inference_config import InferenceConfig
+
+def wait_for_inference_process(address: str, authkey: bytes, process, timeout: float = 120.0) -> bool:
+    """Block until the inference process answers, or it dies / the timeout passes"""
+    from src.models.inference_server import RemoteModelManager
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and not process.is_alive():
+            return False
+        try:
+            RemoteModelManager(address, authkey, connect_timeout=0)
+            return True
+        except (ConnectionError, OSError):
+            time.sleep(0.2)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the API with one shared inference process')
+    parser.add_argument('--host', type=str, default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='uvicorn HTTP worker processes')
+    parser.add_argument('--address', type=str, default=InferenceConfig.INFERENCE_ADDRESS, help='Inference socket path')
+    parser.add_argument('--inference-only', action='store_true', help='Run only the inference process')
+    args = parser.parse_args()
+
+    # Workers inherit these from this process's environment
+    authkey = InferenceConfig.INFERENCE_AUTHKEY or secrets.token_hex(16)
+    os.environ['INFERENCE_AUTHKEY'] = authkey
+    os.environ['INFERENCE_ADDRESS'] = args.address
+    os.environ['INFERENCE_MODE'] = 'ipc'
+    os.environ['WEB_CONCURRENCY'] = str(args.workers)
+
+    from src.models.inference_server import run_inference_server
+
+    if args.inference_only:
+        print(f"🧠 Inference process listening on {args.address}")
+        run_inference_server(args.address, authkey.encode())
+        return
+
+    # spawn, not fork: the child must start with a clean TensorFlow runtime
+    process = multiprocessing.get_context('spawn').Process(
+        target=run_inference_server, args=(args.address, authkey.encode()), name='inference'
+    )
+    process.start()
+    print(f"🧠 Starting inference process (pid {process.pid}) on {args.address}")
+    if not wait_for_inference_process(args.address, authkey.encode(), process):
+        print("❌ Inference process did not come up")
+        process.terminate()
+        sys.exit(1)
+
+    import uvicorn
+
+    print(f"🔗 API with {args.workers} worker(s) at http://{args.host}:{args.port}")
+    try:
+        uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        process.terminate()
+        process.join(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Fast-start Model Artifacts
+Converted copies of the Colab .h5 files that load faster, kept in a
+content-addressed cache next to the models:
+
+    models/fast/<stem>-<file hash>.keras                 Keras v3 archive
+    models/fast/<stem>-<file hash>-tf<version>.traced/   SavedModel with the
+                                                         traced serving function
+    models/fast/<stem>-<file hash>.onnx / .tflite        exports for the other
+                                                         backends (see backends)
+
+The traced artifact skips Keras deserialization and graph tracing on the
+first prediction, but exposes no layers (so it runs outside the shared
+ResNet50 trunk). Keys include the .h5 content hash, so replacing a model
+file simply misses the cache; traced functions also key on the TF version.
+"""
+import hashlib
+import os
+import threading
+from importlib import metadata
+from typing import Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('auto', 'traced', 'keras', 'h5')
+TRACED_SUFFIX = '.traced'
+
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+def tf_version() -> str:
+    """Installed TensorFlow version, read from package metadata so TF is not imported"""
+    for distribution in ('tensorflow', 'tensorflow-cpu', 'tensorflow-macos', 'tensorflow-intel'):
+        try:
+            return metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            continue
+    import tensorflow as tf
+    return tf.__version__
+
+def model_hash(model_path: str) -> str:
+    """Content hash of a model file (memoized per file signature)"""
+    stat = os.stat(model_path)
+    signature = (os.path.abspath(model_path), stat.st_mtime_ns, stat.st_size)
+    with _hash_lock:
+        if signature in _hash_cache:
+            return _hash_cache[signature]
+
+    digest = hashlib.blake2b(digest_size=8)
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    with _hash_lock:
+        _hash_cache[signature] = digest.hexdigest()
+    return _hash_cache[signature]
+
+def artifact_path(model_path: str, fmt: str, cache_dir: Optional[str] = None) -> str:
+    """Cache location of the fmt ('keras', 'traced', 'onnx' or 'tflite') artifact of model_path"""
+    models_dir, model_file = os.path.split(model_path)
+    cache_dir = cache_dir or os.path.join(models_dir, 'fast')
+    stem = f"{os.path.splitext(model_file)[0]}-{model_hash(model_path)}"
+    if fmt in ('keras', 'onnx', 'tflite'):
+        return os.path.join(cache_dir, f"{stem}.{fmt}")
+    if fmt == 'traced':
+        return os.path.join(cache_dir, f"{stem}-tf{tf_version()}{TRACED_SUFFIX}")
+    raise ValueError(f"Unknown artifact format '{fmt}'. Use 'keras', 'traced', 'onnx' or 'tflite'")
+
+def resolve_artifact(model_path: str, fmt: str = 'auto', cache_dir: Optional[str] = None) -> str:
+    """
+    The fastest-loading file for model_path that exists
+
+    auto tries traced, then keras, then the original file; a specific
+    format falls back to the original when it has not been converted.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown model format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    if fmt == 'h5':
+        return model_path
+    for candidate in (('traced', 'keras') if fmt == 'auto' else (fmt,)):
+        path = artifact_path(model_path, candidate, cache_dir)
+        if os.path.exists(path):
+            return path
+    if fmt != 'auto':
+        logger.warning(f"No {fmt} artifact for {model_path} (run convert_models.py); loading the original")
+    return model_path
+
+def artifact_format(path: str) -> str:
+    if path.endswith(TRACED_SUFFIX):
+        return 'traced'
+    return os.path.splitext(path)[1].lstrip('.')
+
+def export_traced(model, path: str):
+    """Write model's inference function as a SavedModel"""
+    if hasattr(model, 'export'):
+        try:
+            model.export(path, verbose=False)
+        except TypeError:
+            # Keras 2 export() has no verbose flag
+            model.export(path)
+    else:
+        import tensorflow as tf
+        tf.saved_model.save(model, path)
+
+class TracedModel:
+    """SavedModel serving function with the model.predict(batch, verbose=0) interface"""
+
+    def __init__(self, path: str):
+        import tensorflow as tf
+
+        self.path = path
+        self._loaded = tf.saved_model.load(path)
+        self._fn = self._loaded.signatures['serving_default']
+        _, inputs = self._fn.structured_input_signature
+        self._input_name, spec = next(iter(inputs.items()))
+        self.input_shape = tuple(spec.shape.as_list())
+        self._dtype = spec.dtype.as_numpy_dtype
+        self.output_shape = tuple(next(iter(self._fn.structured_outputs.values())).shape.as_list())
+        self.weights = list(getattr(self._loaded, 'variables', []))
+
+    def predict(self, batch, verbose: int = 0) -> np.ndarray:
+        outputs = self._fn(**{self._input_name: np.asarray(batch, dtype=self._dtype)})
+        return next(iter(outputs.values())).numpy()
+
+    def __call__(self, batch, training=False):
+        return self.predict(batch)
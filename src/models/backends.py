@@ -0,0 +1,143 @@
+"""
+Inference Backends
+The same model served by TensorFlow (the .h5 or its fast-start artifacts),
+by ONNX Runtime on the CPU execution provider, or by the TFLite interpreter.
+ONNX and TFLite exports are built by convert_models.py and cached next to
+the other artifacts (models/fast/<stem>-<file hash>.onnx / .tflite); with
+MODEL_BACKEND=onnx or tflite and no export present, TensorFlow is used.
+
+Neither ONNX Runtime nor the TFLite interpreter (ai-edge-litert) needs
+TensorFlow, so a container built for them skips the TensorFlow install.
+"""
+import os
+from importlib.util import find_spec
+from typing import Optional
+import numpy as np
+import logging
+
+from src.models.artifacts import artifact_path, resolve_artifact
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('tf', 'onnx', 'tflite')
+ONNX_OPSET = 17
+
+def runtime_available(backend: str) -> bool:
+    """Whether the runtime for backend can be imported (checked without importing it)"""
+    if backend == 'onnx':
+        return find_spec('onnxruntime') is not None
+    if backend == 'tflite':
+        return find_spec('ai_edge_litert') is not None or find_spec('tensorflow') is not None
+    return find_spec('tensorflow') is not None
+
+def resolve_backend(model_path: str, backend: str = 'tf', model_format: str = 'auto',
+                    cache_dir: Optional[str] = None) -> str:
+    """
+    The file to serve model_path from with backend
+
+    tf resolves the fast-start artifacts as MODEL_FORMAT says. onnx and
+    tflite use their export when it exists and the runtime is installed,
+    and fall back to tf otherwise.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Use one of: {', '.join(BACKENDS)}")
+    if backend != 'tf':
+        path = artifact_path(model_path, backend, cache_dir)
+        if not os.path.exists(path):
+            logger.warning(f"No {backend} export of {model_path} (run convert_models.py --formats {backend}); "
+                           f"serving it with TensorFlow")
+        elif not runtime_available(backend):
+            logger.warning(f"The {backend} runtime is not installed; serving {model_path} with TensorFlow")
+        else:
+            return path
+    return resolve_artifact(model_path, model_format, cache_dir)
+
+class OnnxModel:
+    """ONNX Runtime session on the CPU execution provider, with the model.predict(batch, verbose=0) interface"""
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend needs onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self._session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        model_input = self._session.get_inputs()[0]
+        model_output = self._session.get_outputs()[0]
+        self._input_name = model_input.name
+        # Symbolic dimensions (the batch axis) come back as strings
+        self.input_shape = tuple(d if isinstance(d, int) else None for d in model_input.shape)
+        self.output_shape = tuple(d if isinstance(d, int) else None for d in model_output.shape)
+        self.size_bytes = os.path.getsize(path)
+        # No Keras variables; registry memory accounting falls back to size_bytes
+        self.weights = []
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        # InferenceSession.run is thread-safe, so concurrent callers need no lock
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self._session.run(None, {self._input_name: batch})[0]
+
+    def __call__(self, batch, training=False):
+        return self.predict(np.asarray(batch))
+
+def export_onnx(model, path: str, opset: int = ONNX_OPSET):
+    """Write a Keras model's inference function as an ONNX graph (needs tf2onnx)"""
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("ONNX export needs tf2onnx (pip install tf2onnx onnx)") from e
+
+    signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name='input')]
+    # Converting a tf.function avoids tf2onnx's Keras-version-specific model handling
+    function = tf.function(lambda x: model(x, training=False), input_signature=signature)
+    tf2onnx.convert.from_function(function, input_signature=signature, opset=opset, output_path=path)
+
+def export_tflite(model, path: str):
+    """Write a Keras model as a float32 TFLite flatbuffer (quantized variants: quantize_models.py)"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+def load_model_file(path: str, compile: bool = True):
+    """
+    Load any served model file: .onnx, .tflite, a traced SavedModel directory or a Keras file
+
+    Runtimes get the thread counts apply_thread_config() chose for this process.
+    """
+    from src.utils.thread_tuning import configure_tensorflow, runtime_threads
+
+    if path.endswith('.onnx'):
+        return OnnxModel(path, num_threads=runtime_threads())
+    if path.endswith('.tflite'):
+        from src.models.quantization import TFLiteModel
+        return TFLiteModel(path, num_threads=runtime_threads())
+    configure_tensorflow()
+    if os.path.isdir(path):
+        from src.models.artifacts import TracedModel
+        return TracedModel(path)
+    from tensorflow.keras.models import load_model
+    from src.models.engine import compile_model
+    return compile_model(load_model(path, compile=compile))
+
+def load_inference_model(model_path: str, backend: Optional[str] = None, model_format: Optional[str] = None):
+    """
+    Load model_path for inference with the configured backend
+
+    For scripts that hold one model (the CLIs); servers go through
+    ModelManager, which resolves the backend the same way.
+    """
+    from config.inference_config import InferenceConfig
+
+    path = resolve_backend(model_path, backend or InferenceConfig.MODEL_BACKEND,
+                           model_format or InferenceConfig.MODEL_FORMAT)
+    if path != model_path:
+        logger.info(f"Serving {os.path.basename(model_path)} from {path}")
+    return load_model_file(path, compile=False)
@@ -0,0 +1,207 @@
+"""
+Micro-batching Scheduler for Model Inference
+Coalesces concurrent single-image requests into one batched forward pass
+"""
+import threading
+import time
+import queue
+from concurrent.futures import Future
+from typing import Callable, Dict, NamedTuple, Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BatchOutput(NamedTuple):
+    """Result of one request after its batch has run"""
+    probabilities: np.ndarray
+    forward_time: float
+    queue_time: float
+    batch_size: int
+
+class _PendingRequest:
+    __slots__ = ('array', 'future', 'enqueued_at')
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+_SHUTDOWN = object()
+
+class ModelBatcher:
+    """Collects requests for a single model and runs them as one batch"""
+
+    def __init__(self, model_name: str, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.model_name = model_name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._requests_total = 0
+        self._batches_total = 0
+        self._errors_total = 0
+        self._queue_time_total = 0.0
+        self._batch_size_counts: Dict[int, int] = {}
+
+        self._worker = threading.Thread(
+            target=self._run, name=f"batcher-{model_name}", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, img_array: np.ndarray) -> Future:
+        """Queue a preprocessed image (HxWxC or 1xHxWxC) and return a future"""
+        if img_array.ndim == 4:
+            if img_array.shape[0] != 1:
+                raise ValueError("submit() expects a single image")
+            img_array = img_array[0]
+
+        request = _PendingRequest(img_array)
+        self._queue.put(request)
+        return request.future
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a batch slot"""
+        return self._queue.qsize()
+
+    def _collect(self):
+        """
+        Block for the first request, then gather more until full or timed out
+
+        Requests whose callers already cancelled them are dropped; the rest
+        are marked running, so a late cancel can no longer race set_result.
+        """
+        first = self._queue.get()
+        if first is _SHUTDOWN:
+            return None
+
+        batch = [first] if first.future.set_running_or_notify_cancel() else []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _SHUTDOWN:
+                # Finish this batch, then let the run loop see the sentinel
+                self._queue.put(_SHUTDOWN)
+                break
+            if item.future.set_running_or_notify_cancel():
+                batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            if not batch:
+                continue
+
+            started = time.monotonic()
+            try:
+                inputs = np.stack([request.array for request in batch])
+                predictions = np.asarray(self.predict_fn(inputs))
+            except Exception as e:
+                logger.error(f"Batch inference failed for {self.model_name}: {str(e)}")
+                with self._stats_lock:
+                    self._errors_total += len(batch)
+                self._deliver(batch, lambda i, request: request.future.set_exception(e))
+                continue
+            forward_time = time.monotonic() - started
+
+            waits = [started - request.enqueued_at for request in batch]
+            with self._stats_lock:
+                self._requests_total += len(batch)
+                self._batches_total += 1
+                self._queue_time_total += sum(waits)
+                self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+
+            self._deliver(batch, lambda i, request: request.future.set_result(
+                BatchOutput(predictions[i], forward_time, waits[i], len(batch))
+            ))
+
+    def _deliver(self, batch, resolve: Callable):
+        """Resolve every future in the batch; one failure must not stop the worker thread"""
+        for i, request in enumerate(batch):
+            try:
+                resolve(i, request)
+            except Exception as e:
+                logger.error(f"Could not deliver a {self.model_name} result: {str(e)}")
+
+    def stats(self) -> dict:
+        """Queue depth and batch-size metrics for this model"""
+        with self._stats_lock:
+            requests_total = self._requests_total
+            batches_total = self._batches_total
+            return {
+                'queue_depth': self.queue_depth,
+                'requests_total': requests_total,
+                'batches_total': batches_total,
+                'errors_total': self._errors_total,
+                'avg_batch_size': requests_total / batches_total if batches_total else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'avg_queue_time_ms': 1000 * self._queue_time_total / requests_total if requests_total else 0.0,
+                'batch_size_counts': dict(sorted(self._batch_size_counts.items()))
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker after the requests already queued have run"""
+        self._queue.put(_SHUTDOWN)
+        if wait:
+            self._worker.join()
+
+class BatchScheduler:
+    """Routes requests to one ModelBatcher per model"""
+
+    def __init__(self, predict_fn: Callable[[str, np.ndarray], np.ndarray],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        """
+        predict_fn(model_name, batch) runs one forward pass and returns
+        an array with one row per image in the batch
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers: Dict[str, ModelBatcher] = {}
+        self._lock = threading.Lock()
+
+    def _get_batcher(self, model_name: str) -> ModelBatcher:
+        batcher = self._batchers.get(model_name)
+        if batcher is None:
+            with self._lock:
+                batcher = self._batchers.get(model_name)
+                if batcher is None:
+                    batcher = ModelBatcher(
+                        model_name,
+                        lambda batch: self.predict_fn(model_name, batch),
+                        max_batch_size=self.max_batch_size,
+                        max_wait_ms=self.max_wait_ms
+                    )
+                    self._batchers[model_name] = batcher
+        return batcher
+
+    def submit(self, model_name: str, img_array: np.ndarray) -> Future:
+        """Queue one preprocessed image for model_name"""
+        return self._get_batcher(model_name).submit(img_array)
+
+    def stats(self, model_name: Optional[str] = None) -> dict:
+        """Per-model batching metrics"""
+        if model_name is not None:
+            batcher = self._batchers.get(model_name)
+            return batcher.stats() if batcher else {}
+        return {name: batcher.stats() for name, batcher in list(self._batchers.items())}
+
+    def shutdown(self):
+        """Stop all model workers"""
+        with self._lock:
+            batchers = list(self._batchers.values())
+            self._batchers.clear()
+        for batcher in batchers:
+            batcher.shutdown()
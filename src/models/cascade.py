@@ -0,0 +1,181 @@
+"""
+Confidence Cascade
+A cheap model scores every image first; only images whose PNEUMONIA
+probability falls inside the uncertainty band [low, high] escalate to the
+expensive model. calibrate_cascade.py picks the band from the test split for
+a target agreement with the expensive model and saves it next to the models
+(models/cascade_thresholds.json).
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BAND = (0.2, 0.8)
+
+def parse_model_spec(spec: str) -> Tuple[str, Optional[str]]:
+    """'resnet50' -> ('resnet50', None); 'hybrid:int8' -> ('hybrid', 'int8'), a quantized variant"""
+    name, _, precision = spec.partition(':')
+    return name.strip(), precision.strip() or None
+
+def escalates(probabilities: np.ndarray, low: float, high: float) -> bool:
+    """Whether the cheap model is unsure: its PNEUMONIA probability lies within [low, high]"""
+    return low <= float(probabilities[1]) <= high
+
+def cascade_outcome(fast_scores: np.ndarray, full_labels: np.ndarray, low: float, high: float) -> dict:
+    """
+    Escalation rate and agreement with the expensive model over a sample
+
+    fast_scores are the cheap model's PNEUMONIA probabilities and
+    full_labels the expensive model's predicted classes; escalated images
+    take the expensive model's answer, so they always agree.
+    """
+    fast_scores = np.asarray(fast_scores, dtype=np.float64)
+    full_labels = np.asarray(full_labels).astype(bool)
+    escalated = (fast_scores >= low) & (fast_scores <= high)
+    final = np.where(escalated, full_labels, fast_scores > high)
+    return {
+        'low': float(low),
+        'high': float(high),
+        'escalation_rate': float(escalated.mean()) if len(fast_scores) else 0.0,
+        'agreement': float((final == full_labels).mean()) if len(fast_scores) else 1.0
+    }
+
+def calibrate_band(fast_scores: np.ndarray, full_labels: np.ndarray, target_agreement: float) -> dict:
+    """
+    The narrowest band (fewest escalations) whose agreement with the expensive model reaches target_agreement
+
+    Bands always contain 0.5, so outside the band the cheap model answers
+    with its own argmax. Every pair of observed scores is a candidate
+    edge; the counts are cumulative sums, so the search is one n x n pass.
+    """
+    scores = np.asarray(fast_scores, dtype=np.float64)
+    labels = np.asarray(full_labels).astype(bool)
+    if not len(scores):
+        raise ValueError("No scores to calibrate on")
+    if not 0.0 < target_agreement <= 1.0:
+        raise ValueError(f"Target agreement must be in (0, 1], got {target_agreement}")
+
+    edges = np.unique(np.concatenate([scores, [0.0, 0.5, 1.0]]))
+    lows, highs = edges[edges <= 0.5], edges[edges >= 0.5]
+    order = np.argsort(scores)
+    sorted_scores, sorted_positive = scores[order], labels[order]
+    positives_below = np.concatenate([[0], np.cumsum(sorted_positive)])
+    negatives_below = np.concatenate([[0], np.cumsum(~sorted_positive)])
+
+    # Below low the cheap model says NORMAL: wrong where the expensive model says PNEUMONIA
+    below = np.searchsorted(sorted_scores, lows, side='left')
+    wrong_low = positives_below[below]
+    # Above high it says PNEUMONIA: wrong where the expensive model says NORMAL
+    above_start = np.searchsorted(sorted_scores, highs, side='right')
+    wrong_high = negatives_below[-1] - negatives_below[above_start]
+    kept = below[:, None] + (len(scores) - above_start)[None, :]
+
+    agreement = 1 - (wrong_low[:, None] + wrong_high[None, :]) / len(scores)
+    escalation = 1 - kept / len(scores)
+    # Ties in escalation rate go to the higher agreement; the full band [0, 1] always qualifies
+    candidates = np.where(agreement >= target_agreement - 1e-12, escalation - agreement * 1e-9, np.inf)
+    i, j = np.unravel_index(np.argmin(candidates), candidates.shape)
+    return cascade_outcome(scores, labels, lows[i], highs[j])
+
+def thresholds_path(path: Optional[str] = None) -> str:
+    from config.inference_config import InferenceConfig
+
+    return path or InferenceConfig.CASCADE_THRESHOLDS or os.path.join(InferenceConfig.MODELS_DIR, 'cascade_thresholds.json')
+
+def load_thresholds(path: str, model_hashes: Dict[str, Optional[str]]) -> Optional[dict]:
+    """
+    Calibrated band from calibrate_cascade.py, or None
+
+    A file calibrated against other model contents (different hashes) is
+    ignored: the band no longer describes those models' scores. Mtimes are
+    not compared, so a deploy that copies the same files keeps the band.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            thresholds = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cascade thresholds {path}: {str(e)}")
+        return None
+    if thresholds.get('model_hashes') != model_hashes:
+        logger.warning(f"Ignoring {path}: calibrated for other model files (re-run calibrate_cascade.py)")
+        return None
+    return thresholds
+
+class CascadePolicy:
+    """The fast/full model pair, the uncertainty band and per-stage counters"""
+
+    def __init__(self, fast_model: str, model: str, low: float = DEFAULT_BAND[0], high: float = DEFAULT_BAND[1],
+                 source: str = 'default'):
+        if not 0.0 <= low <= 0.5 <= high <= 1.0:
+            raise ValueError(f"Cascade band [{low}, {high}] must contain 0.5 and lie within [0, 1]")
+        self.fast_model = fast_model
+        self.model = model
+        self.low = low
+        self.high = high
+        self.source = source
+        self._lock = threading.Lock()
+        self.counts = {'fast': 0, 'escalated': 0}
+
+    def escalates(self, probabilities: np.ndarray) -> bool:
+        return escalates(probabilities, self.low, self.high)
+
+    def record(self, escalated: bool):
+        with self._lock:
+            self.counts['escalated' if escalated else 'fast'] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {
+            'fast_model': self.fast_model,
+            'model': self.model,
+            'band': [self.low, self.high],
+            'source': self.source,
+            'requests': total,
+            'answered_by_fast_model': counts['fast'],
+            'escalated': counts['escalated'],
+            'fast_hit_rate': counts['fast'] / total if total else None
+        }
+
+def build_cascade_policy(manager) -> Optional[CascadePolicy]:
+    """
+    CascadePolicy for manager's models, configured from InferenceConfig
+
+    The band comes from CASCADE_LOW / CASCADE_HIGH, else the calibrated
+    thresholds file, else DEFAULT_BAND. None (logged) when either model is
+    unavailable.
+    """
+    from config.inference_config import InferenceConfig
+
+    fast_model, precision = parse_model_spec(InferenceConfig.CASCADE_FAST_MODEL)
+    model = InferenceConfig.CASCADE_MODEL
+    try:
+        if precision:
+            fast_model = manager.register_variant(fast_model, precision, InferenceConfig.MAX_AUC_DROP)
+    except Exception as e:
+        logger.warning(f"⚠️ Cascade disabled, no fast model: {str(e)}")
+        return None
+    missing = [name for name in (fast_model, model) if name not in manager.available]
+    if missing:
+        logger.warning(f"⚠️ Cascade disabled, models not available: {missing}")
+        return None
+
+    low, high, source = DEFAULT_BAND[0], DEFAULT_BAND[1], 'default'
+    path = thresholds_path()
+    thresholds = load_thresholds(path, {name: manager.content_hash(name) for name in (fast_model, model)})
+    if thresholds is not None:
+        low, high, source = thresholds['low'], thresholds['high'], path
+    if InferenceConfig.CASCADE_LOW is not None or InferenceConfig.CASCADE_HIGH is not None:
+        low = InferenceConfig.CASCADE_LOW if InferenceConfig.CASCADE_LOW is not None else low
+        high = InferenceConfig.CASCADE_HIGH if InferenceConfig.CASCADE_HIGH is not None else high
+        source = 'env'
+    logger.info(f"Cascade: {fast_model} first, {model} for PNEUMONIA probability in [{low:.3f}, {high:.3f}] ({source})")
+    return CascadePolicy(fast_model, model, low, high, source)
@@ -0,0 +1,149 @@
+"""
+Compiled Inference Engine
+Wraps Keras models in tf.functions with fixed input signatures, one per
+batch-size bucket, so a forward pass is a single graph call instead of
+model.predict's per-call data adapter and loop. Batches are zero-padded up
+to the nearest bucket, which bounds the number of traces (and XLA compiles).
+"""
+import threading
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (1, 2, 4, 8, 16, 32)
+ENGINES = ('compiled', 'keras')
+
+def bucket_for(batch_size: int, buckets: Sequence[int]) -> int:
+    """Smallest bucket that holds batch_size (the largest bucket for bigger batches, which are split)"""
+    for bucket in buckets:
+        if batch_size <= bucket:
+            return bucket
+    return buckets[-1]
+
+def _is_keras_model(model) -> bool:
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return False
+    return isinstance(model, tf.keras.Model)
+
+class CompiledModel:
+    """
+    A Keras model behind compiled fixed-shape functions, with the model.predict(batch, verbose=0) interface
+
+    Every other attribute (layers, inputs, get_layer, weights, ...) is
+    forwarded to the wrapped model, so code that inspects the graph, such
+    as the shared-backbone split and layer profiling, keeps working.
+    Multi-input models take a list of arrays like Keras does.
+    """
+
+    def __init__(self, model, buckets: Iterable[int] = DEFAULT_BUCKETS, xla: bool = False):
+        import tensorflow as tf
+
+        self.model = model
+        self.buckets = tuple(sorted(set(int(b) for b in buckets if int(b) > 0))) or DEFAULT_BUCKETS
+        self.xla = xla
+        self._input_specs = [
+            (tuple(tensor.shape[1:]), tf.as_dtype(getattr(tensor.dtype, 'name', tensor.dtype)))
+            for tensor in model.inputs
+        ]
+        self._function = tf.function(self._forward, jit_compile=xla)
+        self._concrete: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def _forward(self, *inputs):
+        return self.model(list(inputs) if len(inputs) > 1 else inputs[0], training=False)
+
+    def __getattr__(self, name):
+        # Only reached for attributes CompiledModel itself does not define
+        return getattr(self.__dict__['model'], name)
+
+    def _concrete_function(self, bucket: int):
+        function = self._concrete.get(bucket)
+        if function is None:
+            import tensorflow as tf
+
+            with self._lock:
+                function = self._concrete.get(bucket)
+                if function is None:
+                    specs = [tf.TensorSpec((bucket,) + shape, dtype) for shape, dtype in self._input_specs]
+                    function = self._function.get_concrete_function(*specs)
+                    self._concrete[bucket] = function
+                    logger.debug(f"Traced {self.model.name} for batch size {bucket}")
+        return function
+
+    @property
+    def traced_buckets(self):
+        return sorted(self._concrete)
+
+    def warm_up(self, buckets: Optional[Iterable[int]] = None):
+        """Trace (and with XLA, compile) the given buckets ahead of the first request"""
+        for bucket in buckets or self.buckets:
+            self._run([np.zeros((bucket,) + shape, dtype=dtype.as_numpy_dtype)
+                       for shape, dtype in self._input_specs])
+
+    def _run(self, inputs):
+        batch_size = len(inputs[0])
+        bucket = bucket_for(batch_size, self.buckets)
+        if batch_size > bucket:
+            chunks = [self._run([x[i:i + bucket] for x in inputs]) for i in range(0, batch_size, bucket)]
+            if isinstance(chunks[0], list):
+                return [np.concatenate(parts) for parts in zip(*chunks)]
+            return np.concatenate(chunks)
+
+        if batch_size < bucket:
+            inputs = [np.concatenate([x, np.zeros((bucket - batch_size,) + x.shape[1:], dtype=x.dtype)])
+                      for x in inputs]
+        outputs = self._concrete_function(bucket)(*inputs)
+        if isinstance(outputs, (list, tuple)):
+            return [output.numpy()[:batch_size] for output in outputs]
+        return outputs.numpy()[:batch_size]
+
+    def predict(self, batch, verbose: int = 0):
+        batches = batch if isinstance(batch, (list, tuple)) else [batch]
+        inputs = [np.asarray(x, dtype=dtype.as_numpy_dtype) for x, (_, dtype) in zip(batches, self._input_specs)]
+        return self._run(inputs)
+
+    def predict_on_batch(self, batch):
+        return self.predict(batch)
+
+    def __call__(self, batch, training=False):
+        return self.predict(batch)
+
+def warm_up_model(model, batch_sizes: Iterable[int] = (1,), iterations: int = 1):
+    """
+    Run synthetic batches of each size through model (any backend) so the
+    first real request of that size skips tracing and buffer allocation
+    """
+    shapes = model.input_shape if isinstance(model.input_shape, list) else [model.input_shape]
+    rng = np.random.default_rng(0)
+    for batch_size in batch_sizes:
+        # Preprocessed images are floats in [0, 1]
+        inputs = [rng.random((batch_size,) + tuple(dim or 1 for dim in shape[1:]), dtype=np.float32)
+                  for shape in shapes]
+        for _ in range(iterations):
+            model.predict(inputs if len(inputs) > 1 else inputs[0], verbose=0)
+
+def compile_model(model, engine: Optional[str] = None, buckets: Optional[Iterable[int]] = None,
+                  xla: Optional[bool] = None):
+    """
+    Wrap a loaded model in the configured inference engine
+
+    Settings default to INFERENCE_ENGINE, ENGINE_BATCH_BUCKETS and
+    ENGINE_XLA. Models that are not Keras models (TFLite, traced
+    SavedModels, remote models, already compiled ones) are returned as-is.
+    """
+    from config.inference_config import InferenceConfig
+
+    engine = engine or InferenceConfig.INFERENCE_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine '{engine}'. Use one of: {list(ENGINES)}")
+    if engine == 'keras' or isinstance(model, CompiledModel) or not _is_keras_model(model):
+        return model
+    return CompiledModel(
+        model,
+        buckets=buckets if buckets is not None else InferenceConfig.engine_batch_buckets(),
+        xla=InferenceConfig.ENGINE_XLA if xla is None else xla
+    )
@@ -0,0 +1,42 @@
+"""
+Ensemble Fusion
+Combine per-model class probabilities into one ensemble prediction
+"""
+from typing import Dict, Optional
+import numpy as np
+
+FUSION_METHODS = ('mean', 'max', 'vote')
+
+def fuse_probabilities(probabilities: Dict[str, np.ndarray], method: str = 'mean',
+                       weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Fuse {model_name: class probabilities} into one probability vector
+
+    mean: weighted average of the probability vectors
+    max:  the vector of the single most confident model
+    vote: weighted share of models voting for each class (ties fall back to mean)
+    """
+    if not probabilities:
+        raise ValueError("No model outputs to fuse")
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}'. Use one of: {', '.join(FUSION_METHODS)}")
+
+    weights = weights or {}
+    names = list(probabilities)
+    stacked = np.stack([np.asarray(probabilities[name], dtype=np.float64) for name in names])
+    w = np.array([weights.get(name, 1.0) for name in names], dtype=np.float64)
+    if w.sum() <= 0:
+        w = np.ones_like(w)
+
+    mean = (stacked * w[:, None]).sum(axis=0) / w.sum()
+    if method == 'mean':
+        return mean
+    if method == 'max':
+        return stacked[int(np.argmax(stacked.max(axis=1)))]
+
+    votes = np.zeros(stacked.shape[1])
+    for row, weight in zip(stacked, w):
+        votes[int(np.argmax(row))] += weight
+    if np.count_nonzero(votes == votes.max()) > 1:
+        return mean
+    return votes / votes.sum()
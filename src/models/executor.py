@@ -0,0 +1,147 @@
+"""
+Inference Executor
+Bounded worker pool that keeps blocking decode/inference work off the asyncio event loop,
+and a monitor that measures how well the loop is kept free
+"""
+import asyncio
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor already holds its maximum number of requests"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class InferenceExecutor:
+    """
+    Thread pool for CPU-bound request work plus admission control
+
+    TensorFlow and PIL release the GIL during heavy work, so threads give
+    real parallelism here without copying models into child processes.
+    Requests hold an admission slot for their whole lifetime (decode,
+    batching queue and forward pass); once every slot is taken new
+    requests are rejected instead of queueing without bound.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 64, retry_after: int = 1):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._admitted_total = 0
+        self._rejected_total = 0
+
+    def acquire(self):
+        """
+        Take one request slot, or raise ExecutorSaturated when none is free
+
+        For slots that outlive a with-block (e.g. a streamed response);
+        every successful acquire() must be paired with one release().
+        """
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self._rejected_total += 1
+                raise ExecutorSaturated(self.retry_after)
+            self._in_flight += 1
+            self._admitted_total += 1
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    @contextmanager
+    def admission(self):
+        """Hold one request slot, or raise ExecutorSaturated when none is free"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking callable on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """Run a blocking callable on the pool from synchronous code"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        """Pool size and admission counters"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'in_flight': self._in_flight,
+                'admitted_total': self._admitted_total,
+                'rejected_total': self._rejected_total
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and wait for running tasks"""
+        self._pool.shutdown(wait=wait)
+
+class EventLoopMonitor:
+    """
+    Event-loop lag: how late a periodic sleep on the loop wakes up
+
+    Anything that blocks the loop (decoding or inference run inline, a slow
+    sync handler) delays every request by the same amount, and shows up
+    here as lag. Percentiles cover the last window samples.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self._recent = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        """Start sampling on the running loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._recent.append(lag)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        """Lag in milliseconds: recent percentiles plus running totals"""
+        recent = np.asarray(self._recent) * 1000 if self._recent else np.zeros(1)
+        return {
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'total_lag_ms': self.total_lag * 1000,
+            'max_lag_ms': self.max_lag * 1000,
+            'recent_p50_ms': float(np.percentile(recent, 50)),
+            'recent_p99_ms': float(np.percentile(recent, 99)),
+            'recent_max_ms': float(recent.max())
+        }
@@ -0,0 +1,279 @@
+"""
+Shared Inference Process
+One process loads the models and runs every forward pass; any number of
+HTTP worker processes reach it over a local socket (multiprocessing
+connections, authenticated with a shared key). Model memory is paid once no
+matter how many workers serve HTTP, and single-image requests from all
+workers are micro-batched together.
+
+TensorFlow is not fork-safe once initialised, so models are not shared by
+forking a loaded parent; workers never import TensorFlow at all.
+
+    python serve.py --workers 4     # inference process + 4 uvicorn workers
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener, AuthenticationError
+from typing import Dict, List, Optional
+import numpy as np
+import logging
+
+from src.models.batching import BatchScheduler
+from src.models.registry import process_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+class InferenceServer:
+    """Serves a ModelManager to other processes; one thread per client connection"""
+
+    def __init__(self, manager, address: str, authkey: bytes,
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.manager = manager
+        self.address = address
+        self.authkey = authkey
+        self.scheduler = BatchScheduler(self._predict_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.started = time.time()
+        self.connections_total = 0
+        self.connections_open = 0
+        self.requests_total = 0
+        self._lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._ops = {
+            'ping': lambda: True,
+            'describe': self.describe,
+            'predict': self.predict,
+            'predict_models': manager.predict_models,
+            'prediction_groups': manager.prediction_groups,
+            'preload': manager.preload,
+            'register_variant': manager.register_variant,
+            'version': manager.version,
+            'content_hash': manager.content_hash,
+            'is_loaded': manager.is_loaded,
+            'state': manager.state,
+            'stats': manager.stats,
+            'backbone_stats': manager.backbone_stats,
+            'warm_up_state': manager.warm_up_state,
+            'server_stats': self.server_stats
+        }
+
+    def _predict_batch(self, model_name: str, batch: np.ndarray) -> np.ndarray:
+        with self.manager.use(model_name) as model:
+            return model.predict(batch, verbose=0)
+
+    def predict(self, model_name: str, batch: np.ndarray) -> np.ndarray:
+        """Forward pass; single images from every worker are coalesced into shared batches"""
+        if len(batch) == 1:
+            return self.scheduler.submit(model_name, batch).result().probabilities[np.newaxis]
+        return np.asarray(self._predict_batch(model_name, batch))
+
+    def describe(self) -> dict:
+        return {
+            'available': self.manager.available,
+            'classifiers': self.manager.classifiers,
+            'precisions': self.manager.precisions,
+            'pid': os.getpid()
+        }
+
+    def server_stats(self) -> dict:
+        with self._lock:
+            counters = {
+                'connections_open': self.connections_open,
+                'connections_total': self.connections_total,
+                'requests_total': self.requests_total
+            }
+        return {
+            'pid': os.getpid(),
+            'address': self.address,
+            'uptime': time.time() - self.started,
+            'rss_bytes': process_rss_bytes(),
+            'batching': self.scheduler.stats(),
+            **counters
+        }
+
+    def _handle(self, conn):
+        with self._lock:
+            self.connections_total += 1
+            self.connections_open += 1
+        try:
+            while True:
+                try:
+                    op, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                with self._lock:
+                    self.requests_total += 1
+                try:
+                    if op not in self._ops:
+                        raise ValueError(f"Unknown operation '{op}'")
+                    reply = ('ok', self._ops[op](*args))
+                except Exception as e:
+                    reply = ('error', f"{type(e).__name__}: {str(e)}")
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+        finally:
+            conn.close()
+            with self._lock:
+                self.connections_open -= 1
+
+    def serve_forever(self):
+        """Accept worker connections until close() is called"""
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        self._listener = Listener(self.address, authkey=self.authkey)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.chmod(self.address, 0o600)
+        logger.info(f"Inference process {os.getpid()} listening on {self.address}")
+
+        while True:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                logger.warning("Rejected inference connection with a wrong key")
+                continue
+            except OSError:
+                break  # listener closed
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+        self.scheduler.shutdown()
+
+class RemoteModel:
+    """Stand-in for a model living in the inference process"""
+
+    def __init__(self, manager: "RemoteModelManager", model_name: str):
+        self.manager = manager
+        self.model_name = model_name
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        return self.manager._call('predict', self.model_name, np.ascontiguousarray(batch, dtype=np.float32))
+
+class RemoteModelManager:
+    """The ModelManager interface used by the API, answered by an InferenceServer"""
+
+    def __init__(self, address: str, authkey: bytes, connect_timeout: float = 60.0):
+        self.address = address
+        self.authkey = authkey
+        self._pool: "queue.LifoQueue" = queue.LifoQueue()
+
+        # The inference process may still be starting up
+        deadline = time.time() + connect_timeout
+        while True:
+            try:
+                info = self._call('describe')
+                break
+            except (ConnectionError, OSError):
+                if time.time() > deadline:
+                    raise ConnectionError(f"No inference process at {address}")
+                time.sleep(0.2)
+        self.available: List[str] = info['available']
+        self.classifiers: List[str] = info['classifiers']
+        self.precisions: Dict[str, str] = info['precisions']
+        self.server_pid = info['pid']
+        logger.info(f"Using inference process {self.server_pid} at {address} for {self.available}")
+
+    def _call(self, op: str, *args):
+        """Send one request on a pooled connection (connections are not shared between threads)"""
+        for attempt in range(2):
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                try:
+                    conn = Client(self.address, authkey=self.authkey)
+                except (FileNotFoundError, ConnectionRefusedError) as e:
+                    raise ConnectionError(f"Inference process unavailable: {str(e)}")
+            try:
+                conn.send((op, args))
+                status, result = conn.recv()
+            except (EOFError, OSError) as e:
+                conn.close()
+                # A pooled connection may predate an inference-process restart; retry once on a new one
+                if attempt == 0:
+                    continue
+                raise ConnectionError(f"Inference process unavailable: {str(e)}")
+            self._pool.put(conn)
+            if status == 'error':
+                raise RuntimeError(result)
+            return result
+
+    def version(self, model_name: str) -> Optional[str]:
+        return self._call('version', model_name)
+
+    def content_hash(self, model_name: str) -> Optional[str]:
+        return self._call('content_hash', model_name)
+
+    def is_loaded(self, model_name: str) -> bool:
+        return self._call('is_loaded', model_name)
+
+    def get(self, model_name: str) -> RemoteModel:
+        return RemoteModel(self, model_name)
+
+    @contextmanager
+    def use(self, model_name: str):
+        # The inference process pins the model for the duration of each forward pass
+        yield RemoteModel(self, model_name)
+
+    def preload(self, model_names):
+        self._call('preload', list(model_names))
+
+    def register_variant(self, model_name: str, precision: str, max_auc_drop: float = 0.01) -> str:
+        variant_name = self._call('register_variant', model_name, precision, max_auc_drop)
+        if variant_name not in self.available:
+            self.available.append(variant_name)
+            self.precisions[variant_name] = precision
+        return variant_name
+
+    def predict_models(self, img_array: np.ndarray, model_names: List[str]) -> Dict[str, dict]:
+        return self._call('predict_models', np.ascontiguousarray(img_array, dtype=np.float32), list(model_names))
+
+    def prediction_groups(self, model_names: List[str]) -> List[List[str]]:
+        return self._call('prediction_groups', list(model_names))
+
+    def state(self) -> Dict[str, dict]:
+        return self._call('state')
+
+    def stats(self) -> dict:
+        return self._call('stats')
+
+    def backbone_stats(self) -> Optional[dict]:
+        return self._call('backbone_stats')
+
+    def warm_up_state(self) -> dict:
+        return self._call('warm_up_state')
+
+    def server_stats(self) -> dict:
+        return self._call('server_stats')
+
+def run_inference_server(address: Optional[str] = None, authkey: Optional[bytes] = None):
+    """Entry point of the inference process: load the configured models and serve them"""
+    from config.inference_config import InferenceConfig
+    from src.models.model_manager import build_model_manager
+    from src.utils.thread_tuning import apply_thread_config
+
+    logging.basicConfig(level=logging.INFO)
+    # The one process running forward passes gets the whole host's threads
+    apply_thread_config(workers=1)
+    server = InferenceServer(
+        build_model_manager(),
+        address or InferenceConfig.INFERENCE_ADDRESS,
+        authkey or InferenceConfig.INFERENCE_AUTHKEY.encode(),
+        max_batch_size=InferenceConfig.BATCH_MAX_SIZE,
+        max_wait_ms=InferenceConfig.BATCH_MAX_WAIT_MS
+    )
+    if InferenceConfig.MODEL_WARMUP:
+        # Workers can connect meanwhile; their /health/ready waits for this
+        threading.Thread(target=server.manager.warm_up, name='warm-up', daemon=True, kwargs={
+            'model_names': InferenceConfig.warmup_models(),
+            'batch_sizes': InferenceConfig.warmup_batch_sizes(),
+            'iterations': InferenceConfig.WARMUP_ITERATIONS
+        }).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
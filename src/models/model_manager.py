@@ -0,0 +1,336 @@
+"""
+Lazy Model Manager
+Maps model names to files and loads each model on first use through a
+ModelRegistry (one loader per model, so concurrent first requests wait for
+a single load). With a memory budget the least-recently-used idle models
+are evicted, so a worker only holds the models it is actually asked for.
+Classifiers in memory share one ResNet50 trunk pass (see shared_backbone).
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import logging
+
+from src.models.registry import ModelRegistry, file_version
+from src.models.quantization import FULL_PRECISION, resolve_variant
+from src.models.artifacts import artifact_format, model_hash
+from src.models.backends import resolve_backend
+from src.models.engine import warm_up_model
+from src.models.shared_backbone import SharedBackboneRunner
+
+logger = logging.getLogger(__name__)
+
+class ModelManager:
+    """Name → model lookup with lazy loading, pinning and load-state reporting"""
+
+    def __init__(self, model_files: Dict[str, str], models_dir: str = "models",
+                 classifiers: Iterable[str] = (), precision: str = FULL_PRECISION,
+                 max_auc_drop: float = 0.01, model_format: str = 'auto', memory_budget: Optional[int] = None,
+                 activation_cache_size: int = 64, registry: Optional[ModelRegistry] = None, backend: str = 'tf'):
+        self.models_dir = models_dir
+        self.model_files = dict(model_files)
+        self.activation_cache_size = activation_cache_size
+        self.registry = registry or ModelRegistry(memory_budget=memory_budget)
+        self.paths: Dict[str, str] = {}
+        self.precisions: Dict[str, str] = {}
+        self._classifiers = set(classifiers)
+        self._loading = set()
+        self._lock = threading.Lock()
+        self._runner: Optional[SharedBackboneRunner] = None
+        self._runner_models: Dict[str, object] = {}
+        self._runner_lock = threading.Lock()
+        self._warm_up = {'state': 'pending', 'models': {}, 'errors': {}, 'skipped': {}, 'seconds': None}
+        # The runner holds its models, so it has to go when the registry drops one of them
+        self.registry.add_eviction_listener(self._model_dropped)
+
+        # Only file lookups and hashing happen here; nothing is loaded until first use
+        for model_name, model_file in model_files.items():
+            model_path = os.path.join(models_dir, model_file)
+            if not os.path.exists(model_path):
+                logger.warning(f"⚠️ Model file not found: {model_path}")
+                continue
+            # ONNX/TFLite exports or fast-start artifacts from convert_models.py when present
+            self.paths[model_name] = resolve_backend(model_path, backend, model_format)
+            self.precisions[model_name] = FULL_PRECISION
+            if precision != FULL_PRECISION and model_name in self._classifiers:
+                try:
+                    self.paths[model_name] = resolve_variant(model_path, precision, max_auc_drop)
+                    self.precisions[model_name] = precision
+                except Exception as e:
+                    logger.error(f"❌ {str(e)}; serving {model_name} at full precision")
+
+        logger.info(f"Available models: {self.available} (loaded on first use)")
+
+    def register_variant(self, model_name: str, precision: str, max_auc_drop: float = 0.01) -> str:
+        """
+        Serve the quantized variant of model_name next to it, as '<model_name>_<precision>'
+
+        Used for a cheap first stage (see cascade.py). Raises like
+        resolve_variant() when the variant is missing, stale or fails the
+        AUC gate. Variants are not classifiers, so ensembles skip them.
+        """
+        variant_name = f"{model_name}_{precision}"
+        if variant_name not in self.paths:
+            model_path = os.path.join(self.models_dir, self.model_files[model_name])
+            self.paths[variant_name] = resolve_variant(model_path, precision, max_auc_drop)
+            self.precisions[variant_name] = precision
+            logger.info(f"Serving the {precision} variant of {model_name} as {variant_name}")
+        return variant_name
+
+    @property
+    def available(self) -> List[str]:
+        return list(self.paths)
+
+    @property
+    def classifiers(self) -> List[str]:
+        return [name for name in self.paths if name in self._classifiers]
+
+    def version(self, model_name: str) -> Optional[str]:
+        """Version of the file served for model_name (no load needed)"""
+        path = self.paths.get(model_name)
+        return file_version(path) if path else None
+
+    def content_hash(self, model_name: str) -> Optional[str]:
+        """Content hash of the file served for model_name; unlike version(), survives a copy or touch"""
+        path = self.paths.get(model_name)
+        return model_hash(path) if path else None
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self.paths and self.registry.is_loaded(self.paths[model_name])
+
+    def get(self, model_name: str):
+        """The model, loading it first if it is not in memory"""
+        path = self.paths[model_name]
+        if self.registry.is_loaded(path):
+            return self.registry.get(path, compile=False)
+        with self._lock:
+            self._loading.add(model_name)
+        try:
+            return self.registry.get(path, compile=False)
+        finally:
+            with self._lock:
+                self._loading.discard(model_name)
+
+    @contextmanager
+    def use(self, model_name: str):
+        """get() the model and keep it from being evicted until the block exits"""
+        path = self.paths[model_name]
+        with self._lock:
+            loading = not self.registry.is_loaded(path)
+            if loading:
+                self._loading.add(model_name)
+        try:
+            model = self.registry.acquire(path, compile=False)
+        finally:
+            if loading:
+                with self._lock:
+                    self._loading.discard(model_name)
+        try:
+            yield model
+        finally:
+            self.registry.release(path)
+
+    def preload(self, model_names: Iterable[str]):
+        """Load models ahead of their first request"""
+        for model_name in model_names:
+            if model_name in self.paths:
+                self.get(model_name)
+            else:
+                logger.warning(f"⚠️ Cannot preload unknown model '{model_name}'")
+
+    def warm_up(self, model_names: Optional[Iterable[str]] = None, batch_sizes: Iterable[int] = (1,),
+                iterations: int = 1) -> dict:
+        """
+        Load models and run synthetic batches of every size through them
+
+        The first request then runs at steady-state latency: graphs are
+        traced (one per engine bucket) and buffers allocated here. The
+        shared trunk's graphs are warmed for the single-image calls the
+        multi-model endpoints make. model_names defaults to the classifiers
+        (other models stay lazy). With a memory budget, models that would
+        not fit next to those already warmed are skipped rather than
+        evicting them. A model that fails to load is reported in the state
+        and skipped. Returns warm_up_state().
+        """
+        model_names = list(model_names) if model_names is not None else self.classifiers
+        batch_sizes = list(batch_sizes)
+        started = time.time()
+        with self._lock:
+            self._warm_up = {'state': 'running', 'models': {}, 'errors': {}, 'skipped': {}, 'seconds': None}
+        for model_name in model_names:
+            if model_name not in self.paths:
+                logger.warning(f"⚠️ Cannot warm up unknown model '{model_name}'")
+                continue
+            if not self._fits_budget(model_name):
+                logger.warning(f"⚠️ Not warming up {model_name}: it does not fit the model memory budget "
+                               f"next to {list(self._warm_up['models'])} (it loads on first use)")
+                with self._lock:
+                    self._warm_up['skipped'][model_name] = "over the model memory budget"
+                continue
+            model_started = time.time()
+            try:
+                with self.use(model_name) as model:
+                    warm_up_model(model, batch_sizes, iterations)
+            except Exception as e:
+                logger.error(f"❌ Warm-up of {model_name} failed: {str(e)}")
+                with self._lock:
+                    self._warm_up['errors'][model_name] = str(e)
+                continue
+            with self._lock:
+                self._warm_up['models'][model_name] = time.time() - model_started
+            logger.info(f"🔥 Warmed up {model_name} for batch sizes {batch_sizes} "
+                        f"in {time.time() - model_started:.1f}s")
+
+        try:
+            self._shared_runner().warm_up(iterations)
+        except Exception as e:
+            logger.error(f"❌ Warm-up of the shared backbone failed: {str(e)}")
+            with self._lock:
+                self._warm_up['errors']['shared_backbone'] = str(e)
+        with self._lock:
+            self._warm_up.update(state='done', seconds=time.time() - started)
+        return self.warm_up_state()
+
+    def _fits_budget(self, model_name: str) -> bool:
+        """Whether loading model_name keeps the loaded models within the registry's budget"""
+        budget = self.registry.memory_budget
+        if budget is None or self.is_loaded(model_name):
+            return True
+        # The file size stands in for the weight memory until the model is loaded
+        return self.registry.memory_bytes() + os.path.getsize(self.paths[model_name]) <= budget
+
+    def warm_up_state(self) -> dict:
+        """
+        Progress of warm_up(): state is pending, running or done
+
+        models holds the warmed models still in memory (with their warm-up
+        seconds); ones evicted since are listed under evicted, as their
+        next request loads and traces them again.
+        """
+        with self._lock:
+            state = {**self._warm_up, 'errors': dict(self._warm_up['errors']),
+                     'skipped': dict(self._warm_up.get('skipped', {}))}
+            warmed = dict(self._warm_up['models'])
+        state['models'] = {name: seconds for name, seconds in warmed.items() if self.is_loaded(name)}
+        state['evicted'] = [name for name in warmed if name not in state['models']]
+        return state
+
+    def loaded(self) -> Dict[str, object]:
+        """The models currently in memory (never triggers a load)"""
+        models = {}
+        for model_name, path in self.paths.items():
+            model = self.registry.peek(path)
+            if model is not None:
+                models[model_name] = model
+        return models
+
+    def _model_dropped(self, path: str):
+        """Registry callback: forget the shared runner if it holds the dropped model"""
+        with self._runner_lock:
+            if any(os.path.abspath(self.paths.get(name, '')) == path for name in self._runner_models):
+                logger.info(f"Dropping the shared-trunk runner: {os.path.basename(path)} left memory")
+                self._runner = None
+                self._runner_models = {}
+
+    def _shared_runner(self) -> SharedBackboneRunner:
+        """Shared-trunk runner over the classifiers currently in memory, rebuilt when that set changes"""
+        loaded = {name: model for name, model in self.loaded().items() if name in self._classifiers}
+        with self._runner_lock:
+            if (self._runner is None or loaded.keys() != self._runner_models.keys()
+                    or any(loaded[name] is not self._runner_models[name] for name in loaded)):
+                self._runner = SharedBackboneRunner(loaded, activation_cache_size=self.activation_cache_size)
+                self._runner_models = loaded
+            return self._runner
+
+    def predict_models(self, img_array: np.ndarray, model_names: List[str]) -> Dict[str, dict]:
+        """
+        Run several classifiers on one preprocessed image
+
+        Models that embed the same ResNet50 weights share one trunk pass,
+        and trunk activations are cached per image. Returns
+        {model_name: {'probabilities': ndarray, 'time': seconds}}.
+        """
+        with ExitStack() as stack:
+            # Loads any model not in memory yet and pins all of them for this call
+            models = {name: stack.enter_context(self.use(name)) for name in model_names}
+            runner = self._shared_runner()
+            results = runner.predict(img_array, [n for n in model_names if n in runner.heads])
+            for model_name in model_names:
+                if model_name not in results:
+                    start = time.time()
+                    prediction = models[model_name].predict(img_array, verbose=0)
+                    results[model_name] = {'probabilities': np.asarray(prediction), 'time': time.time() - start}
+        return {name: results[name] for name in model_names}
+
+    def prediction_groups(self, model_names: List[str]) -> List[List[str]]:
+        """
+        Split model_names into predict_models() calls that can run concurrently:
+        the models sharing a trunk together, every other model on its own
+        """
+        # Models still on disk load first, so the shared trunk covers all of them
+        self.preload([name for name in model_names if not self.is_loaded(name)])
+        heads = self._shared_runner().heads
+        shared = [name for name in model_names if name in heads]
+        return ([shared] if shared else []) + [[name] for name in model_names if name not in shared]
+
+    def backbone_stats(self) -> Optional[dict]:
+        return self._runner.stats() if self._runner is not None else None
+
+    def state(self) -> Dict[str, dict]:
+        """Load state of every available model"""
+        registry_stats = self.registry.stats()
+        state = {}
+        for model_name, path in self.paths.items():
+            entry = registry_stats.get(os.path.abspath(path))
+            if entry is not None:
+                status = 'loaded'
+            elif model_name in self._loading:
+                status = 'loading'
+            else:
+                status = 'not_loaded'
+            state[model_name] = {
+                'state': status,
+                'precision': self.precisions[model_name],
+                'file': os.path.basename(path),
+                'format': artifact_format(path),
+                'memory_bytes': entry['memory_bytes'] if entry else 0,
+                'load_time': entry['load_time'] if entry else None,
+                'last_used': entry['last_used'] if entry else None,
+                'in_use': entry['refcount'] if entry else 0
+            }
+        return state
+
+    def stats(self) -> dict:
+        """Memory use against the budget plus per-model load state"""
+        return {
+            'memory_bytes': self.registry.memory_bytes(),
+            'memory_budget_bytes': self.registry.memory_budget,
+            'evictions': self.registry.evictions,
+            'models': self.state()
+        }
+
+def build_model_manager(precision: Optional[str] = None) -> ModelManager:
+    """ModelManager for the API's models, configured from InferenceConfig"""
+    from config.inference_config import InferenceConfig
+
+    manager = ModelManager(
+        InferenceConfig.MODEL_FILES,
+        models_dir=InferenceConfig.MODELS_DIR,
+        classifiers=InferenceConfig.CLASSIFIER_MODELS,
+        precision=precision or InferenceConfig.MODEL_PRECISION,
+        max_auc_drop=InferenceConfig.MAX_AUC_DROP,
+        model_format=InferenceConfig.MODEL_FORMAT,
+        memory_budget=InferenceConfig.memory_budget_bytes(),
+        activation_cache_size=InferenceConfig.ACTIVATION_CACHE_SIZE,
+        backend=InferenceConfig.MODEL_BACKEND
+    )
+    for model_name in InferenceConfig.preload_models():
+        try:
+            manager.preload([model_name])
+            logger.info(f"✅ Preloaded {model_name} model")
+        except Exception as e:
+            logger.error(f"❌ Failed to load {model_name}: {str(e)}")
+    return manager
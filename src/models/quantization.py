@@ -0,0 +1,177 @@
+"""
+Post-training Quantization
+Convert Keras models to dynamic-range / float16 / int8 TFLite variants, serve
+them through a predict()-compatible wrapper and gate them on measured AUC.
+
+Variants live next to the originals:
+    models/quantized/<model stem>.<precision>.tflite
+    models/quantized/<model stem>.<precision>.json   (accuracy/latency manifest)
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ('dynamic', 'float16', 'int8')
+FULL_PRECISION = 'fp32'
+
+def variant_paths(model_path: str, precision: str) -> Tuple[str, str]:
+    """(tflite path, manifest path) for a model file and precision"""
+    models_dir, model_file = os.path.split(model_path)
+    stem = os.path.splitext(model_file)[0]
+    base = os.path.join(models_dir, 'quantized', f"{stem}.{precision}")
+    return f"{base}.tflite", f"{base}.json"
+
+def convert_model(model, precision: str,
+                  representative_data: Optional[Callable[[], Iterable[np.ndarray]]] = None) -> bytes:
+    """
+    Convert a Keras model to a quantized TFLite flatbuffer
+
+    dynamic: int8 weights, float activations (no calibration needed)
+    float16: float16 weights
+    int8:    int8 weights and activations, calibrated on representative_data
+             (inputs/outputs stay float32 so callers do not change)
+    """
+    import tensorflow as tf
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Use one of: {', '.join(PRECISIONS)}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif precision == 'int8':
+        if representative_data is None:
+            raise ValueError("int8 quantization needs representative (calibration) data")
+        converter.representative_dataset = lambda: ([batch] for batch in representative_data())
+    return converter.convert()
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+class TFLiteModel:
+    """TFLite interpreter with the model.predict(batch, verbose=0) interface used everywhere else"""
+
+    def __init__(self, model_path: Optional[str] = None, model_content: Optional[bytes] = None,
+                 num_threads: Optional[int] = None):
+        Interpreter = _interpreter_class()
+        self.model_path = model_path
+        self._interpreter = Interpreter(model_path=model_path, model_content=model_content, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()
+        self.size_bytes = os.path.getsize(model_path) if model_path else len(model_content)
+
+        self.input_shape = (None,) + tuple(int(d) for d in self._input['shape'][1:])
+        self.output_shape = (None,) + tuple(int(d) for d in self._output['shape'][1:])
+        # No Keras variables; registry memory accounting falls back to size_bytes
+        self.weights = []
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=self._input['dtype'])
+        # One interpreter holds one set of tensors, so calls are serialized
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input['index'], list(batch.shape))
+                self._interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self._interpreter.set_tensor(self._input['index'], batch)
+            self._interpreter.invoke()
+            return np.array(self._interpreter.get_tensor(self._output['index']))
+
+    def __call__(self, batch, training=False):
+        return self.predict(np.asarray(batch))
+
+def roc_auc(labels: np.ndarray, scores: np.ndarray) -> float:
+    """Area under the ROC curve via the Mann-Whitney rank statistic (ties averaged)"""
+    labels = np.asarray(labels).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    positives, negatives = labels.sum(), (~labels).sum()
+    if positives == 0 or negatives == 0:
+        return float('nan')
+
+    order = np.argsort(scores, kind='mergesort')
+    ranks = np.empty(len(scores), dtype=np.float64)
+    sorted_scores = scores[order]
+    i = 0
+    while i < len(scores):
+        j = i
+        while j + 1 < len(scores) and sorted_scores[j + 1] == sorted_scores[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2.0 + 1
+        i = j + 1
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+def evaluate(model, images: np.ndarray, labels: np.ndarray, batch_size: int = 32) -> dict:
+    """AUC/accuracy on a labelled sample plus single-image latency"""
+    probabilities = np.concatenate([
+        np.asarray(model.predict(images[i:i + batch_size], verbose=0))
+        for i in range(0, len(images), batch_size)
+    ])
+    latencies = []
+    for img in images[:min(len(images), 20)]:
+        start = time.perf_counter()
+        model.predict(img[np.newaxis], verbose=0)
+        latencies.append(time.perf_counter() - start)
+    return {
+        'auc': roc_auc(labels, probabilities[:, 1]),
+        'accuracy': float((probabilities.argmax(axis=1) == labels).mean()),
+        'latency_ms': 1000 * float(np.median(latencies)),
+        'probabilities': probabilities
+    }
+
+def write_manifest(manifest_path: str, manifest: dict):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def check_gate(manifest: dict, max_auc_drop: float) -> Tuple[bool, str]:
+    """Accept a variant only if its AUC is within max_auc_drop of the full-precision model"""
+    auc, baseline = manifest.get('auc'), manifest.get('baseline_auc')
+    if auc is None or baseline is None or np.isnan(auc) or np.isnan(baseline):
+        return False, "no accuracy measurement in manifest (run quantize_models.py with test data)"
+    drop = baseline - auc
+    if drop > max_auc_drop:
+        return False, f"AUC drops {drop:.4f} ({baseline:.4f} → {auc:.4f}), limit is {max_auc_drop:.4f}"
+    return True, f"AUC {auc:.4f} vs {baseline:.4f} (drop {drop:+.4f})"
+
+def resolve_variant(model_path: str, precision: str, max_auc_drop: float) -> str:
+    """
+    Path of the quantized variant of model_path, refusing it if it is
+    missing, built from a different model file, or fails the accuracy gate
+    """
+    from src.models.artifacts import model_hash
+
+    tflite_path, manifest_path = variant_paths(model_path, precision)
+    if not os.path.exists(tflite_path) or not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No {precision} variant for {model_path} (run quantize_models.py)")
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    # Content hash, not mtime: copying models to another host or image keeps their variants valid
+    if manifest.get('source_hash') != model_hash(model_path):
+        raise ValueError(f"{tflite_path} was built from an older {os.path.basename(model_path)}; re-run quantize_models.py")
+
+    ok, reason = check_gate(manifest, max_auc_drop)
+    if not ok:
+        raise ValueError(f"Refusing {precision} variant of {os.path.basename(model_path)}: {reason}")
+    logger.info(f"Accepted {precision} variant of {os.path.basename(model_path)}: {reason}")
+    return tflite_path
+
+def load_variant(model_path: str, precision: str, max_auc_drop: float,
+                 num_threads: Optional[int] = None) -> TFLiteModel:
+    """Load the quantized variant of model_path if resolve_variant() accepts it"""
+    return TFLiteModel(resolve_variant(model_path, precision, max_auc_drop), num_threads=num_threads)
@@ -0,0 +1,273 @@
+"""
+Process-wide Model Registry
+Loads each model file once per process and reuses it across callers,
+Streamlit reruns and sessions. Reloads automatically when the file changes,
+counts the holders of each model and reports the memory the weights occupy.
+With a memory budget, least-recently-used models nobody holds are evicted
+to make room for new ones.
+"""
+import os
+import sys
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _default_loader(path: str, compile: bool = True):
+    from src.models.backends import load_model_file
+    return load_model_file(path, compile=compile)
+
+def model_memory_bytes(model) -> int:
+    """Bytes held by a model's weights (computed from shapes, no copies)"""
+    if not getattr(model, 'weights', None) and hasattr(model, 'size_bytes'):
+        # Flatbuffer-backed models (TFLite) report their file size
+        return model.size_bytes
+    total = 0
+    for weight in getattr(model, 'weights', []):
+        dtype = getattr(weight.dtype, 'name', weight.dtype)
+        total += int(np.prod(weight.shape)) * np.dtype(dtype).itemsize
+    return total
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, None where it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of a model file; changes whenever the file is replaced"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def file_version(path: str) -> str:
+    """Short version tag of a model file, derived from its signature"""
+    mtime_ns, size = file_signature(path)
+    return f"{mtime_ns:x}-{size:x}"
+
+class _Entry:
+    __slots__ = ('path', 'model', 'signature', 'load_time', 'loaded_at', 'last_used', 'warmed_up', 'memory_bytes')
+
+    def __init__(self, path, model, signature, load_time):
+        self.path = path
+        self.model = model
+        self.signature = signature
+        self.load_time = load_time
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.warmed_up = False
+        self.memory_bytes = model_memory_bytes(model)
+
+class ModelRegistry:
+    """Thread-safe cache of loaded models keyed by absolute file path"""
+
+    def __init__(self, loader: Optional[Callable] = None, memory_budget: Optional[int] = None):
+        self.loader = loader or _default_loader
+        self.memory_budget = memory_budget  # bytes of weights; None means unlimited
+        self.evictions = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._path_locks: Dict[str, threading.Lock] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._eviction_listeners: List[weakref.WeakMethod] = []
+
+    def add_eviction_listener(self, callback: Callable[[str], None]):
+        """
+        Call callback(path) whenever a loaded model is dropped (evicted, invalidated or reloaded)
+
+        callback must be a bound method; it is held weakly, so the registry
+        does not keep its owner alive. Owners that keep references to models
+        (e.g. ModelManager's shared-trunk runner) drop them here, so an
+        evicted model's memory is actually freed.
+        """
+        with self._lock:
+            self._eviction_listeners = [ref for ref in self._eviction_listeners if ref() is not None]
+            self._eviction_listeners.append(weakref.WeakMethod(callback))
+
+    def _notify_dropped(self, paths: Iterable[str]):
+        paths = list(paths)
+        if not paths:
+            return
+        for ref in list(self._eviction_listeners):
+            callback = ref()
+            if callback is None:
+                continue
+            for path in paths:
+                try:
+                    callback(path)
+                except Exception as e:
+                    logger.error(f"Eviction listener failed for {path}: {str(e)}")
+
+    def _path_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def get(self, path: str, compile: bool = True, warm_up: bool = False):
+        """
+        Return the model stored at path, loading it on first use
+
+        The file is re-stat'ed on every call (microseconds); if it was
+        replaced since it was loaded the stale model is dropped and the
+        new file loaded in its place. compile only applies to the load
+        that actually reads the file.
+        """
+        path = os.path.abspath(path)
+        signature = file_signature(path)
+
+        entry = self._entries.get(path)
+        if entry is None or entry.signature != signature:
+            # One loader per path, so concurrent callers wait instead of loading twice
+            with self._path_lock(path):
+                entry = self._entries.get(path)
+                if entry is None or entry.signature != signature:
+                    if entry is not None:
+                        logger.info(f"Model file changed, reloading {path}")
+                    start = time.time()
+                    model = self.loader(path, compile=compile)
+                    replaced = entry is not None
+                    entry = _Entry(path, model, signature, time.time() - start)
+                    with self._lock:
+                        self._entries[path] = entry
+                    logger.info(f"Loaded {os.path.basename(path)} in {entry.load_time:.2f}s")
+                    if replaced:
+                        self._notify_dropped([path])
+                    self._enforce_budget(keep=path)
+
+        entry.last_used = time.time()
+        if warm_up and not entry.warmed_up:
+            self._warm_up(entry)
+        return entry.model
+
+    def _enforce_budget(self, keep: str):
+        """Evict least-recently-used models that nobody holds until the budget is met"""
+        if self.memory_budget is None:
+            return
+        evicted = []
+        with self._lock:
+            total = sum(entry.memory_bytes for entry in self._entries.values())
+            candidates = sorted(
+                (entry for path, entry in self._entries.items()
+                 if path != keep and self._refcounts.get(path, 0) == 0),
+                key=lambda entry: entry.last_used
+            )
+            for entry in candidates:
+                if total <= self.memory_budget:
+                    break
+                del self._entries[entry.path]
+                evicted.append(entry.path)
+                total -= entry.memory_bytes
+                self.evictions += 1
+                logger.info(f"Evicted {os.path.basename(entry.path)} "
+                            f"({entry.memory_bytes / 1024**2:.0f} MB) to stay within the model memory budget")
+        self._notify_dropped(evicted)
+        if total > self.memory_budget:
+            logger.warning(f"Loaded models use {total / 1024**2:.0f} MB, over the "
+                           f"{self.memory_budget / 1024**2:.0f} MB budget (remaining models are in use)")
+
+    def _warm_up(self, entry: _Entry):
+        """Run one dummy batch so the first real prediction skips graph tracing"""
+        with self._path_lock(entry.path):
+            if entry.warmed_up:
+                return
+            input_shape = tuple(dim or 1 for dim in entry.model.input_shape)
+            entry.model.predict(np.zeros(input_shape, dtype=np.float32), verbose=0)
+            entry.warmed_up = True
+
+    def warm_up(self, path: str):
+        """Load (if needed) and warm up the model at path"""
+        self.get(path, warm_up=True)
+
+    def acquire(self, path: str, compile: bool = True, warm_up: bool = False):
+        """get() the model and record one more holder; pair with release()"""
+        # Counted before loading so a concurrent load cannot evict it in between
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            self._refcounts[abs_path] = self._refcounts.get(abs_path, 0) + 1
+        try:
+            return self.get(path, compile=compile, warm_up=warm_up)
+        except Exception:
+            self.release(path)
+            raise
+
+    def release(self, path: str):
+        """Drop one holder recorded by acquire()"""
+        path = os.path.abspath(path)
+        with self._lock:
+            count = self._refcounts.get(path, 0) - 1
+            if count > 0:
+                self._refcounts[path] = count
+            else:
+                self._refcounts.pop(path, None)
+
+    def refcount(self, path: str) -> int:
+        """Number of holders that acquired path and have not released it"""
+        return self._refcounts.get(os.path.abspath(path), 0)
+
+    def memory_bytes(self) -> int:
+        """Total weight memory of every loaded model"""
+        return sum(entry.memory_bytes for entry in list(self._entries.values()))
+
+    def version(self, path: str) -> Optional[str]:
+        """Version tag of the loaded copy of path (None when not loaded)"""
+        entry = self._entries.get(os.path.abspath(path))
+        if entry is None:
+            return None
+        mtime_ns, size = entry.signature
+        return f"{mtime_ns:x}-{size:x}"
+
+    def invalidate(self, path: Optional[str] = None):
+        """Drop one cached model (or all of them) so the next get() reloads"""
+        with self._lock:
+            if path is None:
+                dropped = list(self._entries)
+                self._entries.clear()
+            else:
+                dropped = [os.path.abspath(path)] if self._entries.pop(os.path.abspath(path), None) else []
+        self._notify_dropped(dropped)
+
+    def is_loaded(self, path: str) -> bool:
+        return os.path.abspath(path) in self._entries
+
+    def peek(self, path: str):
+        """The loaded model at path, or None; never loads or reloads"""
+        entry = self._entries.get(os.path.abspath(path))
+        return entry.model if entry is not None else None
+
+    def stats(self) -> dict:
+        """Load state of every cached model"""
+        return {
+            path: {
+                'load_time': entry.load_time,
+                'loaded_at': entry.loaded_at,
+                'last_used': entry.last_used,
+                'warmed_up': entry.warmed_up,
+                'version': self.version(path),
+                'refcount': self.refcount(path),
+                'memory_bytes': entry.memory_bytes
+            }
+            for path, entry in list(self._entries.items())
+        }
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    """The registry shared by everything in this process"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
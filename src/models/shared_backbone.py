@@ -0,0 +1,228 @@
+"""
+Shared ResNet50 Backbone Inference
+The hybrid model and the ResNet50 classifier both embed a ResNet50 built
+with include_top=False on the same input. This module finds the deepest
+ResNet block whose weights (and every weight before it) are identical in
+all models, runs that trunk once, and feeds its activations to each
+model's own remaining layers (the "heads").
+
+Trunk activations are also cached per image, so asking for another model
+on an image that was already scored only pays for that model's head.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import logging
+
+from src.models.engine import compile_model, warm_up_model
+
+logger = logging.getLogger(__name__)
+
+BACKBONE_OUTPUT = "conv5_block3_out"
+
+# ResNet50 block outputs are single-tensor cut points: everything after
+# them in the ResNet depends only on that tensor
+_CUT_PATTERN = re.compile(r'^conv\d_block\d+_out$')
+
+def _model_class():
+    from tensorflow.keras.models import Model
+    return Model
+
+def cut_fingerprints(model, backbone_layer: str = BACKBONE_OUTPUT) -> "OrderedDict[str, str]":
+    """
+    Running hash of the backbone weights, snapshotted at every block output
+
+    Two models have an identical trunk up to block B exactly when their
+    fingerprints at B match.
+    """
+    Model = _model_class()
+    backbone = Model(model.inputs, model.get_layer(backbone_layer).output)
+    backbone_names = {layer.name for layer in backbone.layers}
+
+    digest = hashlib.blake2b(digest_size=16)
+    snapshots = OrderedDict()
+    for layer in model.layers:
+        if layer.name not in backbone_names:
+            continue
+        weights = layer.get_weights()
+        if weights:
+            digest.update(layer.name.encode())
+        for weight in weights:
+            digest.update(np.ascontiguousarray(weight).data)
+        if _CUT_PATTERN.match(layer.name):
+            snapshots[layer.name] = digest.copy().hexdigest()
+    return snapshots
+
+class SharedBackboneRunner:
+    """Runs several classifiers with one pass through their common ResNet trunk"""
+
+    def __init__(self, models: Dict[str, object], activation_cache_size: int = 64,
+                 backbone_layer: str = BACKBONE_OUTPUT):
+        self.models = dict(models)
+        self.activation_cache_size = activation_cache_size
+        self.cut_layer: Optional[str] = None
+        self.trunk_fingerprint: Optional[str] = None
+        self.trunk = None
+        self.heads: Dict[str, object] = {}
+        self.fused = None
+
+        self._activations: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.activation_hits = 0
+        self.activation_misses = 0
+        self.trunk_passes = 0
+
+        self._build(backbone_layer)
+
+    def _build(self, backbone_layer: str):
+        fingerprints = {}
+        for name, model in self.models.items():
+            if not hasattr(model, 'get_layer'):
+                # ONNX, TFLite and traced models expose no layers to split
+                logger.info(f"{name}: not a Keras graph, running it unshared")
+                continue
+            try:
+                fingerprints[name] = cut_fingerprints(model, backbone_layer)
+            except (ValueError, AttributeError):
+                logger.info(f"{name}: no {backbone_layer} layer, running it unshared")
+
+        if not fingerprints:
+            return
+
+        # Deepest block output at which every splittable model has identical weights
+        names = list(fingerprints)
+        for cut in reversed(list(fingerprints[names[0]].keys())):
+            values = {fingerprints[name].get(cut) for name in names}
+            if len(values) == 1 and None not in values:
+                self.cut_layer, self.trunk_fingerprint = cut, values.pop()
+                break
+
+        if self.cut_layer is None:
+            logger.info("Models share no backbone weights; running each model in full")
+            return
+
+        Model = _model_class()
+        first = self.models[names[0]]
+        self.trunk = Model(first.inputs, first.get_layer(self.cut_layer).output)
+        for name in names:
+            model = self.models[name]
+            features = model.get_layer(self.cut_layer).output
+            self.heads[name] = Model([model.inputs[0], features], model.outputs[0])
+
+        # One multi-head graph: trunk once, every head, plus the trunk activations for the cache
+        image = first.inputs[0]
+        shared = self.trunk(image)
+        self.fused = Model(image, [shared] + [self.heads[name]([image, shared]) for name in names])
+
+        # Compiled only now: the graphs above are built by calling trunk and heads symbolically
+        self.trunk = compile_model(self.trunk)
+        self.heads = {name: compile_model(head) for name, head in self.heads.items()}
+        self.fused = compile_model(self.fused)
+        logger.info(f"Shared backbone up to {self.cut_layer} across {names}")
+
+    def warm_up(self, iterations: int = 1):
+        """Trace the fused graph, trunk and heads for the single-image calls predict() makes"""
+        if not self.heads:
+            return
+        for graph in [self.fused, self.trunk] + list(self.heads.values()):
+            warm_up_model(graph, (1,), iterations)
+
+    @property
+    def shared_models(self) -> List[str]:
+        return list(self.heads)
+
+    def _image_keys(self, batch: np.ndarray) -> List[str]:
+        keys = []
+        for img in batch:
+            digest = hashlib.blake2b(np.ascontiguousarray(img).data, digest_size=16)
+            digest.update(self.trunk_fingerprint.encode())
+            keys.append(digest.hexdigest())
+        return keys
+
+    def _cache_activations(self, keys: List[str], activations: np.ndarray):
+        if self.activation_cache_size <= 0:
+            return
+        with self._lock:
+            for key, value in zip(keys, activations):
+                self._activations[key] = value
+                self._activations.move_to_end(key)
+            while len(self._activations) > self.activation_cache_size:
+                self._activations.popitem(last=False)
+
+    def _trunk_activations(self, batch: np.ndarray, keys: List[str]) -> np.ndarray:
+        """Trunk output for the batch, computing only the images not already cached"""
+        with self._lock:
+            cached = [self._activations.get(key) for key in keys]
+            for key, value in zip(keys, cached):
+                if value is not None:
+                    self._activations.move_to_end(key)
+            hits = sum(value is not None for value in cached)
+            self.activation_hits += hits
+            self.activation_misses += len(keys) - hits
+
+        missing = [i for i, value in enumerate(cached) if value is None]
+        if missing:
+            computed = np.asarray(self.trunk.predict(batch[missing], verbose=0))
+            with self._lock:
+                self.trunk_passes += 1
+            self._cache_activations([keys[i] for i in missing], computed)
+            for n, i in enumerate(missing):
+                cached[i] = computed[n]
+        return np.stack(cached)
+
+    def predict(self, batch: np.ndarray, model_names: Optional[List[str]] = None) -> Dict[str, dict]:
+        """
+        Probabilities per model for a preprocessed batch
+
+        Returns {model_name: {'probabilities': ndarray, 'time': seconds}}.
+        Shared models split the trunk time evenly; unshared ones are
+        timed individually.
+        """
+        model_names = list(model_names or self.models)
+        shared = [name for name in model_names if name in self.heads]
+        results = {}
+
+        if shared:
+            start = time.time()
+            keys = self._image_keys(batch)
+            if set(shared) == set(self.heads) and not any(key in self._activations for key in keys):
+                # Cold images, every head wanted: one call through the fused graph
+                outputs = self.fused.predict(batch, verbose=0)
+                with self._lock:
+                    self.trunk_passes += 1
+                    self.activation_misses += len(keys)
+                self._cache_activations(keys, np.asarray(outputs[0]))
+                per_head = dict(zip(self.heads, outputs[1:]))
+            else:
+                activations = self._trunk_activations(batch, keys)
+                per_head = {name: self.heads[name].predict([batch, activations], verbose=0) for name in shared}
+            elapsed = (time.time() - start) / len(shared)
+            for name in shared:
+                results[name] = {'probabilities': np.asarray(per_head[name]), 'time': elapsed}
+
+        for name in model_names:
+            if name in results:
+                continue
+            start = time.time()
+            probabilities = np.asarray(self.models[name].predict(batch, verbose=0))
+            results[name] = {'probabilities': probabilities, 'time': time.time() - start}
+
+        return results
+
+    def stats(self) -> dict:
+        """Sharing layout and activation-cache counters"""
+        with self._lock:
+            return {
+                'cut_layer': self.cut_layer,
+                'shared_models': self.shared_models,
+                'unshared_models': [name for name in self.models if name not in self.heads],
+                'trunk_passes': self.trunk_passes,
+                'activation_cache_entries': len(self._activations),
+                'activation_cache_size': self.activation_cache_size,
+                'activation_hits': self.activation_hits,
+                'activation_misses': self.activation_misses
+            }
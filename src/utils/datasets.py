@@ -0,0 +1,44 @@
+"""
+Test-split Helpers
+Locate the chest X-ray test split and load labelled samples for offline tools
+"""
+import os
+import random
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+from src.utils.preprocessing import preprocess_batch
+
+CLASSES = ['NORMAL', 'PNEUMONIA']
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+TEST_DIR_CANDIDATES = [
+    "data/chest_xray/test",
+    "data/test"
+]
+
+def find_test_dir(data_dir: Optional[str] = None) -> Optional[str]:
+    """The first test split that exists (data_dir wins when given)"""
+    for candidate in ([data_dir] if data_dir else TEST_DIR_CANDIDATES):
+        if candidate and all(os.path.isdir(os.path.join(candidate, c)) for c in CLASSES):
+            return candidate
+    return None
+
+def sample_test_split(test_dir: str, max_images: int = 400, seed: int = 42) -> Tuple[List[str], np.ndarray]:
+    """Class-balanced random sample of (image paths, labels) from test_dir/{NORMAL,PNEUMONIA}"""
+    rng = random.Random(seed)
+    paths, labels = [], []
+    per_class = max(1, max_images // len(CLASSES))
+    for label, class_name in enumerate(CLASSES):
+        class_dir = os.path.join(test_dir, class_name)
+        files = sorted(f for f in os.listdir(class_dir) if f.lower().endswith(IMG_EXTENSIONS))
+        rng.shuffle(files)
+        for f in files[:per_class]:
+            paths.append(os.path.join(class_dir, f))
+            labels.append(label)
+    return paths, np.array(labels, dtype=np.int64)
+
+def load_images(paths: List[str]) -> np.ndarray:
+    """Preprocess paths into one float32 batch, resizing as keras load_img does in training"""
+    return preprocess_batch(paths, resample=Image.NEAREST)
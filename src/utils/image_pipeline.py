@@ -0,0 +1,69 @@
+"""
+Streaming Image Pipeline
+tf.data input pipeline for scoring large image folders: files are decoded
+in parallel, stacked into batches and prefetched while the model runs on
+the previous batch. Unreadable files are reported per image instead of
+stopping the run.
+"""
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image
+
+from src.utils.preprocessing import IMG_SIZE, load_image, image_to_array
+
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+def find_images(directory: str, recursive: bool = False) -> List[str]:
+    """Image files in directory (and its subdirectories when recursive), sorted for stable resume order"""
+    if not recursive:
+        return sorted(
+            os.path.join(directory, f) for f in os.listdir(directory)
+            if f.lower().endswith(IMG_EXTENSIONS) and os.path.isfile(os.path.join(directory, f))
+        )
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMG_EXTENSIONS))
+    return paths
+
+def image_batches(paths: Sequence[str], target_size: Tuple[int, int] = IMG_SIZE, batch_size: int = 32,
+                  workers: Optional[int] = None, prefetch: Optional[int] = None,
+                  resample: Optional[int] = Image.NEAREST) -> Iterator[Tuple[np.ndarray, List[str], List[Optional[str]]]]:
+    """
+    Yield (images, paths, errors) per batch, in input order
+
+    images is a float32 batch of the files that decoded; errors lines up
+    with paths and holds None or the decode error for each file. workers
+    and prefetch default to tf.data autotuning.
+    """
+    import tensorflow as tf
+
+    height, width = target_size
+    paths = list(paths)
+
+    def decode(index):
+        try:
+            img = load_image(paths[int(index)], target_size, resample=resample)
+            return image_to_array(img), b''
+        except Exception as e:
+            return np.zeros((height, width, 3), dtype=np.float32), str(e).encode()
+
+    def decode_op(index):
+        image, error = tf.numpy_function(decode, [index], [tf.float32, tf.string])
+        image.set_shape((height, width, 3))
+        error.set_shape(())
+        return index, image, error
+
+    autotune = tf.data.AUTOTUNE
+    dataset = (
+        tf.data.Dataset.range(len(paths))
+        .map(decode_op, num_parallel_calls=workers or autotune, deterministic=True)
+        .batch(batch_size)
+        .prefetch(prefetch or autotune)
+    )
+
+    for indices, images, errors in dataset.as_numpy_iterator():
+        errors = [error.decode() or None for error in errors]
+        ok = np.array([error is None for error in errors])
+        yield images[ok] if not ok.all() else images, [paths[i] for i in indices], errors
@@ -0,0 +1,226 @@
+"""
+Content-addressed Prediction Cache
+LRU + TTL cache of model outputs keyed by a hash of the preprocessed pixels,
+the model name and the model-file version, with an optional on-disk tier
+(bounded: expired and oldest files are pruned as new ones are written)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PredictionCache:
+    """Thread-safe LRU cache of class probabilities"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600,
+                 disk_dir: Optional[str] = None, disk_max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir or None
+        self.disk_max_entries = max(1, disk_max_entries)
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        # The disk tier is scanned again after this many writes (amortized over ~10% of its size)
+        self._prune_every = max(1, self.disk_max_entries // 10)
+        self._disk_writes = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self.prune_disk()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(img_array: np.ndarray, model_name: str, model_version: Optional[str]) -> str:
+        """Hash of the preprocessed pixels plus the model identity"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(str((img_array.shape, img_array.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(img_array).data)
+        digest.update(f"{model_name}:{model_version}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Cached probabilities for key, or None"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_set(key, value, now)
+        return value
+
+    def set(self, key: str, probabilities) -> None:
+        """Store one row of model output"""
+        if not self.enabled:
+            return
+        value = [float(p) for p in probabilities]
+        now = time.time()
+        self._memory_set(key, value, now)
+        self._disk_set(key, value, now)
+
+    def _memory_set(self, key: str, value: List[float], now: float):
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[List[float]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires_at', 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get('probabilities')
+
+    def _disk_set(self, key: str, value: List[float], now: float):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'expires_at': now + self.ttl_seconds, 'probabilities': value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Prediction cache disk write failed: {str(e)}")
+            return
+        with self._lock:
+            self._disk_writes += 1
+            due = self._disk_writes >= self._prune_every
+            if due:
+                self._disk_writes = 0
+        if due:
+            self.prune_disk(now)
+
+    def prune_disk(self, now: Optional[float] = None) -> int:
+        """
+        Delete expired disk entries, then the oldest ones over disk_max_entries
+
+        Runs at startup and every disk_max_entries / 10 writes; returns the
+        number of files removed.
+        """
+        if not self.disk_dir or not self._prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            now = time.time() if now is None else now
+            files = []
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+            files.sort()
+            # A file's mtime is its write time, so it expired ttl_seconds later; old .tmp files are abandoned writes
+            stale, live = [], []
+            for mtime, path in files:
+                if path.endswith('.tmp'):
+                    if mtime + 60 <= now:
+                        stale.append(path)
+                elif mtime + self.ttl_seconds <= now:
+                    stale.append(path)
+                else:
+                    live.append(path)
+            doomed = stale + live[:max(0, len(live) - self.disk_max_entries)]
+            removed = 0
+            for path in doomed:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            with self._lock:
+                self.disk_evictions += removed
+            if removed:
+                logger.info(f"Pruned {removed} prediction cache files from {self.disk_dir}")
+            return removed
+        finally:
+            self._prune_lock.release()
+
+    def clear(self):
+        """Drop the in-memory tier (the disk tier expires on its own)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_dir': self.disk_dir,
+                'disk_max_entries': self.disk_max_entries,
+                'disk_evictions': self.disk_evictions,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+_cache: Optional[PredictionCache] = None
+_cache_lock = threading.Lock()
+
+def get_prediction_cache() -> PredictionCache:
+    """The cache shared by everything in this process (configured from InferenceConfig)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from config.inference_config import InferenceConfig
+                _cache = PredictionCache(
+                    max_entries=InferenceConfig.PREDICTION_CACHE_SIZE,
+                    ttl_seconds=InferenceConfig.PREDICTION_CACHE_TTL,
+                    disk_dir=InferenceConfig.PREDICTION_CACHE_DIR,
+                    disk_max_entries=InferenceConfig.PREDICTION_CACHE_DISK_SIZE
+                )
+    return _cache
@@ -0,0 +1,117 @@
+"""
+Shared Image Preprocessing
+One decode → resize → normalize path for every entry point (API, Streamlit apps, CLIs)
+"""
+import io
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple, Union
+import numpy as np
+from PIL import Image
+
+IMG_SIZE = (224, 224)
+
+# uint8 → [0, 1] float32 in a single pass
+_SCALE = np.float32(1.0 / 255.0)
+
+# Formats without a draft decoder (PNG, TIFF) are box-reduced by an integer
+# factor first, as long as the result stays this many times target_size
+REDUCING_GAP = 3.0
+
+ImageSource = Union[Image.Image, bytes, bytearray, memoryview, str, os.PathLike]
+
+def open_image(source: ImageSource) -> Image.Image:
+    """Open a PIL image from a PIL image, raw bytes, a path or a binary file object"""
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Image not found: {source}")
+        return Image.open(source)
+    return Image.open(source)
+
+def load_image(source: ImageSource, target_size: Tuple[int, int] = IMG_SIZE,
+               resample: Optional[int] = None, draft: bool = True,
+               timings: Optional[Dict[str, float]] = None) -> Image.Image:
+    """
+    Decode, convert to RGB and resize to target_size (height, width)
+
+    For JPEGs the decoder is asked for a reduced-resolution draft first, so
+    a 2000px X-ray is decoded at 1/2–1/8 scale instead of full size. The
+    draft is never smaller than target_size. Other formats decode at full
+    size, then images over REDUCING_GAP times target_size are box-reduced
+    before the final filter. Grayscale images are resized before the RGB
+    conversion (same pixels, a third of the work). resample=None keeps
+    PIL's default filter, matching the original Image.resize calls.
+    timings, when given, receives the seconds spent in 'decode' and 'resize'.
+    """
+    started = time.perf_counter()
+    img = open_image(source)
+    height, width = target_size
+
+    is_jpeg = getattr(img, 'format', None) == 'JPEG'
+    if draft and is_jpeg:
+        img.draft('RGB', (width, height))
+    if timings is not None:
+        # PIL decodes lazily; force it here so decode and resize are timed apart
+        img.load()
+        decoded = time.perf_counter()
+        timings['decode'] = decoded - started
+        started = decoded
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    if img.size != (width, height):
+        reducing_gap = REDUCING_GAP if draft and not is_jpeg else None
+        img = img.resize((width, height), resample, reducing_gap=reducing_gap)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if timings is not None:
+        timings['resize'] = time.perf_counter() - started
+    return img
+
+def image_to_array(img: Image.Image, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """RGB image → HxWx3 float32 in [0, 1], written into out when given"""
+    pixels = np.asarray(img, dtype=np.uint8)
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    np.multiply(pixels, _SCALE, out=out, dtype=np.float32)
+    return out
+
+def new_batch(batch_size: int, target_size: Tuple[int, int] = IMG_SIZE) -> np.ndarray:
+    """Uninitialized float32 buffer for batch_size preprocessed images"""
+    return np.empty((batch_size, target_size[0], target_size[1], 3), dtype=np.float32)
+
+def preprocess_image(source: ImageSource, target_size: Tuple[int, int] = IMG_SIZE,
+                     resample: Optional[int] = None, out: Optional[np.ndarray] = None,
+                     timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Single-image path: returns a 1xHxWx3 float32 batch ready for model.predict
+
+    out, when given, is a HxWx3 slot (e.g. one row of new_batch()) to fill
+    in place; the returned array is then a view of it. timings, when given,
+    receives per-stage seconds ('decode', 'resize', 'normalize').
+    """
+    img = load_image(source, target_size, resample=resample, timings=timings)
+    started = time.perf_counter()
+    if out is None:
+        out = new_batch(1, target_size)
+        image_to_array(img, out=out[0])
+        result = out
+    else:
+        image_to_array(img, out=out)
+        result = out[np.newaxis]
+    if timings is not None:
+        timings['normalize'] = time.perf_counter() - started
+    return result
+
+def preprocess_batch(sources: Iterable[ImageSource], target_size: Tuple[int, int] = IMG_SIZE,
+                     resample: Optional[int] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Batch path: decode every source straight into one preallocated NxHxWx3 buffer"""
+    sources = list(sources)
+    if out is None:
+        out = new_batch(len(sources), target_size)
+    for i, source in enumerate(sources):
+        image_to_array(load_image(source, target_size, resample=resample), out=out[i])
+    return out[:len(sources)]
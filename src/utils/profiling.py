@@ -0,0 +1,132 @@
+"""
+Request Profiling
+Opt-in helpers behind the X-Profile header / ?profile flag: forward-pass time
+per layer group, and cProfile dumps or TensorFlow profiler traces of a
+sampled fraction of requests written to a local directory. Nothing here runs
+unless a request asks for it or sampling is configured.
+"""
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MODES = ('cprofile', 'tf')
+
+# conv2_block1_1_conv → conv2, block3_pool → block3; other layers keep their own name
+_GROUP_PATTERN = re.compile(r'^[a-z]+\d+')
+
+def layer_group(layer_name: str) -> str:
+    """Group key for a layer: ResNet/VGG stage prefix, or the layer name itself"""
+    match = _GROUP_PATTERN.match(layer_name)
+    return match.group(0) if match else layer_name
+
+def profile_layers(model, batch) -> Optional[Dict[str, float]]:
+    """
+    Seconds per layer group for one eager, layer-by-layer pass over batch
+
+    Nested models (e.g. the ResNet50 trunk inside the hybrid model) are
+    broken down as '<model>/<group>'. Eager execution is slower than the
+    compiled forward pass, so use the numbers for where time goes, not how
+    much. Returns None for models that are not Keras functional graphs
+    (TFLite, traced SavedModels, remote models).
+    """
+    if not hasattr(model, '_run_through_graph'):
+        return None
+    groups: Dict[str, float] = OrderedDict()
+
+    def timed(prefix):
+        def operation_fn(op):
+            name = getattr(op, 'name', type(op).__name__)
+
+            def call(*args, **kwargs):
+                if hasattr(op, '_run_through_graph') and len(args) == 1 and not any(kwargs.values()):
+                    return op._run_through_graph(args[0], operation_fn=timed(f"{prefix}{name}/"))
+                started = time.perf_counter()
+                outputs = op(*args, **kwargs)
+                key = prefix + layer_group(name)
+                groups[key] = groups.get(key, 0.0) + time.perf_counter() - started
+                return outputs
+            return call
+        return operation_fn
+
+    try:
+        model._run_through_graph(batch, operation_fn=timed(''))
+    except Exception as e:
+        logger.warning(f"Layer profiling failed: {str(e)}")
+        return None
+    return dict(groups)
+
+class RequestProfiler:
+    """Decides which requests get captured and writes the captures to output_dir"""
+
+    def __init__(self, output_dir: str = '', sample_rate: float = 0.0, mode: str = 'cprofile'):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Use one of: {list(CAPTURE_MODES)}")
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate if output_dir else 0.0
+        self.mode = mode
+        self.captured = 0
+        self._tf_lock = threading.Lock()
+
+    def sample(self) -> bool:
+        """Whether this request should be captured (a float compare when sampling is off)"""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def capture(self, label: str):
+        """
+        Profile the with-block into output_dir; yields a dict that gets the capture 'path'
+
+        cProfile covers the calling thread only, so run the whole request
+        in one thread under it. The TensorFlow profiler is process-wide:
+        while one trace is running, other requests are not captured.
+        """
+        info = {'path': None}
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield info
+            finally:
+                profiler.disable()
+                info['path'] = os.path.join(self.output_dir, f"{name}.prof")
+                profiler.dump_stats(info['path'])
+                self.captured += 1
+            return
+
+        if not self._tf_lock.acquire(blocking=False):
+            yield info
+            return
+        try:
+            import tensorflow as tf
+
+            path = os.path.join(self.output_dir, name)
+            tf.profiler.experimental.start(path)
+            try:
+                yield info
+            finally:
+                tf.profiler.experimental.stop()
+                info['path'] = path
+                self.captured += 1
+        finally:
+            self._tf_lock.release()
+
+    def stats(self) -> dict:
+        return {
+            'output_dir': self.output_dir or None,
+            'sample_rate': self.sample_rate,
+            'mode': self.mode,
+            'captured': self.captured
+        }
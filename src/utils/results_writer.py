@@ -0,0 +1,262 @@
+"""
+Streaming Results Writer
+Append-only CSV / JSONL / Parquet output for offline batch runs, plus the
+running aggregates batch analysis reports. Results are written and folded
+into the summary as they arrive instead of being kept in a list, and a run
+resumes by reading back which images its output file already holds.
+"""
+import csv
+import glob
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESULT_FORMATS = ('csv', 'jsonl', 'parquet')
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.json': 'jsonl', '.parquet': 'parquet'}
+
+def result_format(path: str) -> str:
+    """Output format implied by the file extension"""
+    ext = os.path.splitext(path.rstrip(os.sep))[1].lower()
+    if ext not in EXTENSIONS:
+        raise ValueError(f"Unknown results format '{ext}' for {path}; use one of {', '.join(EXTENSIONS)}")
+    return EXTENSIONS[ext]
+
+class ResultsSummary:
+    """Running counts, mean confidence and confidence buckets over a stream of results"""
+
+    def __init__(self, classes: Sequence[str], high_threshold: float = 0.9, low_threshold: float = 0.7,
+                 max_examples: int = 5):
+        self.classes = list(classes)
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.max_examples = max_examples
+        self.total = 0
+        self.failed = 0
+        self.counts: Dict[str, int] = {name: 0 for name in self.classes}
+        self.confidence_sum = 0.0
+        self.high_confidence = 0
+        self.low_confidence = 0
+        self.low_confidence_examples: List[dict] = []
+
+    @classmethod
+    def from_results(cls, results: Iterable[dict], classes: Sequence[str], **kwargs) -> "ResultsSummary":
+        summary = cls(classes, **kwargs)
+        for result in results:
+            summary.update(result)
+        return summary
+
+    def update(self, result: dict):
+        confidence = result['confidence']
+        self.total += 1
+        self.counts[result['class']] = self.counts.get(result['class'], 0) + 1
+        self.confidence_sum += confidence
+        if confidence > self.high_threshold:
+            self.high_confidence += 1
+        if confidence < self.low_threshold:
+            self.low_confidence += 1
+            if len(self.low_confidence_examples) < self.max_examples:
+                self.low_confidence_examples.append(
+                    {'image_path': result['image_path'], 'class': result['class'], 'confidence': confidence}
+                )
+
+    @property
+    def mean_confidence(self) -> float:
+        return self.confidence_sum / self.total if self.total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'total': self.total,
+            'failed': self.failed,
+            'counts': dict(self.counts),
+            'mean_confidence': self.mean_confidence,
+            'high_confidence': self.high_confidence,
+            'low_confidence': self.low_confidence,
+            'low_confidence_examples': list(self.low_confidence_examples)
+        }
+
+class ResultsWriter(ABC):
+    """Base class: write(results) appends and flushes one chunk; read() streams back what is on disk"""
+
+    format = None
+
+    def __init__(self, path: str, classes: Sequence[str]):
+        self.path = path
+        self.classes = list(classes)
+        self.rows_written = 0
+
+    @abstractmethod
+    def read(self) -> Iterator[dict]:
+        """Every result already in the output file"""
+
+    @abstractmethod
+    def write(self, results: List[dict]):
+        """Append one chunk of results and flush it"""
+
+    def close(self):
+        pass
+
+    def completed_paths(self) -> set:
+        """Image paths already in the output, for skipping on resume"""
+        return {result['image_path'] for result in self.read()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flat(self, result: dict) -> dict:
+        row = {'image_path': result['image_path'], 'class': result['class'], 'confidence': result['confidence']}
+        for name in self.classes:
+            row[f'prob_{name}'] = result['probabilities'][name]
+        return row
+
+    def _nested(self, row: dict) -> dict:
+        return {
+            'image_path': row['image_path'],
+            'class': row['class'],
+            'confidence': float(row['confidence']),
+            'probabilities': {name: float(row[f'prob_{name}']) for name in self.classes}
+        }
+
+class _LineWriter(ResultsWriter):
+    """Text formats with one result per line, appended in place"""
+
+    def __init__(self, path: str, classes: Sequence[str]):
+        super().__init__(path, classes)
+        self._drop_partial_line()
+        self._file = open(path, 'a', newline='')
+
+    def _drop_partial_line(self):
+        # An interrupted run can leave half a line behind; appending after it would corrupt the next row
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data.endswith(b'\n'):
+                return
+            keep = data.rfind(b'\n') + 1
+            f.truncate(keep)
+        logger.warning(f"Dropped an incomplete last line from {self.path}")
+
+    def _append(self, text: str, rows: int):
+        self._file.write(text)
+        self._file.flush()
+        self.rows_written += rows
+
+    def close(self):
+        self._file.close()
+
+class CsvResultsWriter(_LineWriter):
+    format = 'csv'
+
+    def __init__(self, path: str, classes: Sequence[str]):
+        super().__init__(path, classes)
+        if os.path.getsize(path) == 0:
+            self._file.write(','.join(self.fieldnames) + '\r\n')
+            self._file.flush()
+
+    @property
+    def fieldnames(self) -> List[str]:
+        return ['image_path', 'class', 'confidence'] + [f'prob_{name}' for name in self.classes]
+
+    def read(self) -> Iterator[dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, newline='') as f:
+            for row in csv.DictReader(f):
+                yield self._nested(row)
+
+    def write(self, results: List[dict]):
+        if not results:
+            return
+        lines = _CsvLines()
+        csv.DictWriter(lines, fieldnames=self.fieldnames).writerows(self._flat(result) for result in results)
+        self._append(''.join(lines), len(results))
+
+class _CsvLines(list):
+    """File-like sink for csv.writer, so a chunk reaches the file in one write"""
+
+    def write(self, text: str):
+        self.append(text)
+
+class JsonlResultsWriter(_LineWriter):
+    format = 'jsonl'
+
+    def read(self) -> Iterator[dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def write(self, results: List[dict]):
+        if results:
+            self._append(''.join(json.dumps(result) + '\n' for result in results), len(results))
+
+class ParquetResultsWriter(ResultsWriter):
+    """
+    A directory of Parquet part files
+
+    Parquet files cannot be appended to, so every write() (one chunk of
+    results) becomes its own part file, written atomically. An interrupted
+    run loses at most the chunk being written, like the line formats.
+    """
+
+    format = 'parquet'
+
+    def __init__(self, path: str, classes: Sequence[str]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow); use a .csv or .jsonl path instead")
+        super().__init__(path, classes)
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        os.makedirs(path, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def _parts(self) -> List[str]:
+        # Numeric order, so runs past part-99999 still read back in write order
+        parts = glob.glob(os.path.join(self.path, 'part-*.parquet'))
+        return sorted(parts, key=lambda part: int(os.path.basename(part)[5:-8]))
+
+    def read(self) -> Iterator[dict]:
+        if not os.path.isdir(self.path):
+            return
+        for part in self._parts():
+            for row in self._pq.read_table(part).to_pylist():
+                yield self._nested(row)
+
+    def completed_paths(self) -> set:
+        return {
+            path for part in self._parts()
+            for path in self._pq.read_table(part, columns=['image_path']).column('image_path').to_pylist()
+        }
+
+    def write(self, results: List[dict]):
+        if not results:
+            return
+        part = os.path.join(self.path, f'part-{self._next_part:05d}.parquet')
+        tmp = part + '.tmp'
+        self._pq.write_table(self._pa.Table.from_pylist([self._flat(result) for result in results]), tmp)
+        os.replace(tmp, part)
+        self.rows_written += len(results)
+        self._next_part += 1
+
+WRITERS = {'csv': CsvResultsWriter, 'jsonl': JsonlResultsWriter, 'parquet': ParquetResultsWriter}
+
+def open_results_writer(path: str, classes: Sequence[str], output_format: Optional[str] = None) -> ResultsWriter:
+    """Writer for path; the format comes from the extension unless given"""
+    output_format = output_format or result_format(path)
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown results format '{output_format}'; use one of {', '.join(RESULT_FORMATS)}")
+    return WRITERS[output_format](path, classes)
@@ -0,0 +1,219 @@
+"""
+Thread Tuning
+CPU thread pools and core pinning for inference processes, from the
+per-host configuration tune_threads.py measures and writes
+(models/thread_tuning.json by default)
+
+Every process that runs forward passes calls apply_thread_config() at
+startup with the number of sibling processes sharing the host: uvicorn
+workers in INFERENCE_MODE=local, 1 for the ipc inference process and the
+Streamlit apps. Threads come from the tuned row for that worker count, or
+split the cores evenly when the host was never tuned, so N workers no
+longer each start a thread per core.
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+from datetime import datetime
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Native thread pools read these when the runtime starts
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+_applied: Optional[dict] = None
+_slot_lock = None
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def host_info() -> dict:
+    return {'hostname': socket.gethostname(), 'cpu_count': os.cpu_count(), 'cores': available_cores()}
+
+def config_path(path: Optional[str] = None) -> str:
+    from config.inference_config import InferenceConfig
+
+    return path or InferenceConfig.THREAD_CONFIG or os.path.join(InferenceConfig.MODELS_DIR, 'thread_tuning.json')
+
+def load_thread_config(path: Optional[str] = None) -> Optional[dict]:
+    """
+    The tuned configuration for this host, or None
+
+    A file tuned on a host with a different core count is ignored: its
+    thread counts would over- or under-subscribe this one.
+    """
+    path = config_path(path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable thread config {path}: {str(e)}")
+        return None
+    tuned_cores = len(config.get('host', {}).get('cores', []))
+    if tuned_cores != len(available_cores()):
+        logger.warning(f"Ignoring {path}: tuned for {tuned_cores} cores, this host has {len(available_cores())} "
+                       f"(re-run tune_threads.py here)")
+        return None
+    return config
+
+def save_thread_config(config: dict, path: Optional[str] = None) -> str:
+    path = config_path(path)
+    config = dict(config, host=host_info(), created=datetime.now().isoformat())
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+    return path
+
+def tuned_workers(config: Optional[dict] = None) -> Optional[int]:
+    """Worker count recommended by the tuned configuration (None when the host was never tuned)"""
+    config = config if config is not None else load_thread_config()
+    return config.get('workers') if config else None
+
+def thread_settings(workers: int = 1, config: Optional[dict] = None) -> dict:
+    """
+    Thread pool sizes and pinning for one of workers processes sharing this host
+
+    INTRA_OP_THREADS / INTER_OP_THREADS / PIN_WORKER_CORES override the
+    tuned values; 0 threads keeps the runtime's default.
+    """
+    from config.inference_config import InferenceConfig
+
+    workers = max(1, workers)
+    config = config if config is not None else load_thread_config()
+    tuned = (config or {}).get('per_workers', {}).get(str(workers))
+    if tuned:
+        settings = {'intra_op_threads': tuned['intra_op_threads'], 'inter_op_threads': tuned['inter_op_threads'],
+                    'source': 'tuned'}
+    elif workers > 1:
+        settings = {'intra_op_threads': max(1, len(available_cores()) // workers), 'inter_op_threads': 1,
+                    'source': 'split'}
+    else:
+        settings = {'intra_op_threads': 0, 'inter_op_threads': 0, 'source': 'default'}
+
+    if InferenceConfig.INTRA_OP_THREADS is not None:
+        settings.update(intra_op_threads=InferenceConfig.INTRA_OP_THREADS, source='env')
+    if InferenceConfig.INTER_OP_THREADS is not None:
+        settings.update(inter_op_threads=InferenceConfig.INTER_OP_THREADS, source='env')
+    pin = InferenceConfig.PIN_WORKER_CORES
+    if pin is None:
+        pin = (tuned or config or {}).get('pin_cores', False)
+    settings['pin_cores'] = pin
+    settings['workers'] = workers
+    return settings
+
+def core_sets(workers: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """Split cores into workers contiguous sets (workers beyond the core count share cores round-robin)"""
+    cores = cores or available_cores()
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    sets, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(cores[start:end])
+        start = end
+    return sets
+
+def claim_worker_slot(workers: int) -> Optional[int]:
+    """
+    Index of this worker among its siblings, held for the process lifetime
+
+    uvicorn workers get no index, so each takes the first free lock file
+    named after the supervisor (their shared parent); a restarted worker
+    reuses the slot its predecessor released.
+    """
+    global _slot_lock
+    try:
+        import fcntl
+    except ImportError:
+        return None
+
+    for slot in range(workers):
+        path = os.path.join(tempfile.gettempdir(), f"pneumonia-worker-{os.getppid()}-{slot}.lock")
+        handle = open(path, 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _slot_lock = handle
+        return slot
+    return None
+
+def pin_to_cores(cores: List[int]) -> bool:
+    if not hasattr(os, 'sched_setaffinity'):
+        logger.warning("Core pinning is not supported on this platform")
+        return False
+    os.sched_setaffinity(0, cores)
+    return True
+
+def configure_tensorflow(settings: Optional[dict] = None):
+    """
+    Size TensorFlow's thread pools (before its runtime starts; setting the same values again is a no-op)
+
+    Called by apply_thread_config when TensorFlow is already imported and
+    by the model loaders otherwise, so a process that never loads a model
+    never imports TensorFlow.
+    """
+    settings = settings or _applied
+    if not settings:
+        return
+    import tensorflow as tf
+
+    try:
+        if settings['intra_op_threads']:
+            tf.config.threading.set_intra_op_parallelism_threads(settings['intra_op_threads'])
+        if settings['inter_op_threads']:
+            tf.config.threading.set_inter_op_parallelism_threads(settings['inter_op_threads'])
+    except RuntimeError as e:
+        logger.warning(f"TensorFlow thread pools already started, keeping them: {str(e)}")
+
+def apply_thread_config(workers: int = 1, pin: bool = True, config: Optional[dict] = None) -> dict:
+    """
+    Apply the thread settings for one of workers processes to this process (once; later calls return them)
+
+    Sets the native thread-pool environment variables, TensorFlow's pools
+    and, when pinning is enabled and pin is true, restricts this worker to
+    its own core set.
+    """
+    global _applied
+    if _applied is not None:
+        return _applied
+
+    settings = thread_settings(workers, config)
+    if settings['intra_op_threads']:
+        for name in THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(settings['intra_op_threads']))
+    settings['cores'] = None
+    if pin and settings['pin_cores'] and workers > 1:
+        slot = claim_worker_slot(workers)
+        if slot is None:
+            logger.warning(f"No free worker slot among {workers}; not pinning this worker")
+        else:
+            cores = core_sets(workers)[slot]
+            if pin_to_cores(cores):
+                settings.update(slot=slot, cores=cores)
+
+    _applied = settings
+    if 'tensorflow' in sys.modules:
+        configure_tensorflow(settings)
+    logger.info(f"Thread config ({settings['source']}): {settings['intra_op_threads'] or 'default'} intra-op / "
+                f"{settings['inter_op_threads'] or 'default'} inter-op threads"
+                + (f", pinned to cores {settings['cores']}" if settings['cores'] else ""))
+    return settings
+
+def applied_thread_config() -> Optional[dict]:
+    return _applied
+
+def runtime_threads() -> Optional[int]:
+    """Intra-op thread count for the TFLite and ONNX Runtime backends (None = their default)"""
+    return (_applied or {}).get('intra_op_threads') or None
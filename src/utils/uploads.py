@@ -0,0 +1,80 @@
+"""
+Upload Handling
+Request-size limits enforced before the body is buffered, and zero-copy access
+to the spooled upload files FastAPI has already written
+"""
+import os
+from typing import BinaryIO, Dict, Optional
+import logging
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Payload too large (limit {limit / 1024 / 1024:g} MB)")
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies over max_bytes with 413
+
+    A Content-Length over the limit is refused before any of the body is
+    read; chunked bodies are counted as they arrive and cut off as soon as
+    they pass it, so an oversized upload is never spooled in full.
+    path_limits overrides the limit for specific paths (e.g. batch uploads).
+    A limit of 0 disables the check.
+    """
+
+    def __init__(self, app, max_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        limit = self.path_limits.get(scope.get('path'), self.max_bytes) if scope['type'] == 'http' else 0
+        if limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope['headers']).get(b'content-length')
+        if length is not None and length.isdigit() and int(length) > limit:
+            error = too_large(limit)
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get('body', b''))
+            if received > limit:
+                # FastAPI re-raises HTTPExceptions from body parsing as-is
+                raise too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+def upload_size(file: UploadFile) -> int:
+    """Size in bytes of an upload FastAPI has finished spooling"""
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(position)
+    return size
+
+def upload_source(file: UploadFile, max_bytes: int = 0) -> BinaryIO:
+    """
+    The upload's spooled file, rewound, for decoding in place
+
+    Small uploads live in memory and large ones on disk; either way the
+    image decoder reads straight from it instead of from a bytes copy.
+    Raises a 413 HTTPException when the file is over max_bytes (0 = no limit).
+    """
+    if max_bytes > 0 and upload_size(file) > max_bytes:
+        raise too_large(max_bytes)
+    file.file.seek(0)
+    return file.file
@@ -0,0 +1,44 @@
+"""
+Test script for fast-start artifact lookup
+Runs without TensorFlow models (uses placeholder files)
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from src.models.artifacts import artifact_path, resolve_artifact
+
+def test_resolve_prefers_traced_then_keras():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "hybrid_model_colab.h5")
+        open(model_path, "wb").write(b"weights v1")
+        assert resolve_artifact(model_path) == model_path
+
+        keras_path = artifact_path(model_path, 'keras')
+        os.makedirs(os.path.dirname(keras_path))
+        open(keras_path, "wb").write(b"archive")
+        assert resolve_artifact(model_path) == keras_path
+
+        traced_path = artifact_path(model_path, 'traced')
+        os.makedirs(traced_path)
+        assert resolve_artifact(model_path) == traced_path
+        assert resolve_artifact(model_path, 'keras') == keras_path
+        assert resolve_artifact(model_path, 'h5') == model_path
+
+def test_replaced_model_file_misses_the_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "resnet_classifier_colab.h5")
+        open(model_path, "wb").write(b"weights v1")
+        keras_path = artifact_path(model_path, 'keras')
+        os.makedirs(os.path.dirname(keras_path))
+        open(keras_path, "wb").write(b"archive")
+
+        open(model_path, "wb").write(b"retrained weights v2")
+        assert artifact_path(model_path, 'keras') != keras_path
+        assert resolve_artifact(model_path) == model_path
+
+if __name__ == "__main__":
+    test_resolve_prefers_traced_then_keras()
+    test_replaced_model_file_misses_the_cache()
+    print("✅ Artifact cache tests passed")
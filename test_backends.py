@@ -0,0 +1,72 @@
+"""
+Test script for backend selection and the TFLite/ONNX exports
+Builds a tiny Keras model instead of loading trained weights
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import numpy as np
+import pytest
+
+from src.models import backends
+from src.models.artifacts import artifact_path
+from src.models.backends import export_onnx, export_tflite, load_model_file, resolve_backend
+
+def tiny_model():
+    import tensorflow as tf
+
+    inputs = tf.keras.Input((8, 8, 3))
+    x = tf.keras.layers.Conv2D(4, 3, activation='relu')(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    return tf.keras.Model(inputs, tf.keras.layers.Dense(2, activation='softmax')(x))
+
+def test_backend_falls_back_to_tensorflow_without_an_export_or_runtime(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "hybrid_model_colab.h5")
+        open(model_path, "wb").write(b"weights")
+        assert resolve_backend(model_path, 'onnx') == model_path
+
+        onnx_path = artifact_path(model_path, 'onnx')
+        os.makedirs(os.path.dirname(onnx_path))
+        open(onnx_path, "wb").write(b"graph")
+        monkeypatch.setattr(backends, 'runtime_available', lambda backend: False)
+        assert resolve_backend(model_path, 'onnx') == model_path
+        monkeypatch.setattr(backends, 'runtime_available', lambda backend: True)
+        assert resolve_backend(model_path, 'onnx') == onnx_path
+        assert resolve_backend(model_path, 'tf') == model_path
+
+        with pytest.raises(ValueError):
+            resolve_backend(model_path, 'torch')
+
+def test_tflite_export_matches_tensorflow():
+    model = tiny_model()
+    batch = np.random.default_rng(0).random((3, 8, 8, 3), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tiny.tflite')
+        export_tflite(model, path)
+        exported = load_model_file(path)
+        assert np.allclose(exported.predict(batch), model.predict(batch, verbose=0), atol=1e-5)
+        assert exported.input_shape == (None, 8, 8, 3)
+
+def test_onnx_export_matches_tensorflow():
+    pytest.importorskip('tf2onnx')
+    pytest.importorskip('onnxruntime')
+
+    model = tiny_model()
+    batch = np.random.default_rng(0).random((3, 8, 8, 3), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tiny.onnx')
+        export_onnx(model, path)
+        exported = load_model_file(path)
+        assert np.allclose(exported.predict(batch), model.predict(batch, verbose=0), atol=1e-5)
+        assert exported.input_shape == (None, 8, 8, 3)
+
+if __name__ == "__main__":
+    test_tflite_export_matches_tensorflow()
+    try:
+        test_onnx_export_matches_tensorflow()
+    except pytest.skip.Exception as e:
+        print(f"⏭️ ONNX export skipped: {e}")
+    print("✅ Backend tests passed")
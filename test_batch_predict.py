@@ -0,0 +1,122 @@
+"""
+Test script for /batch_predict: chunked forward passes streamed as NDJSON
+Drives the real API app with a fake model manager, no trained models needed
+"""
+import asyncio
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+sys.path.append('.')
+
+import httpx
+import numpy as np
+import pytest
+from PIL import Image
+
+import api_server
+from config.inference_config import InferenceConfig
+from src.models.executor import InferenceExecutor
+from src.utils.metrics import Histogram
+from src.utils.prediction_cache import PredictionCache
+
+class FakeModel:
+    def __init__(self, calls, delay=0.0):
+        self.calls = calls
+        self.delay = delay
+
+    def predict(self, batch, verbose=0):
+        self.calls.append(len(batch))
+        time.sleep(self.delay)
+        means = batch.reshape(len(batch), -1).mean(axis=1)
+        return np.stack([1 - means, means], axis=1)
+
+class FakeManager:
+    available = ['hybrid']
+    classifiers = ['hybrid']
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    @contextmanager
+    def use(self, model_name):
+        yield FakeModel(self.calls, self.delay)
+
+    def version(self, model_name):
+        return "v1"
+
+@pytest.fixture
+def detector(monkeypatch):
+    detector = api_server.detector
+    monkeypatch.setattr(detector, 'model_manager', FakeManager())
+    monkeypatch.setattr(detector, 'cache', PredictionCache(max_entries=0))
+    monkeypatch.setattr(detector, 'executor', InferenceExecutor(max_workers=2, max_pending=1, retry_after=2))
+    monkeypatch.setattr(InferenceConfig, 'BATCH_PREDICT_CHUNK_SIZE', 2)
+    return detector
+
+def image_file(name, shade):
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((64, 64), shade, dtype=np.uint8)).save(buffer, 'PNG')
+    return ("files", (name, buffer.getvalue(), "image/png"))
+
+def batch_predict(files):
+    async def run():
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/batch_predict", files=files)
+    return asyncio.run(run())
+
+def test_one_line_per_file_then_a_summary(detector):
+    files = [image_file(f"{i}.png", 40 * i) for i in range(5)]
+    files.insert(2, ("files", ("broken.png", b"not an image", "image/png")))
+    response = batch_predict(files)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    *results, summary = lines
+    assert [line['filename'] for line in results] == ['0.png', '1.png', 'broken.png', '2.png', '3.png', '4.png']
+    # The undecodable file fails alone; its neighbours are still predicted
+    assert results[2]['prediction'] is None and results[2]['error']
+    good = [line for line in results if line['prediction'] is not None]
+    assert len(good) == 5
+    assert all(line['model_used'] == 'hybrid' and 'profile' not in line and 'cascade' not in line for line in good)
+    # Brighter images score higher with the fake model
+    scores = [line['probabilities']['PNEUMONIA'] for line in good]
+    assert scores == sorted(scores)
+    assert summary['total_processed'] == 5 and summary['total_failed'] == 1 and summary['model_used'] == 'hybrid'
+
+def test_files_run_in_chunks_of_the_configured_size(detector):
+    response = batch_predict([image_file(f"{i}.png", 10 * i) for i in range(5)])
+    assert response.status_code == 200
+    assert detector.model_manager.calls == [2, 2, 1]
+    assert detector.executor.stats()['in_flight'] == 0
+
+def test_inference_time_is_split_between_the_images_of_a_pass(detector, monkeypatch):
+    monkeypatch.setattr(detector, 'model_manager', FakeManager(delay=0.05))
+    stage_seconds = Histogram('stage_seconds', 'Stage time', ['stage', 'model'])
+    monkeypatch.setattr(api_server, 'stage_seconds', stage_seconds)
+
+    assert batch_predict([image_file(f"{i}.png", 10 * i) for i in range(5)]).status_code == 200
+    assert detector.model_manager.calls == [2, 2, 1]
+    # One observation per image, adding up to the three forward passes rather than 5 of them
+    assert stage_seconds.count(stage='inference', model='hybrid') == 5
+    total = next(float(line.split()[-1]) for line in stage_seconds.render().splitlines()
+                 if line.startswith('stage_seconds_sum{stage="inference"'))
+    assert 0.15 <= total < 0.22
+
+def test_saturated_executor_gets_503_before_streaming(detector):
+    with detector.executor.admission():
+        response = batch_predict([image_file("0.png", 10)])
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert detector.model_manager.calls == []
+
+    # The stream released its slot, so the next batch is admitted
+    assert batch_predict([image_file("0.png", 10)]).status_code == 200
+    assert detector.executor.stats()['in_flight'] == 0
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
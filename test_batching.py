@@ -0,0 +1,136 @@
+"""
+Test script for the micro-batching inference scheduler
+Runs without trained models (uses a fake forward pass)
+"""
+import asyncio
+import sys
+import threading
+import time
+sys.path.append('.')
+
+import numpy as np
+
+from src.models.batching import BatchScheduler
+from src.models.executor import EventLoopMonitor
+
+def fake_predict(model_name, batch):
+    """Return [mean, 1 - mean] per image so results can be matched to inputs"""
+    means = batch.reshape(len(batch), -1).mean(axis=1)
+    return np.stack([means, 1 - means], axis=1)
+
+def test_concurrent_requests_are_coalesced():
+    """Concurrent submits for one model should share a forward pass"""
+    calls = []
+
+    def predict(model_name, batch):
+        calls.append(len(batch))
+        return fake_predict(model_name, batch)
+
+    scheduler = BatchScheduler(predict, max_batch_size=8, max_wait_ms=200)
+    try:
+        images = [np.full((1, 4, 4, 3), i / 10, dtype=np.float32) for i in range(8)]
+        futures = [scheduler.submit("hybrid", img) for img in images]
+        outputs = [f.result(timeout=5) for f in futures]
+        stats = scheduler.stats("hybrid")
+    finally:
+        scheduler.shutdown()
+
+    for i, output in enumerate(outputs):
+        assert np.isclose(output.probabilities[0], i / 10)
+    assert sum(calls) == 8
+    assert len(calls) < 8
+    assert stats['batches_total'] == len(calls)
+
+def test_batch_size_is_capped_and_stats_reported():
+    """No batch exceeds max_batch_size and per-model metrics add up"""
+    release = threading.Event()
+
+    def predict(model_name, batch):
+        release.wait(5)
+        return fake_predict(model_name, batch)
+
+    scheduler = BatchScheduler(predict, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [scheduler.submit("resnet50", np.zeros((4, 4, 3), dtype=np.float32)) for _ in range(10)]
+        release.set()
+        outputs = [f.result(timeout=5) for f in futures]
+        stats = scheduler.stats("resnet50")
+    finally:
+        scheduler.shutdown()
+
+    assert all(output.batch_size <= 4 for output in outputs)
+    assert stats['requests_total'] == 10
+    assert sum(size * count for size, count in stats['batch_size_counts'].items()) == 10
+    assert stats['queue_depth'] == 0
+
+def test_model_errors_propagate_to_every_caller():
+    """A failing forward pass should fail all requests in that batch"""
+    def predict(model_name, batch):
+        raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(predict, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [scheduler.submit("hybrid", np.zeros((4, 4, 3), dtype=np.float32)) for _ in range(3)]
+        for future in futures:
+            try:
+                future.result(timeout=5)
+            except RuntimeError as e:
+                assert str(e) == "boom"
+            else:
+                raise AssertionError("expected the batch error to propagate")
+        assert scheduler.stats("hybrid")['errors_total'] == 3
+    finally:
+        scheduler.shutdown()
+
+def test_cancelled_requests_do_not_stop_the_batcher():
+    """Cancelling queued or already resolved futures must leave the model's worker serving"""
+    in_flight, release = threading.Event(), threading.Event()
+    calls = []
+
+    def predict(model_name, batch):
+        calls.append(len(batch))
+        in_flight.set()
+        release.wait(5)
+        return fake_predict(model_name, batch)
+
+    scheduler = BatchScheduler(predict, max_batch_size=1, max_wait_ms=0)
+    try:
+        running = scheduler.submit("hybrid", np.zeros((4, 4, 3), dtype=np.float32))
+        assert in_flight.wait(5)
+        queued = scheduler.submit("hybrid", np.zeros((4, 4, 3), dtype=np.float32))
+        # A client disconnect while the first batch is in the model
+        assert queued.cancel() and not running.cancel()
+        # A future resolved behind the batcher's back makes its set_result raise
+        running.set_result(None)
+        release.set()
+
+        later = scheduler.submit("hybrid", np.full((4, 4, 3), 0.5, dtype=np.float32))
+        assert np.isclose(later.result(timeout=5).probabilities[0], 0.5)
+        assert calls == [1, 1]  # the cancelled request never reached the model
+    finally:
+        release.set()
+        scheduler.shutdown()
+
+def test_event_loop_monitor_sees_blocking_calls():
+    """A synchronous sleep on the loop should show up as lag"""
+    async def scenario():
+        monitor = EventLoopMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        idle = monitor.stats()
+        time.sleep(0.2)  # blocks the loop
+        await asyncio.sleep(0.05)
+        monitor.stop()
+        return idle, monitor.stats()
+
+    idle, blocked = asyncio.run(scenario())
+    assert idle['samples'] > 0 and idle['max_lag_ms'] < 150
+    assert blocked['max_lag_ms'] >= 150 and blocked['recent_max_ms'] == blocked['max_lag_ms']
+
+if __name__ == "__main__":
+    test_concurrent_requests_are_coalesced()
+    test_batch_size_is_capped_and_stats_reported()
+    test_model_errors_propagate_to_every_caller()
+    test_cancelled_requests_do_not_stop_the_batcher()
+    test_event_loop_monitor_sees_blocking_calls()
+    print("✅ Batching tests passed")
@@ -0,0 +1,102 @@
+"""
+Test script for the confidence cascade and its threshold calibration
+Runs without trained models
+"""
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.append('.')
+
+import numpy as np
+import pytest
+
+from src.models.cascade import (
+    CascadePolicy, calibrate_band, cascade_outcome, escalates, load_thresholds, parse_model_spec
+)
+from src.models.model_manager import ModelManager
+
+def scored_sample(n=60, seed=0):
+    """Fast-model scores plus expensive-model labels that mostly, but not always, agree"""
+    rng = np.random.default_rng(seed)
+    scores = rng.random(n)
+    labels = scores > 0.5
+    flip = rng.random(n) < 0.3 * (1 - 2 * np.abs(scores - 0.5))  # disagreements near the boundary
+    return scores, np.where(flip, ~labels, labels)
+
+def test_only_the_uncertainty_band_escalates():
+    assert escalates(np.array([0.55, 0.45]), 0.2, 0.8)
+    assert not escalates(np.array([0.95, 0.05]), 0.2, 0.8)
+    assert not escalates(np.array([0.1, 0.9]), 0.2, 0.8)
+    assert parse_model_spec('resnet50') == ('resnet50', None)
+    assert parse_model_spec('hybrid:int8') == ('hybrid', 'int8')
+
+    outcome = cascade_outcome([0.1, 0.4, 0.6, 0.9], [0, 1, 1, 0], 0.3, 0.7)
+    # 0.4 and 0.6 escalate and take the expensive answer; 0.9 says PNEUMONIA where it said NORMAL
+    assert outcome['escalation_rate'] == 0.5 and outcome['agreement'] == 0.75
+
+def test_calibration_finds_the_narrowest_band_meeting_the_target():
+    scores, labels = scored_sample()
+    edges = sorted(set(scores) | {0.0, 0.5, 1.0})
+    for target in (0.9, 0.97, 1.0):
+        band = calibrate_band(scores, labels, target)
+        assert band['agreement'] >= target and band['low'] <= 0.5 <= band['high']
+        # Brute force over every band edge pair
+        best = min(
+            cascade_outcome(scores, labels, low, high)['escalation_rate']
+            for low, high in itertools.product([e for e in edges if e <= 0.5], [e for e in edges if e >= 0.5])
+            if cascade_outcome(scores, labels, low, high)['agreement'] >= target
+        )
+        assert np.isclose(band['escalation_rate'], best)
+
+    # A stricter target never escalates less
+    rates = [calibrate_band(scores, labels, t)['escalation_rate'] for t in (0.8, 0.9, 0.95, 1.0)]
+    assert rates == sorted(rates)
+    with pytest.raises(ValueError):
+        calibrate_band(scores, labels, 1.5)
+
+def test_policy_counts_each_stage_and_rejects_bad_bands():
+    policy = CascadePolicy('resnet50', 'hybrid', 0.3, 0.7)
+    for escalated in (False, False, False, True):
+        policy.record(escalated)
+    stats = policy.stats()
+    assert stats['answered_by_fast_model'] == 3 and stats['escalated'] == 1
+    assert stats['fast_hit_rate'] == 0.75
+
+    with pytest.raises(ValueError):
+        CascadePolicy('resnet50', 'hybrid', 0.6, 0.9)
+
+def test_thresholds_follow_model_contents_not_mtimes():
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('resnet50', 'hybrid'):
+            with open(os.path.join(tmp, f'{name}.h5'), 'wb') as f:
+                f.write(name.encode() * 100)
+        files = {name: f'{name}.h5' for name in ('resnet50', 'hybrid')}
+        manager = ModelManager(files, models_dir=tmp, classifiers=list(files))
+        hashes = lambda: {name: manager.content_hash(name) for name in ('resnet50', 'hybrid')}
+        path = os.path.join(tmp, 'cascade_thresholds.json')
+        with open(path, 'w') as f:
+            json.dump({'low': 0.1, 'high': 0.85, 'model_hashes': hashes()}, f)
+        assert load_thresholds(path, hashes())['high'] == 0.85
+
+        # A deploy that rewrites the same bytes with a new mtime keeps the band
+        hybrid = os.path.join(tmp, 'hybrid.h5')
+        version = manager.version('hybrid')
+        os.utime(hybrid, (time.time() + 60, time.time() + 60))
+        assert manager.version('hybrid') != version
+        assert load_thresholds(path, hashes())['high'] == 0.85
+
+        # Retrained weights do not
+        with open(hybrid, 'ab') as f:
+            f.write(b'retrained')
+        assert load_thresholds(path, hashes()) is None
+        assert load_thresholds(os.path.join(tmp, 'missing.json'), hashes()) is None
+
+if __name__ == "__main__":
+    test_only_the_uncertainty_band_escalates()
+    test_calibration_finds_the_narrowest_band_meeting_the_target()
+    test_policy_counts_each_stage_and_rejects_bad_bands()
+    test_thresholds_follow_model_contents_not_mtimes()
+    print("✅ Cascade tests passed")
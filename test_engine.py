@@ -0,0 +1,76 @@
+"""
+Test script for the compiled inference engine
+Builds tiny Keras models instead of loading trained weights
+"""
+import sys
+sys.path.append('.')
+
+import numpy as np
+import pytest
+
+from src.models.engine import CompiledModel, bucket_for, compile_model, warm_up_model
+
+def tiny_model():
+    import tensorflow as tf
+
+    inputs = tf.keras.Input((8, 8, 3))
+    x = tf.keras.layers.Conv2D(4, 3, name='conv1_conv')(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(2, activation='softmax')(x)
+    return tf.keras.Model(inputs, outputs)
+
+def test_bucket_for_rounds_up_to_the_next_bucket():
+    buckets = (1, 2, 4, 8)
+    assert [bucket_for(n, buckets) for n in (1, 2, 3, 5, 8, 20)] == [1, 2, 4, 8, 8, 8]
+
+def test_compiled_predictions_match_keras_for_every_batch_size():
+    model = tiny_model()
+    compiled = CompiledModel(model, buckets=(1, 4, 8))
+    batch = np.random.default_rng(0).random((19, 8, 8, 3), dtype=np.float32)
+
+    for size in (1, 3, 8, 19):
+        expected = model.predict(batch[:size], verbose=0)
+        assert np.allclose(compiled.predict(batch[:size], verbose=0), expected, atol=1e-6)
+    # 3 pads to 4 and 19 runs as 8 + 8 + 4: no shape outside the buckets is ever traced
+    assert compiled.traced_buckets == [1, 4, 8]
+    # Everything else is the wrapped Keras model's
+    assert compiled.layers == model.layers and compiled.get_layer('conv1_conv') is model.get_layer('conv1_conv')
+
+def test_multi_input_multi_output_models():
+    import tensorflow as tf
+
+    image, features = tf.keras.Input((4,)), tf.keras.Input((2,))
+    merged = tf.keras.layers.Concatenate()([image, features])
+    model = tf.keras.Model([image, features], [tf.keras.layers.Dense(3)(merged), features * 2])
+    compiled = CompiledModel(model, buckets=(2,))
+
+    inputs = [np.ones((3, 4), np.float32), np.arange(6, dtype=np.float32).reshape(3, 2)]
+    outputs = compiled.predict(inputs)
+    expected = model.predict(inputs, verbose=0)
+    assert len(outputs) == 2
+    assert all(np.allclose(got, want, atol=1e-6) for got, want in zip(outputs, expected))
+
+def test_compile_model_only_wraps_keras_models():
+    model = tiny_model()
+    compiled = compile_model(model, engine='compiled', buckets=(1,), xla=False)
+    assert isinstance(compiled, CompiledModel)
+    assert compile_model(compiled, engine='compiled') is compiled
+    assert compile_model(model, engine='keras') is model
+
+    other = object()
+    assert compile_model(other, engine='compiled') is other
+    with pytest.raises(ValueError):
+        compile_model(model, engine='onnx')
+
+def test_warm_up_traces_every_bucket_ahead_of_requests():
+    compiled = CompiledModel(tiny_model(), buckets=(1, 4, 8))
+    warm_up_model(compiled, [1, 3, 8])
+    assert compiled.traced_buckets == [1, 4, 8]
+
+if __name__ == "__main__":
+    test_bucket_for_rounds_up_to_the_next_bucket()
+    test_compiled_predictions_match_keras_for_every_batch_size()
+    test_multi_input_multi_output_models()
+    test_compile_model_only_wraps_keras_models()
+    test_warm_up_traces_every_bucket_ahead_of_requests()
+    print("✅ Engine tests passed")
@@ -0,0 +1,108 @@
+"""
+Test script for ensemble fusion and the /predict/ensemble response
+Runs without trained models
+"""
+import asyncio
+import io
+import sys
+sys.path.append('.')
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from src.models.ensemble import fuse_probabilities
+
+OUTPUTS = {
+    'hybrid': np.array([0.2, 0.8]),
+    'resnet50': np.array([0.6, 0.4]),
+    'simple_cnn': np.array([0.3, 0.7])
+}
+
+def test_mean_respects_weights():
+    assert np.allclose(fuse_probabilities(OUTPUTS, 'mean'), [1.1 / 3, 1.9 / 3])
+    fused = fuse_probabilities(OUTPUTS, 'mean', {'hybrid': 2.0})
+    assert np.allclose(fused, [(0.4 + 0.6 + 0.3) / 4, (1.6 + 0.4 + 0.7) / 4])
+
+def test_max_picks_most_confident_model():
+    assert np.allclose(fuse_probabilities(OUTPUTS, 'max'), [0.2, 0.8])
+
+def test_vote_and_tie_fallback():
+    assert np.allclose(fuse_probabilities(OUTPUTS, 'vote'), [1 / 3, 2 / 3])
+    tie = {'hybrid': np.array([0.2, 0.8]), 'resnet50': np.array([0.6, 0.4])}
+    assert np.allclose(fuse_probabilities(tie, 'vote'), fuse_probabilities(tie, 'mean'))
+
+def test_unknown_method_is_rejected():
+    try:
+        fuse_probabilities(OUTPUTS, 'median')
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+def serve_fake_models(tmp_path, monkeypatch):
+    """Point the API at fake hybrid/resnet50 classifiers plus an image-to-image autoencoder"""
+    import api_server
+    from src.models.executor import InferenceExecutor
+    from src.models.model_manager import ModelManager
+    from src.models.registry import ModelRegistry
+    from src.utils.prediction_cache import PredictionCache
+
+    class FakeModel:
+        def __init__(self, path):
+            self.autoencoder = 'autoencoder' in path
+
+        def predict(self, batch, verbose=0):
+            if self.autoencoder:
+                return batch
+            means = batch.reshape(len(batch), -1).mean(axis=1)
+            return np.stack([1 - means, means], axis=1)
+
+    files = {'hybrid': 'hybrid_model_colab.h5', 'resnet50': 'resnet_classifier_colab.h5',
+             'autoencoder': 'autoencoder_colab.h5'}
+    for model_file in files.values():
+        (tmp_path / model_file).write_bytes(b"weights")
+    manager = ModelManager(files, models_dir=str(tmp_path), classifiers=('hybrid', 'resnet50'),
+                           registry=ModelRegistry(loader=lambda path, compile=True: FakeModel(path)))
+    monkeypatch.setattr(api_server.detector, 'model_manager', manager)
+    monkeypatch.setattr(api_server.detector, 'cache', PredictionCache(max_entries=0))
+    monkeypatch.setattr(api_server.detector, 'executor', InferenceExecutor(max_workers=2))
+    return manager
+
+def post_ensemble(query=""):
+    import api_server
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((32, 32), 128, dtype=np.uint8)).save(buffer, 'PNG')
+
+    async def run():
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(f"/predict/ensemble{query}",
+                                     files={"file": ("x.png", buffer.getvalue(), "image/png")})
+
+    return asyncio.run(run())
+
+def test_ensemble_response_omits_unset_optional_fields(tmp_path, monkeypatch):
+    serve_fake_models(tmp_path, monkeypatch)
+    response = post_ensemble()
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body['model_results']) == {'hybrid', 'resnet50'}
+    for result in [body] + list(body['model_results'].values()):
+        assert 'profile' not in result and 'cascade' not in result
+    assert body['model_results']['hybrid']['model_used'] == 'hybrid'
+
+def test_ensemble_rejects_models_that_are_not_classifiers(tmp_path, monkeypatch):
+    manager = serve_fake_models(tmp_path, monkeypatch)
+    response = post_ensemble("?models=hybrid,autoencoder")
+    assert response.status_code == 400
+    assert "autoencoder" in response.json()["detail"]
+    # Rejected before anything was loaded
+    assert not any(manager.is_loaded(name) for name in manager.available)
+
+if __name__ == "__main__":
+    test_mean_respects_weights()
+    test_max_picks_most_confident_model()
+    test_vote_and_tie_fallback()
+    test_unknown_method_is_rejected()
+    print("✅ Ensemble fusion tests passed")
@@ -0,0 +1,102 @@
+"""
+Test script for inference executor admission control (back-pressure)
+Drives the real API app with a fake model manager, no trained models needed
+"""
+import asyncio
+import io
+import sys
+from contextlib import contextmanager
+sys.path.append('.')
+
+import httpx
+import numpy as np
+import pytest
+from PIL import Image
+
+import api_server
+from src.models.executor import ExecutorSaturated, InferenceExecutor
+from src.utils.prediction_cache import PredictionCache
+
+class FakeModel:
+    def predict(self, batch, verbose=0):
+        means = batch.reshape(len(batch), -1).mean(axis=1)
+        return np.stack([1 - means, means], axis=1)
+
+class FakeManager:
+    available = ['hybrid']
+    classifiers = ['hybrid']
+
+    @contextmanager
+    def use(self, model_name):
+        yield FakeModel()
+
+    def version(self, model_name):
+        return "v1"
+
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((64, 64), 200, dtype=np.uint8)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+@pytest.fixture
+def detector(monkeypatch):
+    detector = api_server.detector
+    monkeypatch.setattr(detector, 'model_manager', FakeManager())
+    monkeypatch.setattr(detector, 'cache', PredictionCache(max_entries=0))
+    monkeypatch.setattr(detector, 'executor', InferenceExecutor(max_workers=2, max_pending=1, retry_after=3))
+    return detector
+
+def post(path, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+    return asyncio.run(run())
+
+def test_slot_is_released_on_success_error_and_cancellation():
+    executor = InferenceExecutor(max_workers=1, max_pending=1)
+
+    with executor.admission():
+        with pytest.raises(ExecutorSaturated):
+            with executor.admission():
+                pass
+    with pytest.raises(RuntimeError):
+        with executor.admission():
+            raise RuntimeError("forward pass failed")
+
+    async def cancelled_request():
+        started = asyncio.Event()
+
+        async def request():
+            with executor.admission():
+                started.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(request())
+        await started.wait()
+        assert executor.stats()['in_flight'] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_request())
+    stats = executor.stats()
+    assert stats['in_flight'] == 0
+    assert stats['admitted_total'] == 3 and stats['rejected_total'] == 1
+
+def test_requests_over_the_limit_get_503_with_retry_after(detector):
+    files = {"file": ("x.jpg", jpeg_bytes(), "image/jpeg")}
+    with detector.executor.admission():
+        response = post("/predict", files=files)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json()["retry_after"] == 3
+
+    # The slot held above is free again, and so is the one the request used
+    response = post("/predict", files=files)
+    assert response.status_code == 200 and response.json()["model_used"] == "hybrid"
+    assert detector.executor.stats()['in_flight'] == 0
+
+if __name__ == "__main__":
+    test_slot_is_released_on_success_error_and_cancellation()
+    print("✅ Executor tests passed")
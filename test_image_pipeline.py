@@ -0,0 +1,49 @@
+"""
+Test script for the streaming image pipeline
+Runs without trained models (needs TensorFlow for tf.data)
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import numpy as np
+from PIL import Image
+
+from src.utils.image_pipeline import find_images, image_batches
+from src.utils.preprocessing import preprocess_image
+
+def make_tree(root):
+    os.makedirs(os.path.join(root, "study2", "series1"))
+    for i, rel in enumerate(["a.jpeg", "study2/b.png", "study2/series1/c.jpg"]):
+        Image.fromarray(np.full((300, 260), 40 * (i + 1), dtype=np.uint8)).save(os.path.join(root, rel))
+    open(os.path.join(root, "study2", "broken.jpeg"), "wb").write(b"not an image")
+    open(os.path.join(root, "notes.txt"), "w").write("skip me")
+
+def test_find_images_recurses_in_stable_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        assert [os.path.relpath(p, tmp) for p in find_images(tmp)] == ["a.jpeg"]
+        assert [os.path.relpath(p, tmp) for p in find_images(tmp, recursive=True)] == [
+            "a.jpeg", "study2/b.png", "study2/broken.jpeg", "study2/series1/c.jpg"
+        ]
+
+def test_batches_match_single_image_preprocessing_and_flag_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        paths = find_images(tmp, recursive=True)
+        batches = list(image_batches(paths, batch_size=3, workers=2))
+
+        seen = [p for _, batch_paths, _ in batches for p in batch_paths]
+        errors = [e for _, _, batch_errors in batches for e in batch_errors]
+        images = np.concatenate([images for images, _, _ in batches])
+        assert seen == paths
+        assert [e is not None for e in errors] == [False, False, True, False]
+        good = [p for p, e in zip(paths, errors) if e is None]
+        expected = np.concatenate([preprocess_image(p, resample=Image.NEAREST) for p in good])
+        assert images.dtype == np.float32 and np.array_equal(images, expected)
+
+if __name__ == "__main__":
+    test_find_images_recurses_in_stable_order()
+    test_batches_match_single_image_preprocessing_and_flag_errors()
+    print("✅ Image pipeline tests passed")
@@ -0,0 +1,92 @@
+"""
+Test script for the shared inference process
+Runs without TensorFlow (serves a fake model manager over a temporary socket)
+"""
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('.')
+
+import numpy as np
+
+from src.models.inference_server import InferenceServer, RemoteModelManager
+
+class FakeModel:
+    def predict(self, batch, verbose=0):
+        return np.stack([batch.mean(axis=(1, 2, 3)), 1 - batch.mean(axis=(1, 2, 3))], axis=1)
+
+class FakeManager:
+    available = ['hybrid', 'resnet50']
+    classifiers = ['hybrid', 'resnet50']
+    precisions = {'hybrid': 'fp32', 'resnet50': 'fp32'}
+
+    @contextmanager
+    def use(self, model_name):
+        if model_name not in self.available:
+            raise KeyError(model_name)
+        yield FakeModel()
+
+    def version(self, model_name):
+        return "v1"
+
+    def state(self):
+        return {name: {'state': 'loaded'} for name in self.available}
+
+    predict_models = prediction_groups = preload = register_variant = content_hash = is_loaded = stats = backbone_stats = None
+
+    def warm_up_state(self):
+        return {'state': 'done', 'models': {'hybrid': 0.1}, 'errors': {}, 'seconds': 0.1}
+
+def serve():
+    address = os.path.join(tempfile.mkdtemp(), "inference.sock")
+    server = InferenceServer(FakeManager(), address, b"secret", max_wait_ms=20)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, RemoteModelManager(address, b"secret", connect_timeout=5)
+
+def test_workers_share_batches_in_the_inference_process():
+    server, client = serve()
+    try:
+        assert client.available == ['hybrid', 'resnet50']
+        images = [np.full((1, 4, 4, 3), i / 10, dtype=np.float32) for i in range(8)]
+        with ThreadPoolExecutor(8) as pool:
+            outputs = list(pool.map(lambda img: client.get('hybrid').predict(img), images))
+
+        for i, output in enumerate(outputs):
+            assert output.shape == (1, 2)
+            assert np.isclose(output[0, 0], i / 10)
+        stats = client.server_stats()
+        assert stats['batching']['hybrid']['requests_total'] == 8
+        assert stats['batching']['hybrid']['batches_total'] < 8
+        assert client.state()['resnet50']['state'] == 'loaded'
+        # Workers report readiness from the inference process's warm-up
+        assert client.warm_up_state()['state'] == 'done'
+    finally:
+        server.close()
+
+def test_errors_and_wrong_key_are_reported():
+    server, client = serve()
+    try:
+        try:
+            client.get('autoencoder').predict(np.zeros((2, 4, 4, 3)))
+        except RuntimeError as e:
+            assert 'autoencoder' in str(e)
+        else:
+            raise AssertionError("expected RuntimeError")
+
+        try:
+            RemoteModelManager(server.address, b"wrong", connect_timeout=0)
+        except Exception:
+            pass
+        else:
+            raise AssertionError("expected the wrong key to be rejected")
+        assert client.version('hybrid') == "v1"
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    test_workers_share_batches_in_the_inference_process()
+    test_errors_and_wrong_key_are_reported()
+    print("✅ Inference server tests passed")
@@ -0,0 +1,72 @@
+"""
+Test script for the Prometheus metrics registry
+Runs without trained models or TensorFlow
+"""
+import sys
+import threading
+sys.path.append('.')
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils.metrics import MetricsRegistry
+from src.utils.preprocessing import preprocess_image
+
+def test_counter_and_histogram_render_in_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ['path', 'status'])
+    latency = registry.histogram('stage_seconds', 'Stage time', ['stage'], buckets=(0.1, 1.0))
+
+    requests.inc(path='/predict', status='200')
+    requests.inc(2, path='/predict', status='200')
+    for value in (0.05, 0.5, 3.0):
+        latency.observe(value, stage='decode')
+
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{path="/predict",status="200"} 3' in text
+    assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="decode",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 3' in text
+    assert 'stage_seconds_sum{stage="decode"} 3.55' in text
+    assert 'stage_seconds_count{stage="decode"} 3' in text
+
+def test_labels_are_validated_and_registration_is_idempotent():
+    registry = MetricsRegistry()
+    gauge = registry.gauge('queue_depth', 'Queue', ['model'])
+    assert registry.gauge('queue_depth', 'Queue', ['model']) is gauge
+    with pytest.raises(ValueError):
+        registry.counter('queue_depth', 'Queue', ['model'])
+    with pytest.raises(ValueError):
+        gauge.set(1, stage='decode')
+
+def test_concurrent_updates_are_not_lost():
+    registry = MetricsRegistry()
+    counter = registry.counter('hits_total', 'Hits', ['model'])
+
+    def worker():
+        for _ in range(1000):
+            counter.inc(model='hybrid')
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value(model='hybrid') == 8000
+
+def test_preprocessing_reports_stage_timings():
+    pixels = np.random.default_rng(0).integers(0, 255, (300, 260), dtype=np.uint8)
+    timings = {}
+    img_array = preprocess_image(Image.fromarray(pixels), timings=timings)
+    assert set(timings) == {'decode', 'resize', 'normalize'}
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert np.array_equal(img_array, preprocess_image(Image.fromarray(pixels)))
+
+if __name__ == "__main__":
+    test_counter_and_histogram_render_in_exposition_format()
+    test_labels_are_validated_and_registration_is_idempotent()
+    test_concurrent_updates_are_not_lost()
+    test_preprocessing_reports_stage_timings()
+    print("✅ Metrics tests passed")
@@ -0,0 +1,200 @@
+"""
+Test script for the process-wide model registry
+Runs without TensorFlow (uses a fake loader)
+"""
+import gc
+import os
+import sys
+import tempfile
+import threading
+import weakref
+sys.path.append('.')
+
+import numpy as np
+
+from src.models.model_manager import ModelManager
+from src.models.registry import ModelRegistry
+
+class FakeModel:
+    input_shape = (None, 4, 4, 3)
+
+    def __init__(self, path):
+        self.path = path
+        self.predict_calls = 0
+        self.batch_sizes = []
+        self.weights = []
+        self.size_bytes = os.path.getsize(path)
+
+    def predict(self, batch, verbose=0):
+        self.predict_calls += 1
+        self.batch_sizes.append(len(batch))
+        return batch[:, 0, 0, :2]
+
+def make_registry(memory_budget=None):
+    loads = []
+
+    def loader(path, compile=True):
+        loads.append(path)
+        return FakeModel(path)
+
+    return ModelRegistry(loader=loader, memory_budget=memory_budget), loads
+
+def test_models_load_once_per_process():
+    registry, loads = make_registry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hybrid_model_colab.h5")
+        open(path, "wb").write(b"weights")
+
+        threads = [threading.Thread(target=registry.get, args=(path,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert registry.get(path) is registry.get(path)
+        assert len(loads) == 1
+
+def test_changed_file_is_reloaded():
+    registry, loads = make_registry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resnet_classifier_colab.h5")
+        open(path, "wb").write(b"v1")
+        first = registry.get(path)
+        version = registry.version(path)
+
+        open(path, "wb").write(b"version 2")
+        second = registry.get(path)
+
+        assert first is not second
+        assert registry.version(path) != version
+        assert len(loads) == 2
+
+def test_warm_up_runs_once_and_invalidate_forces_reload():
+    registry, loads = make_registry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hybrid_model_colab.h5")
+        open(path, "wb").write(b"weights")
+
+        registry.warm_up(path)
+        model = registry.get(path, warm_up=True)
+        assert model.predict_calls == 1
+
+        registry.invalidate()
+        assert not registry.is_loaded(path)
+        assert registry.get(path) is not model
+        assert len(loads) == 2
+
+def test_acquire_release_refcounts():
+    registry, loads = make_registry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hybrid_model_colab.h5")
+        open(path, "wb").write(b"weights")
+
+        sessions = [registry.acquire(path) for _ in range(3)]
+        assert all(model is sessions[0] for model in sessions)
+        assert registry.refcount(path) == 3
+
+        registry.release(path)
+        registry.release(path)
+        assert registry.refcount(path) == 1
+        registry.release(path)
+        registry.release(path)
+        assert registry.refcount(path) == 0
+        assert len(loads) == 1
+
+def test_budget_evicts_least_recently_used_idle_model():
+    registry, loads = make_registry(memory_budget=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for name in ("hybrid", "resnet50", "autoencoder"):
+            paths[name] = os.path.join(tmp, f"{name}.h5")
+            open(paths[name], "wb").write(b"x" * 5)
+
+        registry.acquire(paths["hybrid"])
+        registry.get(paths["resnet50"])
+        registry.get(paths["autoencoder"])
+        # hybrid is the oldest but held, so resnet50 is evicted instead
+        assert registry.is_loaded(paths["hybrid"])
+        assert not registry.is_loaded(paths["resnet50"])
+        assert registry.is_loaded(paths["autoencoder"])
+        assert registry.evictions == 1 and registry.memory_bytes() == 10
+
+        registry.release(paths["hybrid"])
+        registry.get(paths["autoencoder"])
+        registry.get(paths["resnet50"])
+        assert not registry.is_loaded(paths["hybrid"])
+        assert registry.peek(paths["hybrid"]) is None
+        assert len(loads) == 4
+
+def test_manager_warm_up_runs_every_batch_size_and_reports_failures():
+    def loader(path, compile=True):
+        if "resnet" in path:
+            raise OSError("truncated file")
+        return FakeModel(path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {"hybrid": "hybrid_model_colab.h5", "resnet50": "resnet_classifier_colab.h5"}
+        for model_file in files.values():
+            open(os.path.join(tmp, model_file), "wb").write(b"weights")
+        manager = ModelManager(files, models_dir=tmp, classifiers=files, registry=ModelRegistry(loader=loader))
+        assert manager.warm_up_state()['state'] == 'pending'
+
+        state = manager.warm_up(batch_sizes=[1, 4, 16], iterations=2)
+        assert state['state'] == 'done' and state['seconds'] is not None
+        assert list(state['models']) == ["hybrid"]
+        assert "truncated file" in state['errors']["resnet50"]
+        assert manager.get("hybrid").batch_sizes == [1, 1, 4, 4, 16, 16]
+
+def test_warm_up_keeps_other_models_lazy_and_fits_the_budget():
+    registry, loads = make_registry(memory_budget=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {"hybrid": "hybrid_model_colab.h5", "resnet50": "resnet_classifier_colab.h5",
+                 "autoencoder": "autoencoder_colab.h5"}
+        for model_file in files.values():
+            open(os.path.join(tmp, model_file), "wb").write(b"4444")
+        manager = ModelManager(files, models_dir=tmp, classifiers=("hybrid", "resnet50"), registry=registry)
+
+        # Classifiers only, and resnet50 would have evicted the freshly warmed hybrid
+        state = manager.warm_up(batch_sizes=[1])
+        assert list(state['models']) == ["hybrid"] and list(state['skipped']) == ["resnet50"]
+        assert not manager.is_loaded("autoencoder") and registry.evictions == 0
+
+        # Traffic for another model evicts hybrid: it is no longer reported as warm
+        manager.get("resnet50")
+        state = manager.warm_up_state()
+        assert state['models'] == {} and state['evicted'] == ["hybrid"]
+
+def test_evicted_model_is_freed_from_the_shared_runner():
+    registry, loads = make_registry(memory_budget=8)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {"hybrid": "hybrid_model_colab.h5", "resnet50": "resnet_classifier_colab.h5",
+                 "autoencoder": "autoencoder_colab.h5"}
+        for model_file in files.values():
+            open(os.path.join(tmp, model_file), "wb").write(b"4444")
+        manager = ModelManager(files, models_dir=tmp, classifiers=("hybrid", "resnet50"), registry=registry)
+
+        manager.predict_models(np.zeros((1, 4, 4, 3), dtype=np.float32), ["hybrid", "resnet50"])
+        assert set(manager._runner.models) == {"hybrid", "resnet50"}
+        hybrid = weakref.ref(manager.get("hybrid"))
+        manager.get("resnet50")  # hybrid is now the least recently used
+
+        manager.get("autoencoder")
+        assert not manager.is_loaded("hybrid") and registry.evictions == 1
+        assert manager._runner is None
+        gc.collect()
+        assert hybrid() is None
+
+        # The next shared call rebuilds the runner from what is in memory
+        manager.predict_models(np.zeros((1, 4, 4, 3), dtype=np.float32), ["resnet50"])
+        assert set(manager._runner.models) == {"resnet50"}
+
+if __name__ == "__main__":
+    test_models_load_once_per_process()
+    test_changed_file_is_reloaded()
+    test_warm_up_runs_once_and_invalidate_forces_reload()
+    test_acquire_release_refcounts()
+    test_budget_evicts_least_recently_used_idle_model()
+    test_manager_warm_up_runs_every_batch_size_and_reports_failures()
+    test_warm_up_keeps_other_models_lazy_and_fits_the_budget()
+    test_evicted_model_is_freed_from_the_shared_runner()
+    print("✅ Model registry tests passed")
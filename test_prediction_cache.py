@@ -0,0 +1,91 @@
+"""
+Test script for the content-addressed prediction cache
+Runs without trained models
+"""
+import os
+import sys
+import tempfile
+import time
+sys.path.append('.')
+
+import numpy as np
+
+from src.utils.prediction_cache import PredictionCache
+
+def image(value):
+    return np.full((1, 8, 8, 3), value, dtype=np.float32)
+
+def test_key_depends_on_pixels_model_and_version():
+    key = PredictionCache.make_key(image(0.5), "hybrid", "v1")
+    assert key == PredictionCache.make_key(image(0.5), "hybrid", "v1")
+    assert key != PredictionCache.make_key(image(0.6), "hybrid", "v1")
+    assert key != PredictionCache.make_key(image(0.5), "resnet50", "v1")
+    assert key != PredictionCache.make_key(image(0.5), "hybrid", "v2")
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", [0.9, 0.1])
+    cache.set("b", [0.2, 0.8])
+    assert cache.get("a") == [0.9, 0.1]   # a is now most recently used
+    cache.set("c", [0.5, 0.5])             # evicts b
+
+    assert cache.get("b") is None
+    assert cache.get("c") == [0.5, 0.5]
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(max_entries=10, ttl_seconds=0.05)
+    cache.set("a", [0.9, 0.1])
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+def test_disk_tier_survives_a_new_process_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        PredictionCache(max_entries=10, ttl_seconds=60, disk_dir=tmp).set("abcd", [0.3, 0.7])
+
+        fresh = PredictionCache(max_entries=10, ttl_seconds=60, disk_dir=tmp)
+        assert fresh.get("abcd") == [0.3, 0.7]
+        assert fresh.stats()['disk_hits'] == 1
+        assert fresh.get("abcd") == [0.3, 0.7]
+        assert fresh.stats()['hits'] == 1
+
+def test_disk_tier_is_pruned_to_its_bound():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PredictionCache(max_entries=100, ttl_seconds=60, disk_dir=tmp, disk_max_entries=10)
+        for i in range(25):
+            cache.set(f"{i:04x}", [0.5, 0.5])
+            # Distinct write times, oldest first
+            os.utime(cache._disk_path(f"{i:04x}"), (1_000_000 + i, time.time() - 25 + i))
+        files = [name for _, _, names in os.walk(tmp) for name in names]
+        # Pruned every 10 % of the bound, so the directory never grows past bound + one interval
+        assert len(files) <= 11
+        cache.prune_disk()
+        remaining = sorted(name[:-5] for _, _, names in os.walk(tmp) for name in names)
+        assert remaining == [f"{i:04x}" for i in range(15, 25)]
+        assert cache.stats()['disk_evictions'] == 15
+
+        # Expired files go regardless of the bound, also when a new process starts on the directory
+        os.utime(cache._disk_path("0018"), (0, time.time() - 120))
+        fresh = PredictionCache(max_entries=100, ttl_seconds=60, disk_dir=tmp, disk_max_entries=10)
+        assert fresh.stats()['disk_evictions'] == 1
+        assert fresh.get("0018") is None
+        assert fresh.get("0017") == [0.5, 0.5]
+
+def test_zero_size_disables_cache():
+    cache = PredictionCache(max_entries=0)
+    cache.set("a", [0.9, 0.1])
+    assert cache.get("a") is None
+    assert not cache.stats()['enabled']
+
+if __name__ == "__main__":
+    test_key_depends_on_pixels_model_and_version()
+    test_lru_eviction_and_counters()
+    test_entries_expire_after_ttl()
+    test_disk_tier_survives_a_new_process_cache()
+    test_disk_tier_is_pruned_to_its_bound()
+    test_zero_size_disables_cache()
+    print("✅ Prediction cache tests passed")
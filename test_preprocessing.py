@@ -0,0 +1,63 @@
+"""
+Test script for the shared image preprocessing module
+Runs without trained models or TensorFlow
+"""
+import io
+import sys
+sys.path.append('.')
+
+import numpy as np
+from PIL import Image
+
+from src.utils.preprocessing import preprocess_image, preprocess_batch, new_batch
+
+def encode(pixels, fmt):
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, fmt)
+    return buffer.getvalue()
+
+def legacy_preprocess(img_bytes):
+    img = Image.open(io.BytesIO(img_bytes)).convert('RGB').resize((224, 224))
+    return np.expand_dims(np.asarray(img, dtype='float32'), axis=0) / 255.0
+
+def sample_pixels(size=600):
+    x = np.linspace(0, 4 * np.pi, size)
+    return (np.outer(np.sin(x) + 1, np.cos(x) + 1) * 63).astype(np.uint8)
+
+def test_png_matches_legacy_output():
+    data = encode(sample_pixels(), 'PNG')
+    result = preprocess_image(data)
+    assert result.shape == (1, 224, 224, 3)
+    assert result.dtype == np.float32
+    assert np.allclose(result, legacy_preprocess(data), atol=1e-6)
+
+def test_jpeg_draft_decode_stays_close_to_legacy():
+    data = encode(sample_pixels(1200), 'JPEG')
+    diff = np.abs(preprocess_image(data) - legacy_preprocess(data))
+    assert diff.max() <= 3 / 255
+    assert diff.mean() < 0.005
+
+def test_large_tiff_reduced_decode_stays_close_to_legacy():
+    data = encode(sample_pixels(2400), 'TIFF')
+    diff = np.abs(preprocess_image(data) - legacy_preprocess(data))
+    assert diff.max() <= 6 / 255
+    assert diff.mean() < 0.005
+
+def test_batch_fills_preallocated_buffer_in_place():
+    images = [encode(sample_pixels(300), 'PNG'), Image.fromarray(sample_pixels(500)).convert('RGB')]
+    buffer = new_batch(4)
+    result = preprocess_batch(images, out=buffer)
+    assert result.shape == (2, 224, 224, 3)
+    assert np.shares_memory(result, buffer)
+    assert np.allclose(result[0], preprocess_image(images[0])[0])
+
+    slot = preprocess_image(images[1], out=buffer[3])
+    assert slot.shape == (1, 224, 224, 3)
+    assert np.shares_memory(slot, buffer)
+
+if __name__ == "__main__":
+    test_png_matches_legacy_output()
+    test_jpeg_draft_decode_stays_close_to_legacy()
+    test_large_tiff_reduced_decode_stays_close_to_legacy()
+    test_batch_fills_preallocated_buffer_in_place()
+    print("✅ Preprocessing tests passed")
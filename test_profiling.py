@@ -0,0 +1,62 @@
+"""
+Test script for request profiling helpers
+Builds a tiny Keras model instead of loading trained weights
+"""
+import os
+import pstats
+import sys
+import tempfile
+sys.path.append('.')
+
+import numpy as np
+import pytest
+
+from src.utils.profiling import RequestProfiler, layer_group, profile_layers
+
+def test_layer_group_uses_stage_prefix():
+    assert layer_group('conv2_block1_1_conv') == 'conv2'
+    assert layer_group('block3_pool') == 'block3'
+    assert layer_group('global_average_pooling2d') == 'global_average_pooling2d'
+    assert layer_group('dense') == 'dense'
+
+def test_profile_layers_times_nested_models_and_skips_other_models():
+    import tensorflow as tf
+
+    inputs = tf.keras.Input((8, 8, 3))
+    x = tf.keras.layers.Conv2D(4, 3, name='conv1_conv')(inputs)
+    x = tf.keras.layers.Conv2D(4, 3, name='conv2_block1_conv')(x)
+    trunk = tf.keras.Model(inputs, x, name='trunk')
+
+    outer_inputs = tf.keras.Input((8, 8, 3))
+    y = tf.keras.layers.GlobalAveragePooling2D(name='pool')(trunk(outer_inputs))
+    outputs = tf.keras.layers.Dense(2, activation='softmax', name='dense')(y)
+    model = tf.keras.Model(outer_inputs, outputs)
+
+    groups = profile_layers(model, np.zeros((1, 8, 8, 3), dtype=np.float32))
+    assert {'trunk/conv1', 'trunk/conv2', 'pool', 'dense'} <= set(groups)
+    assert all(seconds >= 0 for seconds in groups.values())
+    assert profile_layers(object(), None) is None
+
+def test_sampled_requests_are_captured_with_cprofile():
+    with tempfile.TemporaryDirectory() as output_dir:
+        profiler = RequestProfiler(output_dir, sample_rate=1.0)
+        assert profiler.sample()
+        with profiler.capture('hybrid') as info:
+            sum(i * i for i in range(1000))
+
+        assert info['path'].startswith(output_dir) and os.path.exists(info['path'])
+        assert pstats.Stats(info['path']).total_calls > 0
+        assert profiler.stats()['captured'] == 1
+
+def test_sampling_is_off_without_an_output_dir():
+    profiler = RequestProfiler('', sample_rate=1.0)
+    assert not any(profiler.sample() for _ in range(100))
+    with pytest.raises(ValueError):
+        RequestProfiler('/tmp', mode='perf')
+
+if __name__ == "__main__":
+    test_layer_group_uses_stage_prefix()
+    test_profile_layers_times_nested_models_and_skips_other_models()
+    test_sampled_requests_are_captured_with_cprofile()
+    test_sampling_is_off_without_an_output_dir()
+    print("✅ Profiling tests passed")
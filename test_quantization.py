@@ -0,0 +1,55 @@
+"""
+Test script for the quantization accuracy gate
+Runs without trained models
+"""
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import numpy as np
+import pytest
+
+from src.models.artifacts import model_hash
+from src.models.quantization import roc_auc, check_gate, resolve_variant, variant_paths
+
+def test_roc_auc_matches_pairwise_definition():
+    labels = np.array([0, 0, 1, 1, 1, 0])
+    scores = np.array([0.1, 0.4, 0.35, 0.8, 0.4, 0.2])
+    pairs = [(p, n) for p in scores[labels == 1] for n in scores[labels == 0]]
+    expected = np.mean([1.0 if p > n else 0.5 if p == n else 0.0 for p, n in pairs])
+    assert np.isclose(roc_auc(labels, scores), expected)
+    assert np.isnan(roc_auc(np.ones(3), np.arange(3)))
+
+def test_gate_refuses_large_auc_drop():
+    assert check_gate({'auc': 0.955, 'baseline_auc': 0.96}, 0.01)[0]
+    assert not check_gate({'auc': 0.93, 'baseline_auc': 0.96}, 0.01)[0]
+    assert not check_gate({'auc': None, 'baseline_auc': 0.96}, 0.01)[0]
+
+def test_variant_follows_model_content_not_mtime():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'hybrid_model_colab.h5')
+        with open(model_path, 'wb') as f:
+            f.write(b"weights")
+        tflite_path, manifest_path = variant_paths(model_path, 'int8')
+        os.makedirs(os.path.dirname(tflite_path))
+        open(tflite_path, 'wb').close()
+        with open(manifest_path, 'w') as f:
+            json.dump({'source_hash': model_hash(model_path), 'auc': 0.95, 'baseline_auc': 0.955}, f)
+
+        assert resolve_variant(model_path, 'int8', 0.01) == tflite_path
+        # Copied without preserving mtimes (another host, a Docker image): still the same model
+        os.utime(model_path, (0, 0))
+        assert resolve_variant(model_path, 'int8', 0.01) == tflite_path
+
+        with open(model_path, 'wb') as f:
+            f.write(b"retrained")
+        with pytest.raises(ValueError):
+            resolve_variant(model_path, 'int8', 0.01)
+
+if __name__ == "__main__":
+    test_roc_auc_matches_pairwise_definition()
+    test_gate_refuses_large_auc_drop()
+    test_variant_follows_model_content_not_mtime()
+    print("✅ Quantization gate tests passed")
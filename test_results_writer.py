@@ -0,0 +1,96 @@
+"""
+Test script for the streaming results writer
+Runs without trained models or TensorFlow
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import pytest
+
+from src.utils.results_writer import ResultsSummary, ResultsWriter, open_results_writer, result_format
+
+CLASSES = ['NORMAL', 'PNEUMONIA']
+
+def make_result(i):
+    p = (i % 10) / 10 + 0.05
+    probabilities = {'NORMAL': 1 - p, 'PNEUMONIA': p}
+    name = max(probabilities, key=probabilities.get)
+    return {'image_path': f'imgs/{i:03d}.jpeg', 'class': name,
+            'confidence': probabilities[name], 'probabilities': probabilities}
+
+@pytest.mark.parametrize('filename', ['scores.csv', 'scores.jsonl'])
+def test_line_formats_append_resume_and_drop_partial_lines(filename):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, filename)
+        results = [make_result(i) for i in range(25)]
+
+        with open_results_writer(path, CLASSES) as writer:
+            writer.write(results[:10])
+            writer.write(results[10:20])
+        # Simulate a run killed halfway through writing a line
+        with open(path, 'a') as f:
+            f.write('imgs/020.jpeg,PNEU')
+
+        with open_results_writer(path, CLASSES) as writer:
+            assert writer.completed_paths() == {r['image_path'] for r in results[:20]}
+            writer.write(results[20:])
+            assert writer.rows_written == 5
+
+        read_back = list(open_results_writer(path, CLASSES).read())
+        assert [r['image_path'] for r in read_back] == [r['image_path'] for r in results]
+        assert read_back[3]['probabilities'] == pytest.approx(results[3]['probabilities'])
+
+def test_parquet_flushes_every_chunk_without_close():
+    pytest.importorskip('pyarrow')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scores.parquet')
+        results = [make_result(i) for i in range(25)]
+
+        # Never closed, like a run that crashed after two chunks
+        writer = open_results_writer(path, CLASSES)
+        writer.write(results[:10])
+        writer.write(results[10:20])
+        assert len(os.listdir(path)) == 2
+
+        resumed = open_results_writer(path, CLASSES)
+        assert resumed.completed_paths() == {r['image_path'] for r in results[:20]}
+        resumed.write(results[20:])
+        assert [r['image_path'] for r in resumed.read()] == [r['image_path'] for r in results]
+
+def test_summary_matches_list_based_analysis():
+    results = [make_result(i) for i in range(37)]
+    summary = ResultsSummary(CLASSES)
+    for result in results:
+        summary.update(result)
+
+    assert summary.total == 37
+    assert summary.counts['NORMAL'] == sum(r['class'] == 'NORMAL' for r in results)
+    assert summary.mean_confidence == pytest.approx(sum(r['confidence'] for r in results) / 37)
+    assert summary.high_confidence == sum(r['confidence'] > 0.9 for r in results)
+    low = [r for r in results if r['confidence'] < 0.7]
+    assert summary.low_confidence == len(low)
+    assert [e['image_path'] for e in summary.low_confidence_examples] == [r['image_path'] for r in low[:5]]
+
+def test_format_from_extension():
+    assert result_format('out/scores.parquet') == 'parquet'
+    assert result_format('scores.JSONL') == 'jsonl'
+    with pytest.raises(ValueError):
+        result_format('scores.txt')
+
+def test_writer_without_write_fails_when_created():
+    class ReadOnlyWriter(ResultsWriter):
+        def read(self):
+            return iter(())
+
+    with pytest.raises(TypeError):
+        ReadOnlyWriter('scores.csv', ['NORMAL', 'PNEUMONIA'])
+
+if __name__ == "__main__":
+    for filename in ['scores.csv', 'scores.jsonl']:
+        test_line_formats_append_resume_and_drop_partial_lines(filename)
+    test_summary_matches_list_based_analysis()
+    test_format_from_extension()
+    test_writer_without_write_fails_when_created()
+    print("✅ Results writer tests passed")
@@ -0,0 +1,107 @@
+"""
+Test script for the shared ResNet trunk between classifiers
+Builds tiny Keras models with ResNet-style block names instead of loading trained weights
+"""
+import sys
+sys.path.append('.')
+
+import numpy as np
+
+from src.models.shared_backbone import SharedBackboneRunner, cut_fingerprints
+
+def trunk(inputs):
+    from tensorflow.keras import layers
+
+    x = layers.Conv2D(4, 3, padding='same', name='conv1_conv')(inputs)
+    x = layers.Activation('relu', name='conv2_block1_out')(x)
+    x = layers.Conv2D(4, 3, strides=2, padding='same', name='conv3_block1_conv')(x)
+    x = layers.Activation('relu', name='conv3_block1_out')(x)
+    x = layers.Conv2D(8, 3, strides=2, padding='same', name='conv5_block3_conv')(x)
+    return layers.Activation('relu', name='conv5_block3_out')(x)
+
+def classifier(with_encoder=False):
+    """resnet50-like: trunk + dense head; with_encoder adds a second branch, like the hybrid model"""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    inputs = tf.keras.Input((16, 16, 3))
+    features = layers.GlobalAveragePooling2D()(trunk(inputs))
+    if with_encoder:
+        encoded = layers.GlobalAveragePooling2D()(layers.Conv2D(2, 3, strides=4, name='encoder_conv')(inputs))
+        features = layers.Concatenate()([features, encoded])
+    return tf.keras.Model(inputs, layers.Dense(2, activation='softmax')(features))
+
+def copy_trunk(source, target, layer_names):
+    for name in layer_names:
+        target.get_layer(name).set_weights(source.get_layer(name).get_weights())
+
+def plain_model():
+    """No ResNet block names at all"""
+    import tensorflow as tf
+
+    inputs = tf.keras.Input((16, 16, 3))
+    x = tf.keras.layers.GlobalAveragePooling2D()(tf.keras.layers.Conv2D(2, 3)(inputs))
+    return tf.keras.Model(inputs, tf.keras.layers.Dense(2, activation='softmax')(x))
+
+def images(n, seed=0):
+    return np.random.default_rng(seed).random((n, 16, 16, 3), dtype=np.float32)
+
+def test_fused_outputs_match_each_models_own_predict():
+    hybrid, resnet = classifier(with_encoder=True), classifier()
+    # Identical up to conv3_block1_out, different conv5 weights
+    copy_trunk(hybrid, resnet, ['conv1_conv', 'conv3_block1_conv'])
+    plain = plain_model()
+
+    fingerprints = cut_fingerprints(hybrid), cut_fingerprints(resnet)
+    assert fingerprints[0]['conv3_block1_out'] == fingerprints[1]['conv3_block1_out']
+    assert fingerprints[0]['conv5_block3_out'] != fingerprints[1]['conv5_block3_out']
+
+    runner = SharedBackboneRunner({'hybrid': hybrid, 'resnet50': resnet, 'plain': plain})
+    assert runner.cut_layer == 'conv3_block1_out'
+    stats = runner.stats()
+    assert stats['shared_models'] == ['hybrid', 'resnet50'] and stats['unshared_models'] == ['plain']
+
+    batch = images(3)
+    results = runner.predict(batch)
+    for name, model in (('hybrid', hybrid), ('resnet50', resnet), ('plain', plain)):
+        assert np.allclose(results[name]['probabilities'], model.predict(batch, verbose=0), atol=1e-5)
+
+def test_models_without_a_common_prefix_run_in_full():
+    first, second = classifier(), classifier()
+    runner = SharedBackboneRunner({'first': first, 'second': second})
+    assert runner.cut_layer is None and runner.shared_models == []
+
+    batch = images(2)
+    results = runner.predict(batch)
+    assert np.allclose(results['first']['probabilities'], first.predict(batch, verbose=0), atol=1e-6)
+    assert np.allclose(results['second']['probabilities'], second.predict(batch, verbose=0), atol=1e-6)
+    assert runner.stats()['trunk_passes'] == 0
+
+def test_activation_cache_counts_hits_and_misses():
+    hybrid, resnet = classifier(with_encoder=True), classifier()
+    copy_trunk(hybrid, resnet, ['conv1_conv', 'conv3_block1_conv', 'conv5_block3_conv'])
+    runner = SharedBackboneRunner({'hybrid': hybrid, 'resnet50': resnet}, activation_cache_size=2)
+    assert runner.cut_layer == 'conv5_block3_out'
+
+    batch = images(2)
+    runner.predict(batch)  # cold: one fused pass
+    stats = runner.stats()
+    assert (stats['activation_misses'], stats['activation_hits'], stats['trunk_passes']) == (2, 0, 1)
+
+    # Same images, one model: only its head runs
+    results = runner.predict(batch, ['resnet50'])
+    assert np.allclose(results['resnet50']['probabilities'], resnet.predict(batch, verbose=0), atol=1e-5)
+    stats = runner.stats()
+    assert (stats['activation_misses'], stats['activation_hits'], stats['trunk_passes']) == (2, 2, 1)
+
+    # One cached image and one new one: the trunk runs for the new one only, the oldest entry is evicted
+    runner.predict(np.stack([batch[0], images(1, seed=1)[0]]), ['hybrid'])
+    stats = runner.stats()
+    assert (stats['activation_misses'], stats['activation_hits'], stats['trunk_passes']) == (3, 3, 2)
+    assert stats['activation_cache_entries'] == 2
+
+if __name__ == "__main__":
+    test_fused_outputs_match_each_models_own_predict()
+    test_models_without_a_common_prefix_run_in_full()
+    test_activation_cache_counts_hits_and_misses()
+    print("✅ Shared backbone tests passed")
@@ -0,0 +1,90 @@
+"""
+Test script for the per-host thread configuration and core pinning
+No models or TensorFlow sessions needed
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from config.inference_config import InferenceConfig
+from src.utils import thread_tuning
+from src.utils.thread_tuning import (
+    available_cores, claim_worker_slot, core_sets, load_thread_config, save_thread_config, thread_settings
+)
+from tune_threads import best_row, candidates
+
+def tuned_config(pin=True):
+    return {'workers': 2, 'pin_cores': pin, 'host': {'cores': available_cores()},
+            'per_workers': {'2': {'intra_op_threads': 3, 'inter_op_threads': 2, 'pin_cores': pin}}}
+
+def test_core_sets_split_cores_between_workers():
+    assert core_sets(3, list(range(8))) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert core_sets(1, [4, 5]) == [[4, 5]]
+    # More workers than cores share them round-robin
+    assert core_sets(3, [0, 1]) == [[0], [1], [0]]
+
+def test_settings_come_from_the_tuned_row_then_an_even_split(monkeypatch):
+    for name in ('INTRA_OP_THREADS', 'INTER_OP_THREADS', 'PIN_WORKER_CORES'):
+        monkeypatch.setattr(InferenceConfig, name, None)
+    monkeypatch.setattr(thread_tuning, 'available_cores', lambda: list(range(8)))
+
+    settings = thread_settings(2, tuned_config())
+    assert (settings['intra_op_threads'], settings['inter_op_threads'], settings['pin_cores']) == (3, 2, True)
+    assert settings['source'] == 'tuned'
+    # No row for 4 workers: the cores are split instead of every worker using all of them
+    settings = thread_settings(4, tuned_config())
+    assert (settings['intra_op_threads'], settings['inter_op_threads'], settings['source']) == (2, 1, 'split')
+    assert thread_settings(1, {})['intra_op_threads'] == 0
+
+    monkeypatch.setattr(InferenceConfig, 'INTRA_OP_THREADS', 5)
+    monkeypatch.setattr(InferenceConfig, 'PIN_WORKER_CORES', False)
+    settings = thread_settings(2, tuned_config())
+    assert (settings['intra_op_threads'], settings['inter_op_threads'], settings['pin_cores']) == (5, 2, False)
+
+def test_config_tuned_on_another_host_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'thread_tuning.json')
+        save_thread_config({'workers': 2, 'per_workers': {}}, path)
+        assert load_thread_config(path)['workers'] == 2
+
+        with open(path) as f:
+            config = json.load(f)
+        config['host']['cores'] = list(range(len(available_cores()) + 4))
+        with open(path, 'w') as f:
+            json.dump(config, f)
+        assert load_thread_config(path) is None
+        assert load_thread_config(os.path.join(tmp, 'missing.json')) is None
+
+def test_each_worker_claims_its_own_slot(monkeypatch):
+    monkeypatch.setattr(thread_tuning, '_slot_lock', None)
+    monkeypatch.setattr(tempfile, 'tempdir', tempfile.mkdtemp())
+    # flock locks belong to the open file, so one process stands in for several workers
+    held = []
+    for expected in (0, 1):
+        assert claim_worker_slot(2) == expected
+        held.append(thread_tuning._slot_lock)
+    assert claim_worker_slot(2) is None
+    held[0].close()
+    assert claim_worker_slot(2) == 0
+
+def test_tuner_skips_oversubscribed_combinations_and_honours_the_p99_limit():
+    args = argparse.Namespace(workers=[1, 2, 4], threads=[1, 2, 4], inter_threads=[1], pin='both')
+    combos = list(candidates(args, 4))
+    assert all(workers * intra <= 4 for workers, intra, _, _ in combos)
+    assert (1, 4, 1, True) not in combos and (2, 2, 1, True) in combos
+
+    rows = [{'workers': 1, 'images_per_sec': 40.0, 'p99_ms': 30.0},
+            {'workers': 4, 'images_per_sec': 90.0, 'p99_ms': 80.0}]
+    assert best_row(rows, 'throughput')['workers'] == 4
+    assert best_row(rows, 'throughput', max_p99_ms=50)['workers'] == 1
+    assert best_row(rows, 'latency')['workers'] == 1
+    assert best_row(rows, 'throughput', max_p99_ms=10) is None
+
+if __name__ == "__main__":
+    test_core_sets_split_cores_between_workers()
+    test_config_tuned_on_another_host_is_ignored()
+    test_tuner_skips_oversubscribed_combinations_and_honours_the_p99_limit()
+    print("✅ Thread tuning tests passed")
@@ -0,0 +1,81 @@
+"""
+Test script for upload size limits and zero-copy upload decoding
+Uses a throwaway FastAPI app, no trained models needed
+"""
+import asyncio
+import io
+import sys
+sys.path.append('.')
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, File, UploadFile
+from PIL import Image
+
+from src.utils.preprocessing import preprocess_image
+from src.utils.uploads import UploadLimitMiddleware, upload_size, upload_source
+
+LIMIT = 64 * 1024
+
+def build_app():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=LIMIT, path_limits={"/batch": 4 * LIMIT})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": upload_size(file), "shape": list(preprocess_image(upload_source(file, LIMIT)).shape)}
+
+    @app.post("/batch")
+    async def batch(file: UploadFile = File(...)):
+        return {"size": upload_size(file)}
+
+    return app
+
+def png_bytes(size):
+    pixels = np.random.default_rng(0).integers(0, 255, (size, size), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def post(path, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=build_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+    return asyncio.run(run())
+
+def test_upload_is_decoded_from_the_spooled_file():
+    data = png_bytes(100)
+    response = post("/upload", files={"file": ("x.png", data, "image/png")})
+    assert response.status_code == 200
+    assert response.json() == {"size": len(data), "shape": [1, 224, 224, 3]}
+
+def test_content_length_over_limit_is_rejected_before_reading():
+    response = post("/upload", files={"file": ("x.png", png_bytes(400), "image/png")})
+    assert response.status_code == 413
+    assert "limit" in response.json()["detail"]
+    assert post("/batch", files={"file": ("x.png", png_bytes(400), "image/png")}).status_code == 200
+
+def test_chunked_body_is_cut_off_at_the_limit():
+    boundary = "limit-test"
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="x.png"\r\n'
+            'Content-Type: image/png\r\n\r\n').encode()
+    sent = []
+
+    async def body():
+        yield head
+        for _ in range(32):
+            sent.append(8192)
+            yield b"\0" * 8192
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = post("/upload", content=body(),
+                    headers={"content-type": f"multipart/form-data; boundary={boundary}"})
+    assert response.status_code == 413
+    assert len(sent) < 32
+
+if __name__ == "__main__":
+    test_upload_is_decoded_from_the_spooled_file()
+    test_content_length_over_limit_is_rejected_before_reading()
+    test_chunked_body_is_cut_off_at_the_limit()
+    print("✅ Upload tests passed")
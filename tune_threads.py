@@ -0,0 +1,200 @@
+"""
+CPU thread and worker tuning
+Benchmarks the served models on this host across worker counts, TensorFlow
+intra-/inter-op thread counts and core pinning, then saves the best
+combination (models/thread_tuning.json, or THREAD_CONFIG). api_server.py,
+serve.py, deploy.py and the Streamlit apps apply it at startup.
+
+Each combination starts that many worker processes at once, configured
+exactly like API workers (apply_thread_config), which all run forward
+passes for --seconds; throughput is the total over all of them and the
+latency percentiles are per forward pass. Combinations using more threads
+than cores are not tried: that is the oversubscription this avoids.
+
+Usage:
+    python tune_threads.py
+    python tune_threads.py --workers 1 2 4 --threads 1 2 4 8 --max_p99_ms 250
+    python tune_threads.py --models hybrid --batch_size 4 --pin off
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('.')
+from src.utils.thread_tuning import available_cores, save_thread_config
+
+OBJECTIVES = ('throughput', 'latency')
+
+def powers_of_two(limit):
+    values, n = [], 1
+    while n <= limit:
+        values.append(n)
+        n *= 2
+    if values[-1] != limit:
+        values.append(limit)
+    return values
+
+def candidates(args, cores):
+    """(workers, intra, inter, pin) combinations that fit in cores"""
+    pins = {'off': [False], 'on': [True], 'both': [False, True]}[args.pin]
+    for workers, intra, inter, pin in itertools.product(args.workers, args.threads, args.inter_threads, pins):
+        if workers * intra > cores or (pin and workers == 1):
+            continue
+        yield workers, intra, inter, pin
+
+def run_worker(args):
+    """One serving worker: load the models, wait for the start signal, run forward passes until the deadline"""
+    from config.inference_config import InferenceConfig
+    from src.models.model_manager import build_model_manager
+    from src.utils.thread_tuning import apply_thread_config
+
+    with contextlib.redirect_stdout(sys.stderr):
+        settings = apply_thread_config(InferenceConfig.SERVING_WORKERS)
+        manager = build_model_manager()
+        rng = np.random.default_rng(os.getpid())
+        models = []
+        for model_name in args.models:
+            model = manager.get(model_name)
+            batch = rng.random((args.batch_size,) + tuple(model.input_shape[1:]), dtype=np.float32)
+            model.predict(batch, verbose=0)  # warm-up
+            models.append((model, batch))
+
+    print('ready', flush=True)
+    sys.stdin.readline()
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    while time.perf_counter() < deadline:
+        for model, batch in models:
+            call_started = time.perf_counter()
+            model.predict(batch, verbose=0)
+            latencies.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    print(json.dumps({'latencies': latencies, 'wall': wall, 'cores': settings['cores']}), flush=True)
+
+def measure(args, workers, intra, inter, pin):
+    """Run workers processes side by side with these settings; None if any of them failed"""
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3', PREDICTION_CACHE_SIZE='0', MODELS_DIR=args.models_dir,
+               WEB_CONCURRENCY=str(workers), INTRA_OP_THREADS=str(intra), INTER_OP_THREADS=str(inter),
+               PIN_WORKER_CORES=str(pin).lower(), MODEL_PRELOAD='')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', '--models', *args.models,
+               '--batch_size', str(args.batch_size), '--seconds', str(args.seconds)]
+    processes = [subprocess.Popen(command, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=None if args.verbose else subprocess.DEVNULL, text=True)
+                 for _ in range(workers)]
+    try:
+        # Start timing only once every worker has loaded its models
+        if any(process.stdout.readline().strip() != 'ready' for process in processes):
+            return None
+        for process in processes:
+            process.stdin.write('go\n')
+            process.stdin.flush()
+        outputs = [process.stdout.readline() for process in processes]
+        if any(process.wait() != 0 for process in processes) or not all(outputs):
+            return None
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    results = [json.loads(output) for output in outputs]
+    latencies = np.concatenate([result['latencies'] for result in results]) * 1000
+    wall = max(result['wall'] for result in results)
+    return {
+        'workers': workers, 'intra_op_threads': intra, 'inter_op_threads': inter, 'pin_cores': pin,
+        'images_per_sec': len(latencies) * args.batch_size / wall,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'core_sets': [result['cores'] for result in results] if pin else None
+    }
+
+def best_row(rows, objective, max_p99_ms=None):
+    """Highest throughput (or lowest p99) among rows within the p99 limit"""
+    eligible = [row for row in rows if max_p99_ms is None or row['p99_ms'] <= max_p99_ms]
+    if not eligible:
+        return None
+    if objective == 'latency':
+        return min(eligible, key=lambda row: row['p99_ms'])
+    return max(eligible, key=lambda row: row['images_per_sec'])
+
+def main():
+    from config.inference_config import InferenceConfig
+
+    cores = len(available_cores())
+    parser = argparse.ArgumentParser(description='Tune inference threads and workers for this host')
+    parser.add_argument('--models_dir', type=str, default=InferenceConfig.MODELS_DIR)
+    parser.add_argument('--models', nargs='+', default=None, help='Models to run (default: every available classifier)')
+    parser.add_argument('--workers', nargs='+', type=int, default=powers_of_two(cores), help='Worker counts to try')
+    parser.add_argument('--threads', nargs='+', type=int, default=powers_of_two(cores), help='Intra-op thread counts to try')
+    parser.add_argument('--inter_threads', nargs='+', type=int, default=[1, 2], help='Inter-op thread counts to try')
+    parser.add_argument('--pin', choices=('off', 'on', 'both'), default='both', help='Pin each worker to its own core set')
+    parser.add_argument('--batch_size', type=int, default=1, help='Images per forward pass')
+    parser.add_argument('--seconds', type=float, default=10, help='Timed run per combination')
+    parser.add_argument('--objective', choices=OBJECTIVES, default='throughput')
+    parser.add_argument('--max_p99_ms', type=float, default=None, help='Only choose combinations under this p99')
+    parser.add_argument('--output', type=str, default=None, help='Config file (default: THREAD_CONFIG or models/thread_tuning.json)')
+    parser.add_argument('--verbose', action='store_true', help='Show worker output')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print("🧵 Thread and worker tuning")
+    print("=" * 70)
+    if args.models is None:
+        args.models = [name for name in InferenceConfig.CLASSIFIER_MODELS
+                       if os.path.exists(os.path.join(args.models_dir, InferenceConfig.MODEL_FILES[name]))]
+    if not args.models:
+        print(f"❌ No classifier models found in {args.models_dir}")
+        return
+    print(f"Host: {cores} cores | models: {', '.join(args.models)} | batch size {args.batch_size}")
+
+    rows = []
+    for workers, intra, inter, pin in candidates(args, cores):
+        label = f"workers {workers:>2}  intra {intra:>2}  inter {inter}  {'pinned  ' if pin else 'unpinned'}"
+        row = measure(args, workers, intra, inter, pin)
+        if row is None:
+            print(f"  {label} | failed (re-run with --verbose)")
+            continue
+        rows.append(row)
+        print(f"  {label} | {row['images_per_sec']:8.1f} img/s | p50 {row['p50_ms']:7.1f} ms  p99 {row['p99_ms']:7.1f} ms")
+
+    best = best_row(rows, args.objective, args.max_p99_ms)
+    if best is None:
+        print("❌ No combination met the limits; nothing saved")
+        return
+
+    # Best threads for each worker count, so a server started with a different count still gets tuned pools
+    per_workers = {}
+    for workers in sorted({row['workers'] for row in rows}):
+        choice = best_row([row for row in rows if row['workers'] == workers], args.objective, args.max_p99_ms)
+        if choice is not None:
+            per_workers[str(workers)] = {key: choice[key] for key in
+                                         ('intra_op_threads', 'inter_op_threads', 'pin_cores', 'images_per_sec', 'p99_ms')}
+    path = save_thread_config({
+        'workers': best['workers'],
+        'pin_cores': best['pin_cores'],
+        'per_workers': per_workers,
+        'models': args.models,
+        'batch_size': args.batch_size,
+        'objective': args.objective,
+        'max_p99_ms': args.max_p99_ms,
+        'results': rows
+    }, args.output or InferenceConfig.THREAD_CONFIG or os.path.join(args.models_dir, 'thread_tuning.json'))
+
+    print(f"\n✅ Best: {best['workers']} worker(s) x {best['intra_op_threads']} intra-op / "
+          f"{best['inter_op_threads']} inter-op threads{', pinned' if best['pin_cores'] else ''} "
+          f"({best['images_per_sec']:.1f} img/s, p99 {best['p99_ms']:.1f} ms)")
+    print(f"Saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,6 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from PIL import Image, ImageEnhance
 import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import os
 import time
 import io
@@ -19,6 +17,16 @@ from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 
+from src.models.registry import get_registry
+from src.models.backends import resolve_backend
+from config.inference_config import InferenceConfig
+from src.utils.prediction_cache import get_prediction_cache
+from src.utils.preprocessing import preprocess_image
+from src.utils.thread_tuning import apply_thread_config
+
+# One process serves every session, so it takes the host's single-process thread config
+apply_thread_config(workers=1)
+
 # Configure page
 st.set_page_config(
     page_title="🫁 Pneumonia Detection AI",
@@ -73,10 +81,12 @@ st.markdown("""
 class PneumoniaDetectorApp:
     def __init__(self):
         self.models = {}
+        self.model_paths = {}
         self.load_models()
         
     def load_models(self):
-        """Load all available models"""
+        """Load all available models (cached once per process, warmed up on first load)"""
+        registry = get_registry()
         models_dir = "models"
         model_files = {
             "Hybrid Model (Best)": "hybrid_model_colab.h5",
@@ -88,7 +98,13 @@ class PneumoniaDetectorApp:
             model_path = os.path.join(models_dir, model_file)
             if os.path.exists(model_path):
                 try:
-                    self.models[model_name] = load_model(model_path)
+                    # Converted copies from convert_models.py start faster (or run on MODEL_BACKEND)
+                    model_path = resolve_backend(model_path, InferenceConfig.MODEL_BACKEND)
+                    if not registry.is_loaded(model_path):
+                        with st.spinner(f"Loading {model_name}..."):
+                            registry.warm_up(model_path)
+                    self.models[model_name] = registry.get(model_path)
+                    self.model_paths[model_name] = model_path
                     st.sidebar.success(f"✅ {model_name} loaded")
                 except Exception as e:
                     st.sidebar.error(f"❌ Failed to load {model_name}: {str(e)}")
@@ -97,15 +113,7 @@ class PneumoniaDetectorApp:
     
     def preprocess_image(self, img, target_size=(224, 224)):
         """Preprocess image for model prediction"""
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        img_resized = img.resize(target_size)
-        img_array = image.img_to_array(img_resized)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array = img_array / 255.0
-        
-        return img_array
+        return preprocess_image(img, target_size)
     
     def predict(self, img, model_name):
         """Make prediction using selected model"""
@@ -115,8 +123,17 @@ class PneumoniaDetectorApp:
         model = self.models[model_name]
         img_array = self.preprocess_image(img)
         
+        # Repeat analyses of the same (enhanced) image skip the forward pass
+        cache = get_prediction_cache()
+        key = cache.make_key(img_array, model_name, get_registry().version(self.model_paths[model_name]))
+        cached = cache.get(key)
+        
         start_time = time.time()
-        prediction = model.predict(img_array, verbose=0)
+        if cached is not None:
+            prediction = np.asarray([cached])
+        else:
+            prediction = model.predict(img_array, verbose=0)
+            cache.set(key, prediction[0])
         inference_time = time.time() - start_time
         
         predicted_class = np.argmax(prediction[0])
@@ -132,7 +149,8 @@ class PneumoniaDetectorApp:
                 'NORMAL': float(prediction[0][0]),
                 'PNEUMONIA': float(prediction[0][1])
             },
-            'inference_time': inference_time
+            'inference_time': inference_time,
+            'cached': cached is not None
         }
     
     def enhance_image(self, img, brightness=1.0, contrast=1.0, sharpness=1.0):
@@ -209,6 +227,9 @@ def main():
     
     # Advanced options
     st.sidebar.subheader("Advanced Options")
+    if st.sidebar.button("Reload models from disk"):
+        get_registry().invalidate()
+        st.rerun()
     show_probabilities = st.sidebar.checkbox("Show detailed probabilities", True)
     show_processing_time = st.sidebar.checkbox("Show processing time", True)
     save_results = st.sidebar.checkbox("Save results to history", False)